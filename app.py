@@ -1,48 +1,81 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, session, send_file
 import os
+import csv
 import time
 import json
 import uuid
+import hmac
 import logging
+import threading
+from datetime import date, timedelta
 from functools import wraps
-from dotenv import load_dotenv
+from env_setup import load_env
+
+# Load environment variables from .env before the modules below read their settings
+load_env()
+
 from data_manager import (
-    load_data, mark_habit_done, skip_habit, add_new_habit,
-    get_weekly_data, load_leaderboard, update_leaderboard,
-    get_calendar_counts, record_event, add_points, check_rewards,
-    load_user_points, calculate_streak, delete_habit, edit_habit
+    load_data, update_leaderboard,
+    get_calendar_counts, get_calendar_range, check_rewards,
+    calculate_streak, delete_habit, edit_habit,
+    habit_exists, suggest_habits, unit_of_work, commit_units, recover_journal, commit_stats, reset_commit_stats
 )
+from log_setup import configure_logging
+from profiler import install_profiler, list_recent_profiles
+from memtrack import install_memory_tracking, get_memory_report, reset_stats as reset_memory_stats
+from rebuild import warm_start, rebuild_status, start_background_rebuild
+from snapshot import SnapshotManager
+from changes import ChangeLog
+from classifier import classify
+from fragment_cache import FragmentCache
+from rate_limits import RateLimiter
+from assets import AssetPipeline, IMMUTABLE_CACHE_CONTROL
+from export import stream_export, export_filename, EXPORT_FORMATS
+from bulk_import import import_history, detect_format, open_text, IMPORT_FORMATS
 
 # ==================== LOGGING CONFIGURATION ====================
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trackit.log'),
-        logging.StreamHandler()  # Also print to console
-    ]
-)
+# Records go through a queue to a background writer (rotating JSON-lines file
+# plus console) so request threads never block on log I/O.
+configure_logging()
 logger = logging.getLogger(__name__)
 logger.info("TrackIt application starting...")
 
-# Load environment variables from .env file
-load_dotenv()
+# Finish any /done transaction a crash interrupted before its stores were updated
+recover_journal()
 
 # Gemini AI Configuration
-try:
-    import google.generativeai as genai
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        GEMINI_AVAILABLE = True
-    else:
-        GEMINI_AVAILABLE = False
-except ImportError:
-    GEMINI_AVAILABLE = False
+# google.generativeai takes most of a second to import, so the SDK is only
+# imported and configured when the first /api/chat request needs it.
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+GEMINI_AVAILABLE = bool(GEMINI_API_KEY)
+_gemini_lock = threading.Lock()
+_genai = None
+_gemini_model = None
+
+def get_gemini_model():
+    """Return the shared Gemini model, creating the client on first use (None if unavailable)"""
+    global _genai, _gemini_model, GEMINI_AVAILABLE
+    if _gemini_model is None and GEMINI_AVAILABLE:
+        with _gemini_lock:
+            if _gemini_model is None and GEMINI_AVAILABLE:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=GEMINI_API_KEY)
+                    _genai = genai
+                    _gemini_model = genai.GenerativeModel('gemini-pro')
+                    logger.info("Gemini client initialised")
+                except Exception as e:
+                    logger.warning(f"Gemini unavailable, using mock responses: {e}")
+                    GEMINI_AVAILABLE = False
+    return _gemini_model
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.secret_key = os.environ.get('TRACKIT_SECRET', 'trackit-dev-secret')
 
+# Fingerprinted, precompressed copies of static/ (templates link them with asset_url)
+assets = AssetPipeline()
+app.jinja_env.globals["asset_url"] = assets.url
+
 REMINDER_FILE = os.path.join(os.path.dirname(__file__), "reminder.txt")
 USERS_FILE = os.path.join(os.path.dirname(__file__), "data", "users.json")
 
@@ -154,10 +187,8 @@ def validate_session():
     
     return False
 
-# Rate limiting: track requests per user/identifier
-_rate_limit_store = {}
-_RATE_LIMIT_WINDOW = 60  # seconds
-_RATE_LIMIT_MAX_REQUESTS = 10  # max requests per window
+# Rate limiting: track requests per user/identifier (shared by serve.py's worker processes)
+rate_limiter = RateLimiter()
 
 def rate_limit(max_requests=5, window=60):
     """Simple rate limiter decorator - limits requests per user/IP per time window"""
@@ -166,29 +197,40 @@ def rate_limit(max_requests=5, window=60):
         def decorated_function(*args, **kwargs):
             # Use user_name if available, otherwise use IP
             identifier = session.get('user_name') or request.remote_addr
-            current_time = time.time()
-            
-            if identifier not in _rate_limit_store:
-                _rate_limit_store[identifier] = []
-            
-            # Clean old requests outside the window
-            _rate_limit_store[identifier] = [
-                req_time for req_time in _rate_limit_store[identifier]
-                if current_time - req_time < window
-            ]
-            
-            # Check if limit exceeded
-            if len(_rate_limit_store[identifier]) >= max_requests:
+            if not rate_limiter.hit(identifier, max_requests, window):
                 logger.warning(f"Rate limit exceeded for {identifier}")
                 return jsonify({"error": "Rate limit exceeded. Please try again later.", "status": "rate_limited"}), 429
-            
-            # Record this request
-            _rate_limit_store[identifier].append(current_time)
-            
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+# Admin endpoints are disabled unless TRACKIT_ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get('TRACKIT_ADMIN_TOKEN', '')
+
+def is_admin_request():
+    """Check the X-Admin-Token header against TRACKIT_ADMIN_TOKEN (never a query
+    parameter, which would end up in access logs and browser history)
+    """
+    if not ADMIN_TOKEN:
+        return False
+    supplied = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+def admin_required(f):
+    """Decorator restricting a route to requests carrying the admin token"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Not found", "status": "error"}), 404
+        if not is_admin_request():
+            logger.warning(f"Rejected admin request to {request.path} from {request.remote_addr}")
+            return jsonify({"error": "Admin token required", "status": "forbidden"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+install_profiler(app, authorize=is_admin_request)
+install_memory_tracking(app)
+
 def ensure_session_valid():
     """Decorator to validate session before executing route - clears invalid sessions"""
     def decorator(f):
@@ -244,26 +286,14 @@ def get_pending_reward_info(user_name):
         return f"\n\n💝 {reward_msg}"
     return ""
 
-ICON_MAP = {
-    'medit': 'meditation.svg', 'medita': 'meditation.svg', 'yoga': 'meditation.svg',
-    'run': 'running.svg', 'jog': 'running.svg', 'walk': 'running.svg', 'exercise': 'running.svg',
-    'read': 'reading.svg', 'book': 'reading.svg', 'pages': 'reading.svg',
-    'water': 'water.svg', 'drink': 'water.svg'
-}
-
 def assign_icon(habit_name):
-    """Map habit name to icon"""
-    name_lower = (habit_name or '').lower()
-    return next((v for k, v in ICON_MAP.items() if k in name_lower), 'default.svg')
+    """Map habit name to icon (see classifier.DEFAULT_TABLES["icon"])"""
+    return classify("icon", habit_name, 'default.svg')
 
 def is_duplicate_habit(habit_name):
-    """Check if a habit already exists in the database"""
+    """Check if a habit already exists (case-insensitive, via the habit name index)"""
     try:
-        df = load_data()
-        if df.empty:
-            return False
-        existing_habits = df['habit_name'].tolist()
-        return habit_name.lower() in [h.lower() for h in existing_habits]
+        return habit_exists(habit_name)
     except Exception as e:
         logger.error(f"Error checking for duplicate habit: {e}")
         return False
@@ -277,16 +307,42 @@ def load_habits_with_rate():
         d = int(h.get("days_completed") or 0)
         h["rate"] = int((d / t) * 100) if t else 0
         h['icon'] = assign_icon(h.get('habit_name'))
-        h['streak'] = calculate_streak(h.get('habit_name', ''))
+        h['streak'] = calculate_streak(h.get('habit_name', ''), habit_id=h.get('habit_id'))
     return habits
 
-def handle_rewards(user_name):
-    """Check and handle reward unlocks for a user"""
+# Read model for the GET routes, rebuilt by writers and swapped in atomically
+snapshots = SnapshotManager(load_habits=load_habits_with_rate)
+# Per-entity changes between snapshot versions, for /api/changes
+change_log = ChangeLog(snapshots)
+
+# Rendered dashboard fragments, keyed on the snapshot part versions they show
+fragments = FragmentCache()
+
+def render_fragments(snap, user_name, points, rewards):
+    """HTML for the cached parts of index.html"""
+    versions = snap.part_versions
+    return {
+        "user_header": fragments.render(
+            "user_header", user_name,
+            lambda: render_template("fragments/user_header.html", user_name=user_name)),
+        "user_stats": fragments.render(
+            "user_stats", (user_name, versions["points"]),
+            lambda: render_template("fragments/user_stats.html", user_name=user_name, points=points, rewards=rewards),
+        ) if user_name else "",
+        # Its icons link fingerprinted asset URLs, which change when the images do
+        "habit_grid": fragments.render(
+            "habit_grid", (versions["habits"], assets.version()),
+            lambda: render_template("fragments/habit_grid.html", habits=snap.habits)),
+    }
+
+def handle_rewards(user_name, new_rewards=None):
+    """Check and handle reward unlocks for a user (pass new_rewards if already checked)"""
     if not user_name:
         return
     
     try:
-        new_rewards = check_rewards(user_name)
+        if new_rewards is None:
+            new_rewards = check_rewards(user_name)
         if new_rewards:
             reward_text = ', '.join(new_rewards)
             session['reward_msg'] = f"Congrats! You unlocked: {reward_text} 🎉"
@@ -297,16 +353,11 @@ def handle_rewards(user_name):
 @app.route("/")
 def index():
     """Dashboard homepage with habits, points, and rewards"""
-    try:
-        habits = load_habits_with_rate()
-    except Exception as e:
-        logger.error(f"Load habits error: {e}")
-        habits = []
-    
-    reminder = ""
-    if os.path.exists(REMINDER_FILE):
-        with open(REMINDER_FILE, "r") as f:
-            reminder = f.read().strip()
+    # Taken before the snapshot so the client's first delta poll can only over-deliver
+    change_cursor, change_epoch = change_log.cursor(), change_log.epoch
+    snap = snapshots.current()
+    habits = snap.habits
+    reminder = snap.reminder
     
     user_name = session.get('user_name', '')
     
@@ -316,23 +367,19 @@ def index():
         session.clear()
         user_name = ''
     
-    overall_rate = int(sum(h.get('rate', 0) for h in habits) / len(habits)) if habits else 0
+    overall_rate = snap.overall_rate
 
     # Load points and rewards for user
     points = 0
     rewards = []
     if user_name:
-        try:
-            update_leaderboard(user_name, overall_rate)
-        except Exception as e:
-            logger.error(f"Leaderboard update error: {e}")
-        
-        try:
-            user_data = load_user_points().get(user_name, {"points": 0, "rewards": []})
-            points = user_data.get("points", 0)
-            rewards = user_data.get("rewards", [])
-        except Exception as e:
-            logger.error(f"Points load error: {e}")
+        # Only write the leaderboard when the score actually moved
+        if snap.scores.get(user_name) != overall_rate:
+            try:
+                update_leaderboard(user_name, overall_rate)
+            except Exception as e:
+                logger.error(f"Leaderboard update error: {e}")
+        points, rewards = snap.user_points(user_name)
 
     return render_template("index.html", 
                           habits=habits, 
@@ -340,42 +387,116 @@ def index():
                           user_name=user_name, 
                           overall_rate=overall_rate,
                           points=points, 
-                          rewards=rewards)
+                          rewards=rewards,
+                          fragments=render_fragments(snap, user_name, points, rewards),
+                          change_cursor=change_cursor,
+                          change_epoch=change_epoch or '')
+
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    """Fingerprinted static file, as br or gzip when accepted; cached by browsers for a year"""
+    found = assets.resolve(filename, request.headers.get("Accept-Encoding", ""))
+    if found is None:
+        return jsonify({"error": "Not found", "status": "error"}), 404
+    path, encoding = found
+    response = send_file(path, mimetype=assets.mimetype(filename), conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 @app.route("/weekly")
 def weekly():
     """Return weekly progress data for chart"""
-    try:
-        dates, results = get_weekly_data()
-        if not dates or not results:
-            return jsonify({"success": True, "dates": [], "values": []})
-        values = [r[1] for r in results]
-        return jsonify({"success": True, "dates": dates, "values": values})
-    except Exception as e:
-        logger.error(f"Weekly data error: {e}")
+    weekly_data = snapshots.current().weekly
+    if not weekly_data["dates"] or not weekly_data["values"]:
         return jsonify({"success": True, "dates": [], "values": []})
+    return jsonify({"success": True, "dates": weekly_data["dates"], "values": weekly_data["values"]})
 
 @app.route("/leaderboard")
 def leaderboard():
     """Return top 10 users on leaderboard"""
-    try:
-        leaders = load_leaderboard(top_n=10)
-        if not leaders:
-            return jsonify({"success": True, "top": []})
-        return jsonify({"success": True, "top": leaders})
-    except Exception as e:
-        logger.error(f"Leaderboard error: {e}")
-        return jsonify({"success": True, "top": []})
+    return jsonify({"success": True, "top": snapshots.current().leaderboard})
+
+@app.route("/api/changes")
+def api_changes():
+    """Entities changed after cursor `since` (0 = full state); poll again with the returned cursor.
+    Points, rewards and per-user calendars are only sent for the signed-in user.
+    """
+    since = request.args.get('since', default=0, type=int)
+    epoch = request.args.get('epoch', default=None, type=int)
+    # Publishes any pending version (and builds the first one on startup)
+    snapshots.current()
+    return jsonify({"success": True, **change_log.since(since, epoch, user_name=session.get('user_name'))})
+
+@app.route("/api/habits/suggest")
+def habits_suggest():
+    """Prefix autocomplete over active habit names (case-insensitive)"""
+    prefix = request.args.get('q', default='')
+    limit = max(1, min(request.args.get('limit', default=10, type=int), 50))
+    return jsonify({"success": True, "suggestions": suggest_habits(prefix, limit)})
+
+# Longest span /calendar_data serves in one range response
+CALENDAR_MAX_DAYS = 366 * 10
+
+def parse_calendar_day(value, last=False):
+    """Date from YYYY-MM-DD, or YYYY-MM (its first day, or last day with last=True)"""
+    value = (value or '').strip()
+    if len(value) == 7:
+        y, m = int(value[:4]), int(value[5:7])
+        if last:
+            return date(y + m // 12, m % 12 + 1, 1) - timedelta(days=1)
+        return date(y, m, 1)
+    return date.fromisoformat(value)
+
+def calendar_range(start, end, user_name=None):
+    """Dense per-day counts for start..end: from the snapshot's monthly rollups when
+    the whole span is inside their window, otherwise one pass over the completion index
+    """
+    days = snapshots.current().calendar_range(start, end, user_name)
+    if days is None:
+        days = get_calendar_range(start, end, user_name=user_name)
+    return days
 
 @app.route("/calendar_data")
 def calendar_data():
-    """Return calendar completion counts for a given month/year"""
-    month = request.args.get('month', type=int)
-    year = request.args.get('year', type=int)
+    """Return calendar completion counts for a given month/year.
+    With from/to (YYYY-MM-DD or YYYY-MM) or year alone, returns a range instead:
+    "days" holds one count per day from "from" to "to" inclusive.
+    """
+    today = date.today()
+    month = request.args.get('month', default=today.month, type=int)
+    year = request.args.get('year', default=today.year, type=int)
     user = request.args.get('user', default='')
-    
+    user_name = user if user != 'me' else None
+
+    range_from, range_to = request.args.get('from'), request.args.get('to')
+    if range_from or range_to or ('year' in request.args and 'month' not in request.args):
+        try:
+            if range_from or range_to:
+                end = parse_calendar_day(range_to, last=True) if range_to else today
+                start = parse_calendar_day(range_from) if range_from else end - timedelta(days=364)
+            else:
+                start, end = date(year, 1, 1), date(year, 12, 31)
+        except ValueError:
+            return jsonify({"error": "Dates must be YYYY-MM-DD or YYYY-MM", "status": "error"}), 400
+        span = (end - start).days + 1
+        if span < 1 or span > CALENDAR_MAX_DAYS:
+            return jsonify({"error": f"Range must cover 1 to {CALENDAR_MAX_DAYS} days", "status": "error"}), 400
+        try:
+            days = calendar_range(start, end, user_name)
+        except Exception as e:
+            logger.error(f"Calendar range error: {e}")
+            days = [0] * span
+        return jsonify({"success": True, "from": start.isoformat(), "to": end.isoformat(),
+                        "days": days, "max": max(days, default=0), "total": sum(days)})
+
     try:
-        counts = get_calendar_counts(month=month, year=year, user_name=user if user != 'me' else None)
+        counts = snapshots.current().calendar_counts(year, month, user_name)
+        if counts is None:
+            # Outside the snapshot's rollup window
+            counts = get_calendar_counts(month=month, year=year, user_name=user_name)
         if not counts:
             return jsonify({"success": True, "counts": {}, "max": 0})
         max_count = max(counts.values()) if counts else 0
@@ -384,6 +505,63 @@ def calendar_data():
         logger.error(f"Calendar data error: {e}")
         return jsonify({"success": True, "counts": {}, "max": 0})
 
+@app.route("/export")
+def export_history():
+    """Stream the session user's habits, events and points as CSV or NDJSON.
+    format=csv|ndjson, gzip=1 to compress, since=YYYY-MM-DD to resume an
+    interrupted download; admins may pass user= to export someone else.
+    """
+    user_name = session.get('user_name', '')
+    if request.args.get('user') and is_admin_request():
+        user_name = request.args['user']
+    if not user_name:
+        return jsonify({"error": "Set your name before exporting", "status": "error"}), 400
+    fmt = request.args.get('format', default='csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}", "status": "error"}), 400
+    since = request.args.get('since') or None
+    if since:
+        try:
+            since = date.fromisoformat(since).isoformat()
+        except ValueError:
+            return jsonify({"error": "since must be YYYY-MM-DD", "status": "error"}), 400
+    compress = request.args.get('gzip', default='') in ('1', 'true', 'yes')
+
+    response = Response(stream_export(user_name, fmt, since, compress),
+                        mimetype="application/gzip" if compress else EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{export_filename(user_name, fmt, since, compress)}"'
+    response.headers["Cache-Control"] = "no-store"
+    # Let proxies pass chunks through as they are produced
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/api/import", methods=["POST"])
+def import_history_upload():
+    """Bulk-import completion history (CSV or JSON lines, see bulk_import.py) for the session user.
+    Send the file as upload field "file" or as the raw body; format= overrides detection.
+    Admins may import rows for any user (user= for rows without one).
+    """
+    admin = is_admin_request()
+    user_name = request.args['user'] if admin and request.args.get('user') else session.get('user_name', '')
+    if not user_name and not admin:
+        return jsonify({"error": "Set your name before importing", "status": "error"}), 400
+    upload = request.files.get('file')
+    filename = upload.filename if upload else request.args.get('filename', '')
+    fmt = request.args.get('format') or detect_format(filename, request.content_type)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(IMPORT_FORMATS)}", "status": "error"}), 400
+    stream = upload.stream if upload else request.stream
+    try:
+        report = import_history(open_text(stream, filename), fmt, user_name=user_name or None,
+                                force_user=not admin,
+                                create_habits=request.args.get('create', default='1') != '0')
+    except (UnicodeDecodeError, OSError, csv.Error) as e:
+        return jsonify({"error": f"Could not read the file: {e}", "status": "error"}), 400
+    except Exception as e:
+        logger.error(f"Import error: {e}")
+        return jsonify({"error": "Import failed", "status": "error"}), 500
+    return jsonify({"success": True, **report.as_dict()})
+
 @app.route("/set_name", methods=["POST"])
 def set_user_name():
     """Set user name in session and create/retrieve user account"""
@@ -415,13 +593,22 @@ def add_new_habit_form():
                 logger.warning(f"Duplicate habit attempted: {habit_name}")
                 session['error_msg'] = f"Habit '{habit_name}' already exists!"
             else:
-                add_new_habit(habit_name)
-                logger.info(f"New habit added: {habit_name}")
+                msg, = unit_of_work().add_habit(habit_name).commit()
+                logger.info(f"Add habit {habit_name}: {msg}")
         except Exception as e:
             logger.error(f"Add habit error: {e}")
             session['error_msg'] = f"Error adding habit: {str(e)}"
     return redirect(url_for('index'))
 
+def stage_done(uow, habit_name, user_name, when=None):
+    """Stage a Done: habit counters, the calendar event, points and rewards commit together"""
+    uow.mark_done(habit_name, when)
+    if user_name:
+        uow.record_event(habit_name, user_name=user_name, when=when)
+        uow.add_points(user_name, points=10)  # 10 points per habit
+        uow.check_rewards(user_name, habit_name)
+    return uow
+
 @app.route("/done", methods=["POST"])
 def mark_habit_done_form():
     """Mark a habit as done and award points"""
@@ -430,16 +617,11 @@ def mark_habit_done_form():
     
     if habit_name:
         try:
-            mark_habit_done(habit_name)
-            
-            # Record the event for calendar tracking
-            if user_name:
-                record_event(habit_name, user_name=user_name)
+            results = stage_done(unit_of_work(), habit_name, user_name).commit()
             
-            # Award points and check rewards if user logged in
             if user_name:
-                points = add_points(user_name, points=10)  # 10 points per habit
-                handle_rewards(user_name)
+                _msg, _recorded, points, new_rewards = results
+                handle_rewards(user_name, new_rewards)
                 logger.info(f"User {user_name} earned 10 points (total: {points})")
         except Exception as e:
             logger.error(f"Mark habit done error: {e}")
@@ -452,12 +634,84 @@ def skip_habit_form():
     habit_name = request.form.get('name', '').strip()
     if habit_name:
         try:
-            skip_habit(habit_name)
+            unit_of_work().skip(habit_name).commit()
             logger.info(f"Habit skipped: {habit_name}")
         except Exception as e:
             logger.error(f"Skip habit error: {e}")
     return redirect(url_for('index'))
 
+# Offline clients replay their queue through /api/actions/batch
+ACTION_BATCH_MAX = 100
+ACTION_ID_MAX_LEN = 64
+# Queued actions may be backdated at most this many days
+ACTION_MAX_AGE_DAYS = 30
+
+def _stage_action(action, user_name):
+    """Unit of work for one queued client action, or raise ValueError"""
+    if not isinstance(action, dict):
+        raise ValueError("action must be an object")
+    action_id = str(action.get('id') or '').strip()
+    if not action_id or len(action_id) > ACTION_ID_MAX_LEN:
+        raise ValueError("missing or invalid action id")
+    # Queued while someone else was signed in on this browser
+    if 'user' in action and str(action.get('user') or '').strip() != user_name:
+        raise ValueError("action was queued by another user")
+    habit_name = str(action.get('name') or '').strip()
+    if not habit_name:
+        raise ValueError("missing habit name")
+    when = action.get('date') or None
+    if when is not None:
+        when = date.fromisoformat(str(when))
+        # Client clocks may run a day ahead of the server's
+        if when > date.today() + timedelta(days=1):
+            raise ValueError("date is in the future")
+        if when < date.today() - timedelta(days=ACTION_MAX_AGE_DAYS):
+            raise ValueError(f"date is more than {ACTION_MAX_AGE_DAYS} days ago")
+    uow = unit_of_work(action_id=f"{user_name}:{action_id}")
+    if action.get('type') == 'done':
+        return stage_done(uow, habit_name, user_name, when)
+    if action.get('type') == 'skip':
+        return uow.skip(habit_name)
+    raise ValueError(f"unknown action type: {action.get('type')}")
+
+@app.route("/api/actions/batch", methods=["POST"])
+def actions_batch():
+    """Apply queued Done/Skip actions in one commit; each client action id is applied at most once"""
+    payload = request.get_json(silent=True) or {}
+    actions = payload.get('actions')
+    if not isinstance(actions, list):
+        return jsonify({"error": "Expected a JSON body with an actions list", "status": "error"}), 400
+    if len(actions) > ACTION_BATCH_MAX:
+        return jsonify({"error": f"At most {ACTION_BATCH_MAX} actions per batch", "status": "error"}), 413
+    user_name = session.get('user_name', '')
+
+    results, units = [], []
+    for action in actions:
+        action_id = action.get('id') if isinstance(action, dict) else None
+        try:
+            uow = _stage_action(action, user_name)
+            units.append(uow)
+            results.append({"id": action_id, "status": "applied", "type": action['type'], "uow": uow})
+        except (ValueError, TypeError) as e:
+            results.append({"id": action_id, "status": "rejected", "error": str(e)})
+    if units:
+        try:
+            commit_units(units)
+        except Exception as e:
+            # Nothing was acknowledged; the client keeps its queue and retries
+            logger.error(f"Action batch commit error: {e}")
+            return jsonify({"error": "Could not apply actions", "status": "error"}), 500
+
+    for result in results:
+        uow = result.pop("uow", None)
+        if uow is None:
+            continue
+        result["result"] = uow.results[0]
+        if result["type"] == 'done' and user_name:
+            _msg, _recorded, result["points"], result["rewards"] = uow.results
+    logger.info(f"Applied {len(units)} queued actions for {user_name or 'anonymous'}")
+    return jsonify({"success": True, "results": results, "cursor": change_log.cursor()})
+
 @app.route("/delete", methods=["POST"])
 def delete_habit_form():
     """Delete a habit"""
@@ -508,7 +762,7 @@ def chat():
         
         # Get user's habits for context
         try:
-            habits = load_habits_with_rate()
+            habits = snapshots.current().habits
         except Exception as e:
             logger.error(f"Load habits error in chat: {e}")
             habits = []
@@ -526,7 +780,8 @@ def chat():
         persona = AI_PERSONAS.get(persona_key, AI_PERSONAS['coach'])
         
         # If Gemini is available, use it
-        if GEMINI_AVAILABLE:
+        model = get_gemini_model()
+        if model is not None:
             try:
                 system_prompt = f"""You are TrackIt's habit coach AI called "{persona['name']}". Your communication style is: {persona['style']}
 Your role is to:
@@ -542,10 +797,9 @@ Their habits: {habit_context}
 
 {chat_context}"""
                 
-                model = genai.GenerativeModel('gemini-pro')
                 response = model.generate_content(
                     f"{system_prompt}\n\nQuestion: {user_message}",
-                    generation_config=genai.types.GenerationConfig(
+                    generation_config=_genai.types.GenerationConfig(
                         temperature=0.8,
                         max_output_tokens=200
                     )
@@ -584,22 +838,63 @@ Their habits: {habit_context}
         logger.error(f"Chat error: {error_msg}")
         return jsonify({"error": "Assistant error", "status": "error"}), 500
 
+@app.route("/admin/profiles")
+@admin_required
+def admin_profiles():
+    """List recent request profiles with their top functions"""
+    limit = request.args.get('limit', default=20, type=int)
+    top_n = request.args.get('top', default=10, type=int)
+    return jsonify({"success": True, "profiles": list_recent_profiles(limit=limit, top_n=top_n)})
+
+@app.route("/admin/memory", methods=["GET", "DELETE"])
+@admin_required
+def admin_memory():
+    """Per-route and per-data_manager-call peak memory (TRACKIT_MEMTRACE=1)"""
+    if request.method == "DELETE":
+        reset_memory_stats()
+    return jsonify({"success": True, **get_memory_report()})
+
+@app.route("/admin/commit-stats", methods=["GET", "DELETE"])
+@admin_required
+def admin_commit_stats():
+    """Group-commit batch sizes and flush latency (tune TRACKIT_COMMIT_WINDOW_MS)"""
+    if request.method == "DELETE":
+        reset_commit_stats()
+    return jsonify({"success": True, **commit_stats()})
+
+@app.route("/admin/fragment-stats", methods=["GET", "DELETE"])
+@admin_required
+def admin_fragment_stats():
+    """Dashboard fragment cache hits and render time saved; DELETE resets the counters"""
+    if request.method == "DELETE":
+        fragments.reset_stats()
+    return jsonify({"success": True, **fragments.stats()})
+
+@app.route("/admin/rebuild", methods=["GET", "POST"])
+@admin_required
+def admin_rebuild():
+    """Progress of the completion index rebuild; POST starts one in the background"""
+    if request.method == "POST":
+        if not start_background_rebuild(workers=request.args.get('workers', type=int)):
+            return jsonify({"success": False, "error": "A rebuild is already running", **rebuild_status()}), 409
+        logger.info("Completion index rebuild started via /admin/rebuild")
+    return jsonify({"success": True, **rebuild_status()})
+
 def get_mock_response(user_message, habits, user_name, return_text=False):
     """Provide mock AI responses when API is not configured"""
-    msg_lower = user_message.lower()
-    
     # Select response based on message
-    if any(word in msg_lower for word in ['improve', 'better', 'tips', 'help', 'advice']):
+    intent = classify("intent", user_message)
+    if intent == 'tips':
         reply = "Great question! Pick your hardest habit and focus on 3 days in a row. Once you break through, momentum builds itself! 💪"
-    elif any(word in msg_lower for word in ['motivation', 'motivate', 'inspire', 'encourage']):
+    elif intent == 'motivation':
         reply = "You're already here tracking your habits - that's the hardest part! Every single day counts. Keep crushing it! 🌿✨"
-    elif any(word in msg_lower for word in ['streak', 'progress', 'doing', 'how']):
+    elif intent == 'progress':
         if habits:
             top_habit = max(habits, key=lambda h: h.get('rate', 0))
             reply = f"Your '{top_habit['habit_name']}' is at {top_habit['rate']}%! Keep that momentum! 🔥"
         else:
             reply = "You're building something amazing. Every day counts! 🎯"
-    elif any(word in msg_lower for word in ['slack', 'skip', 'break', 'hard', 'difficult', 'struggle']):
+    elif intent == 'struggle':
         reply = "I hear you! Even the best habit trackers take breaks. What matters is getting back on track tomorrow. You've got this! 💙"
     else:
         # Generic encouraging response
@@ -611,4 +906,5 @@ def get_mock_response(user_message, habits, user_name, return_text=False):
         return jsonify({"reply": reply, "status": "success"})
 
 if __name__ == '__main__':
+    warm_start()
     app.run(debug=True, host='0.0.0.0', port=5000)
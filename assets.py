@@ -0,0 +1,227 @@
+"""
+Fingerprinted, precompressed static assets.
+
+Every file under static/ is copied to static/build/ under a content-hashed
+name (dashboard.js -> dashboard.1a2b3c4d5e6f.js) next to .gz and, when the
+brotli package is installed, .br variants. Templates link to them with
+asset_url('dashboard.js'), and /assets/<name> serves the best variant the
+browser accepts with a one-year immutable Cache-Control, so repeat visits
+make no requests for them at all: a changed file gets a new name.
+
+    python assets.py [--clean]
+
+builds everything ahead of time (serve.py does this before forking
+workers). Without a build, or after a source file is edited, asset_url()
+(re)builds the file on first use, so development needs no extra step.
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import logging
+import argparse
+import mimetypes
+import threading
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+MANIFEST_NAME = "manifest.json"
+# Precompressed; other types (images other than SVG, fonts) are served as they are
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".html", ".txt")
+HASH_LENGTH = 12
+ASSET_MAX_AGE = 365 * 24 * 3600
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={ASSET_MAX_AGE}, immutable"
+# Source files are checked for edits at most this often
+CHECK_SECONDS = 2.0
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def hashed_name(name, data):
+    """'images/run.svg' -> 'images/run.<hash>.svg'"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class AssetPipeline:
+    """Builds and resolves fingerprinted copies of the files in `static_dir`"""
+
+    def __init__(self, static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._checked = 0.0
+        # Bumped on every manifest change, see version()
+        self._version = 0
+
+    # --- Building ---
+
+    def sources(self):
+        """Logical names ('styles.css', 'images/run.svg') of every source file"""
+        names = []
+        for root, dirs, files in os.walk(self.static_dir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.build_dir]
+            for filename in files:
+                path = os.path.join(root, filename)
+                names.append(os.path.relpath(path, self.static_dir).replace(os.sep, "/"))
+        return sorted(names)
+
+    def _build_one(self, name):
+        source = os.path.join(self.static_dir, name)
+        signature = _signature(source)
+        with open(source, "rb") as f:
+            data = f.read()
+        hashed = hashed_name(name, data)
+        target = os.path.join(self.build_dir, hashed)
+        encodings = []
+        if not os.path.exists(target):
+            _write(target, data)
+        if name.lower().endswith(COMPRESSIBLE):
+            variants = [("gzip", ".gz", lambda: gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                variants.append(("br", ".br", lambda: brotli.compress(data, quality=11)))
+            for encoding, suffix, compress in variants:
+                if not os.path.exists(target + suffix):
+                    packed = compress()
+                    # Not worth a Content-Encoding if it barely shrinks
+                    if len(packed) >= len(data) * 0.95:
+                        continue
+                    _write(target + suffix, packed)
+                encodings.append(encoding)
+        return {"hashed": hashed, "source": signature, "size": len(data), "encodings": encodings}
+
+    def build(self, clean=False):
+        """Build every source file and write the manifest; returns it"""
+        with self._lock:
+            manifest = {}
+            for name in self.sources():
+                try:
+                    manifest[name] = self._build_one(name)
+                except OSError as e:
+                    logger.error(f"Error building asset {name}: {e}")
+            self._save(manifest)
+            if clean:
+                self._clean(manifest)
+            return manifest
+
+    def _clean(self, manifest):
+        keep = {MANIFEST_NAME}
+        for entry in manifest.values():
+            keep.update(entry["hashed"] + suffix for suffix in ("", ".gz", ".br"))
+        for root, _dirs, files in os.walk(self.build_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if os.path.relpath(path, self.build_dir).replace(os.sep, "/") not in keep:
+                    os.remove(path)
+
+    def _save(self, manifest):
+        self._manifest = manifest
+        self._version += 1
+        _write(os.path.join(self.build_dir, MANIFEST_NAME),
+               json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    # --- Resolving ---
+
+    def manifest(self):
+        """Current manifest, rebuilding entries whose source changed (checked every CHECK_SECONDS)"""
+        now = time.monotonic()
+        if self._manifest is not None and now - self._checked < CHECK_SECONDS:
+            return self._manifest
+        with self._lock:
+            manifest = dict(self._manifest if self._manifest is not None else self._load())
+            changed = False
+            for name, entry in list(manifest.items()):
+                if entry.get("source") != _signature(os.path.join(self.static_dir, name)):
+                    del manifest[name]
+                    changed = True
+            self._checked = now
+            self._manifest = manifest
+            if changed:
+                self._save(manifest)
+            return manifest
+
+    def version(self):
+        """Number that changes whenever asset URLs may have; cache keys of HTML holding them include it"""
+        self.manifest()
+        return self._version
+
+    def url(self, name):
+        """URL of the fingerprinted copy of static/<name> (the plain /static URL if it can't be built)"""
+        entry = self.manifest().get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._manifest.get(name)
+                if entry is None:
+                    try:
+                        entry = self._build_one(name)
+                    except OSError as e:
+                        logger.error(f"Error building asset {name}: {e}")
+                        return f"/static/{name}"
+                    self._save(dict(self._manifest, **{name: entry}))
+        return f"/assets/{entry['hashed']}"
+
+    def resolve(self, hashed, accept_encoding=""):
+        """(path, content encoding or None) of the best variant of a built file, or None"""
+        if hashed.endswith((".gz", ".br")) or ".." in hashed.split("/") or os.path.isabs(hashed):
+            return None
+        path = os.path.join(self.build_dir, *hashed.split("/"))
+        if not os.path.isfile(path) or os.path.basename(hashed) == MANIFEST_NAME:
+            return None
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    @staticmethod
+    def mimetype(hashed):
+        return mimetypes.guess_type(hashed)[0] or "application/octet-stream"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets into static/build")
+    parser.add_argument("--clean", action="store_true", help="remove build files no longer referenced")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    manifest = AssetPipeline().build(clean=args.clean)
+    for name, entry in manifest.items():
+        print(f"{name} -> {entry['hashed']} ({entry['size']} bytes, {', '.join(entry['encodings']) or 'uncompressed'})")
+    if brotli is None:
+        print("brotli is not installed: only gzip variants were written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
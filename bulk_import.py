@@ -0,0 +1,204 @@
+"""
+Bulk import of completion history, e.g. from another habit tracker.
+
+    python bulk_import.py history.csv [--user ann] [--format csv|ndjson] [--no-create] [--points 10]
+    POST /api/import   the file as upload field "file" or as the request body
+
+One completion per CSV row (with a header) or JSON line:
+
+    date    YYYY-MM-DD (a full ISO timestamp is cut to its day)
+    habit   habit name (or habit_name), matched ignoring case; missing habits
+            are created unless --no-create
+    user    (or user_name) who completed it; --user for rows without one
+
+Files written by /export import as they are: only their "event" records are
+read. .gz files are decompressed on the fly.
+
+Rows are parsed as a stream and handled TRACKIT_IMPORT_CHUNK_ROWS at a time:
+each chunk is validated, its habit names resolved (new habits are created in
+one unit of work) and committed as one journaled unit of work that appends
+its completions to the event log and adds them to habit stats, points and
+category counts, so the cost grows linearly with the file. Completions
+already recorded, before the import or earlier in the file, are skipped.
+A crash mid-chunk is finished by journal recovery and importing the file
+again only adds what is missing. Rewards and the leaderboard are updated
+once at the end.
+"""
+import io
+import os
+import sys
+import csv
+import gzip
+import json
+import logging
+import argparse
+from datetime import date
+try:
+    from . import data_manager
+    from .event_store import to_ordinal
+except Exception:
+    import data_manager
+    from event_store import to_ordinal
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_ROWS = int(os.environ.get("TRACKIT_IMPORT_CHUNK_ROWS", "10000"))
+IMPORT_FORMATS = ("csv", "ndjson")
+# Invalid rows reported back individually; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+HABIT_NAME_MAX_LEN = 100
+
+
+def detect_format(filename="", content_type=""):
+    """'ndjson' for .jsonl/.ndjson files or a JSON-lines content type, else 'csv'"""
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "json" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def open_text(stream, filename=""):
+    """Text reader over a binary stream, decompressing .gz files"""
+    if (filename or "").lower().endswith(".gz"):
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def iter_rows(text, fmt="csv"):
+    """Yield (line number, row dict or None if unparseable) from a text stream"""
+    if fmt == "ndjson":
+        for line_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield line_no, row if isinstance(row, dict) else None
+        return
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_row(row, user_name=None, force_user=False, today=None):
+    """(day ordinal, habit name, user name) for one row, or raise ValueError"""
+    if row is None:
+        raise ValueError("not a CSV row or JSON object")
+    ordinal = to_ordinal(row.get("date") or "")
+    if ordinal is None:
+        raise ValueError(f"invalid date {row.get('date')!r}")
+    if ordinal > (today or date.today()).toordinal():
+        raise ValueError("date is in the future")
+    habit_name = str(row.get("habit") or row.get("habit_name") or "").strip()
+    if not habit_name:
+        raise ValueError("missing habit name")
+    if len(habit_name) > HABIT_NAME_MAX_LEN:
+        raise ValueError("habit name is too long")
+    if force_user:
+        user = user_name
+    else:
+        user = str(row.get("user") or row.get("user_name") or "").strip() or user_name
+    return ordinal, habit_name, user or ""
+
+
+class ImportReport:
+    """Counts for one import plus the first MAX_REPORTED_ERRORS invalid rows"""
+
+    def __init__(self):
+        self.rows = self.imported = self.duplicates = self.invalid = 0
+        self.habits_created = []
+        self.errors = []
+        self.points = {}
+
+    def reject(self, line_no, reason):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": str(reason)})
+
+    def as_dict(self):
+        return {"rows": self.rows, "imported": self.imported, "duplicates": self.duplicates,
+                "invalid": self.invalid, "habits_created": self.habits_created,
+                "errors": self.errors, "points": self.points}
+
+
+def _import_chunk(chunk, report, imported, create_habits, points_per_event):
+    ids, created = data_manager.resolve_habit_ids({habit_name for _l, _o, habit_name, _u in chunk},
+                                                  create=create_habits)
+    report.habits_created.extend(created)
+    rows = []
+    for line_no, ordinal, habit_name, user in chunk:
+        habit_id = ids.get(habit_name)
+        if habit_id is None:
+            report.reject(line_no, f"unknown habit {habit_name!r}")
+        else:
+            rows.append((ordinal, habit_id, user))
+    if not rows:
+        return
+    written = data_manager.unit_of_work().import_events(rows, points_per_event).commit()[0]
+    report.imported += written
+    report.duplicates += len(rows) - written
+    imported.update((user, habit_id) for _o, habit_id, user in rows)
+
+
+def import_history(text, fmt="csv", user_name=None, force_user=False, create_habits=True,
+                   points_per_event=10, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import completions from a text stream; returns an ImportReport.
+    `user_name` is used for rows without a user (for every row with `force_user`).
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    report = ImportReport()
+    # (user, habit_id) pairs whose rewards finish_import() evaluates
+    imported = set()
+    chunk = []
+    today = date.today()
+    for line_no, row in iter_rows(text, fmt):
+        # Export files carry habit, points and reward records too
+        if row is not None and row.get("record", "event") != "event":
+            continue
+        report.rows += 1
+        try:
+            ordinal, habit_name, user = parse_row(row, user_name, force_user, today)
+        except ValueError as e:
+            report.reject(line_no, e)
+            continue
+        chunk.append((line_no, ordinal, habit_name, user))
+        if len(chunk) >= chunk_rows:
+            _import_chunk(chunk, report, imported, create_habits, points_per_event)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, report, imported, create_habits, points_per_event)
+    report.points = data_manager.finish_import(imported)
+    logger.info(f"Imported {report.imported} of {report.rows} rows "
+                f"({report.duplicates} duplicates, {report.invalid} invalid, "
+                f"{len(report.habits_created)} habits created)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import completion history from a CSV or JSON-lines file")
+    parser.add_argument("path", help="file to import (.csv, .jsonl or .ndjson, optionally .gz)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None, help="default: from the file name")
+    parser.add_argument("--user", default=None, help="user for rows without one")
+    parser.add_argument("--force-user", action="store_true", help="credit every row to --user")
+    parser.add_argument("--no-create", action="store_true", help="reject rows for habits that do not exist")
+    parser.add_argument("--points", type=int, default=10, help="points per imported completion (0 for none)")
+    parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    data_manager.recover_journal()
+    with open(args.path, "rb") as f:
+        report = import_history(open_text(f, args.path), args.format or detect_format(args.path),
+                                user_name=args.user, force_user=args.force_user,
+                                create_habits=not args.no_create, points_per_event=args.points,
+                                chunk_rows=max(1, args.chunk_rows))
+    print(json.dumps(report.as_dict(), indent=2, ensure_ascii=False))
+    return 1 if report.invalid and not report.imported else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
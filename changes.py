@@ -0,0 +1,188 @@
+"""
+Change feed for delta sync: GET /api/changes?since=N.
+
+A ChangeLog watches SnapshotManager publish new versions and records which
+entities changed between them: habits (by habit id), per-month calendar
+rollups (for each user and for everyone), user points and rewards, the
+leaderboard and the dashboard summary. Every published version gets one
+sequence number: the microsecond time its snapshot read the data files
+(Snapshot.checked_at, forced monotonic), so one cursor covers every kind
+of change and cursors keep growing across restarts.
+
+The log is compacted as it goes: an entity keeps only its latest entry, so
+the log never holds more than the current entities plus a bounded number of
+deletion tombstones (TRACKIT_CHANGE_TOMBSTONES). A cursor older than the
+oldest dropped tombstone, or from before a restart (different `epoch`),
+gets `reset: true` and the full current state instead of a delta.
+
+The log lives in memory and is not persisted; a restart only costs
+clients one full resync. serve.py's worker processes each keep their own
+log, all with the epoch of the log the master built before forking, and
+a poll may reach any of them. That works because the cursor handed out is
+the last time this process checked the data files, not the newest
+sequence number: every write finished before it is in this process's
+snapshot (so the client has it), and any worker publishes a later write
+under a later sequence number. A client moving between workers may get an
+entity it already has once more, never miss one.
+
+Points, rewards and per-user calendar rollups belong to one user and are
+only returned to that user (`since(..., user_name=)`); habits, the summary,
+everyone's calendar and the leaderboard go to every client.
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+CHANGE_TOMBSTONES = int(os.environ.get("TRACKIT_CHANGE_TOMBSTONES", "1000"))
+
+
+def _part_entities(snapshot, part):
+    """{(type, id): data} for one snapshot part"""
+    if part == "habits":
+        entities = {("habit", h.get("habit_id")): dict(h) for h in snapshot.habits}
+        entities[("summary", "")] = {"overall_rate": snapshot.overall_rate, "weekly": snapshot.weekly}
+        return entities
+    if part == "calendar":
+        return dict(_calendar_entity(key, counts) for key, counts in snapshot.calendar.items())
+    if part == "points":
+        return {
+            ("points", user): {"user_name": user, "points": data.get("points", 0), "rewards": data.get("rewards", [])}
+            for user, data in snapshot.points.items()
+        }
+    if part == "leaderboard":
+        return {("leaderboard", ""): {"top": snapshot.leaderboard}}
+    return {}
+
+
+def _calendar_entity(key, counts):
+    """((type, id), data) for one calendar rollup; counts None for a deletion"""
+    y, m, user = key
+    # "2026-10" is everyone's rollup, "2026-10/ann" one user's ("2026-10/" for anonymous events)
+    entity_id = f"{y:04d}-{m:02d}" if user is None else f"{y:04d}-{m:02d}/{user}"
+    data = None if counts is None else {"month": f"{y:04d}-{m:02d}", "user_name": user, "counts": counts}
+    return ("calendar", entity_id), data
+
+
+def _calendar_changes(old, new):
+    """Changed calendar entities; rollups the snapshot reused (the same dict) are skipped unread"""
+    changes = [_calendar_entity(key, counts) for key, counts in new.items()
+               if old.get(key) is not counts and old.get(key) != counts]
+    changes.extend(_calendar_entity(key, None) for key in old if key not in new)
+    return changes
+
+
+# Snapshot parts that feed the change log (the reminder is not synced)
+SYNCED_PARTS = ("habits", "calendar", "points", "leaderboard")
+
+
+def _owner(kind, entity_id):
+    """User an entity belongs to, or None if every client may see it"""
+    if kind == "points":
+        return entity_id
+    if kind == "calendar" and "/" in entity_id:
+        # Anonymous events ("2026-10/") count for nobody in particular
+        return entity_id.split("/", 1)[1] or None
+    return None
+
+
+class ChangeLog:
+    """Compacted, sequence-numbered log of entity changes between snapshot versions"""
+
+    def __init__(self, snapshots=None, max_tombstones=CHANGE_TOMBSTONES):
+        self.max_tombstones = max(0, int(max_tombstones))
+        self._lock = threading.Lock()
+        # (type, id) -> (seq, data), oldest first; data None marks a deletion
+        self._entries = OrderedDict()
+        self._tombstones = 0
+        self._seq = 0
+        # Cursors below this may have missed a compacted deletion
+        self.floor = 0
+        self.epoch = None
+        self._snapshots = snapshots
+        if snapshots is not None:
+            snapshots.add_publish_listener(self.observe)
+
+    def _next_seq(self):
+        self._seq = max(self._seq + 1, time.time_ns() // 1000)
+        return self._seq
+
+    def observe(self, previous, snapshot):
+        """Publish listener: record what changed from `previous` to `snapshot`, at its checked_at"""
+        changes = []
+        for part in SYNCED_PARTS:
+            old_part = getattr(previous, part, None) if previous is not None else None
+            # Copy-on-write: an untouched part is the very same object
+            if previous is not None and getattr(snapshot, part) is old_part:
+                continue
+            if part == "calendar" and previous is not None:
+                changes.extend(_calendar_changes(old_part, snapshot.calendar))
+                continue
+            old = _part_entities(previous, part) if previous is not None else {}
+            new = _part_entities(snapshot, part)
+            changes.extend((key, data) for key, data in new.items() if old.get(key) != data)
+            changes.extend((key, None) for key in old if key not in new)
+        if changes or previous is None:
+            self.record(changes, snapshot.checked_at)
+
+    def record(self, changes, seq=None):
+        """Record [((type, id), data or None)] under one new sequence number (at least `seq`); returns it"""
+        with self._lock:
+            seq = self._seq = max(self._seq + 1, seq) if seq else self._next_seq()
+            if self.epoch is None:
+                # Everything before the first snapshot is unknown to this process
+                self.epoch = self.floor = seq
+            for key, data in changes:
+                old = self._entries.pop(key, None)
+                if old is not None and old[1] is None:
+                    self._tombstones -= 1
+                self._entries[key] = (seq, data)
+                if data is None:
+                    self._tombstones += 1
+            self._compact()
+            return seq
+
+    def _compact(self):
+        if self._tombstones <= self.max_tombstones:
+            return
+        excess = self._tombstones - self.max_tombstones
+        for key, (seq, data) in list(self._entries.items()):
+            if excess <= 0:
+                break
+            if data is None:
+                del self._entries[key]
+                self._tombstones -= 1
+                self.floor = max(self.floor, seq)
+                excess -= 1
+
+    def cursor(self):
+        """Poll position: the newest sequence number, or the latest time the snapshots were
+        checked if that is later (see the module docstring)
+        """
+        checked_at = getattr(self._snapshots, "checked_at", 0)
+        return max(self._seq, checked_at)
+
+    def since(self, cursor, epoch=None, user_name=None):
+        """Changes after `cursor` as {"cursor", "epoch", "reset", "changes"}.
+        With reset true the changes are the complete current state. User-scoped
+        entities of anyone but `user_name` are left out.
+        """
+        with self._lock:
+            reset = cursor <= 0 or cursor < self.floor or (epoch is not None and epoch != self.epoch)
+            changes = []
+            # Newest entries are at the end; an idle poll stops at the first one
+            for (kind, entity_id), (seq, data) in reversed(self._entries.items()):
+                if not reset and seq <= cursor:
+                    break
+                if reset and data is None:
+                    continue
+                owner = _owner(kind, entity_id)
+                if owner is not None and owner != user_name:
+                    continue
+                changes.append({"seq": seq, "type": kind, "id": entity_id, "data": data})
+            changes.reverse()
+            return {"cursor": self.cursor(), "epoch": self.epoch, "reset": reset, "changes": changes}
@@ -0,0 +1,155 @@
+"""
+Shared keyword classifier for habit icons, reward categories and mock chat replies.
+
+Each table is an ordered list of (label, keywords). A KeywordClassifier
+compiles a whole table into one regular expression: a lookahead alternation
+tried at every position of the text, with keywords ordered by their label's
+priority, so a single scan finds the highest-priority label whose keyword
+occurs anywhere in the text. That is the same answer as checking the labels
+one by one with `keyword in text`, without one pass per keyword. Results are
+memoized per text in a bounded LRU cache (TRACKIT_CLASSIFIER_CACHE).
+
+Extra labels and keywords can be added from a JSON file
+(TRACKIT_CLASSIFIER_FILE, default data/classifier.json):
+
+    {"icon": {"running.svg": ["swim"], "default.svg": []},
+     "reward": {"cook": ["cook", "meal"]}}
+
+Keywords for an existing label extend it; new labels rank after the
+built-in ones. They are compiled into the same expression, so adding
+categories does not add passes over the text.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from functools import lru_cache
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_FILE = os.environ.get(
+    "TRACKIT_CLASSIFIER_FILE", os.path.join(os.path.dirname(__file__), "data", "classifier.json")
+)
+CACHE_SIZE = int(os.environ.get("TRACKIT_CLASSIFIER_CACHE", "4096"))
+# The config file is checked for changes at most this often
+CONFIG_CHECK_SECONDS = 2.0
+
+DEFAULT_TABLES = {
+    # Habit name -> icon in static/images
+    "icon": [
+        ("meditation.svg", ["medit", "medita", "yoga"]),
+        ("running.svg", ["run", "jog", "walk", "exercise"]),
+        ("reading.svg", ["read", "book", "pages"]),
+        ("water.svg", ["water", "drink"]),
+    ],
+    # Habit name -> gui.REWARD_CATEGORIES key
+    "reward": [
+        (category, [category])
+        for category in ("exercise", "read", "medita", "yoga", "water", "sleep", "work", "learn")
+    ],
+    # Chat message -> canned reply intent (see app.get_mock_response)
+    "intent": [
+        ("tips", ["improve", "better", "tips", "help", "advice"]),
+        ("motivation", ["motivation", "motivate", "inspire", "encourage"]),
+        ("progress", ["streak", "progress", "doing", "how"]),
+        ("struggle", ["slack", "skip", "break", "hard", "difficult", "struggle"]),
+    ],
+}
+
+
+class KeywordClassifier:
+    """Label of the highest-priority keyword contained in a text (case-insensitive)"""
+
+    def __init__(self, table, cache_size=CACHE_SIZE):
+        self.labels = [label for label, _keywords in table]
+        keywords = {}
+        for priority, (_label, words) in enumerate(table):
+            for word in words:
+                word = str(word).lower()
+                if word:
+                    keywords.setdefault(word, priority)
+        # At each position the alternatives are tried in priority order
+        ordered = sorted(keywords, key=lambda w: (keywords[w], -len(w)))
+        self._priority = keywords
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(w) for w in ordered) + "))") if ordered else None
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, text):
+        if self._pattern is None or not text:
+            return None
+        best = None
+        for match in self._pattern.finditer(text.lower()):
+            priority = self._priority[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return self.labels[best] if best is not None else None
+
+    def __call__(self, text, default=None):
+        label = self.classify(text or "")
+        return default if label is None else label
+
+
+def merge_tables(base, extra):
+    """Built-in table plus config entries ({label: [keywords]})"""
+    table = [(label, list(words)) for label, words in base]
+    index = {label: i for i, (label, _words) in enumerate(table)}
+    for label, words in (extra or {}).items():
+        if label in index:
+            table[index[label]][1].extend(words)
+        else:
+            index[label] = len(table)
+            table.append((label, list(words)))
+    return table
+
+
+def load_config(path=None):
+    path = path or CLASSIFIER_FILE
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"Error loading classifier config from {path}: {e}")
+    return {}
+
+
+_classifiers = {"signature": None, "checked": 0.0, "tables": {}}
+_lock = threading.Lock()
+
+
+def _config_signature():
+    try:
+        st = os.stat(CLASSIFIER_FILE)
+        return (CLASSIFIER_FILE, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (CLASSIFIER_FILE, None, None)
+
+
+def get_classifier(table):
+    """Shared classifier for a DEFAULT_TABLES entry plus its config additions"""
+    now = time.monotonic()
+    if now - _classifiers["checked"] >= CONFIG_CHECK_SECONDS:
+        signature = _config_signature()
+        with _lock:
+            _classifiers["checked"] = now
+            if signature != _classifiers["signature"]:
+                _classifiers.update(signature=signature, tables={})
+    classifier = _classifiers["tables"].get(table)
+    if classifier is None:
+        with _lock:
+            classifier = _classifiers["tables"].get(table)
+            if classifier is None:
+                extra = load_config().get(table)
+                classifier = KeywordClassifier(merge_tables(DEFAULT_TABLES.get(table, []), extra))
+                _classifiers["tables"][table] = classifier
+    return classifier
+
+
+def classify(table, text, default=None):
+    """Label for `text` from the named table, or `default`"""
+    return get_classifier(table)(text, default)
@@ -0,0 +1,244 @@
+"""
+Per-(user, habit) completion bitmaps.
+
+Bit i of a bitmap is set when the habit was completed on day `base + i`,
+where days are date.toordinal() values. Recording is idempotent (setting a
+bit twice is a no-op), so duplicates disappear. Streaks become a backwards
+scan over set bits, and calendar counts become popcounts over a bit range.
+A year of history costs 46 bytes per (user, habit) pair.
+"""
+import threading
+
+_FULL_BYTE = 0xFF
+
+
+class Bitmap:
+    """Growable day-indexed bitset"""
+
+    __slots__ = ("base", "bits")
+
+    def __init__(self, ordinal):
+        self.base = ordinal - ordinal % 8
+        self.bits = bytearray(1)
+
+    def _grow(self, ordinal):
+        if ordinal < self.base:
+            new_base = ordinal - ordinal % 8
+            self.bits[0:0] = bytes((self.base - new_base) // 8)
+            self.base = new_base
+        offset = ordinal - self.base
+        if offset // 8 >= len(self.bits):
+            # Grow by at least a month so daily appends don't reallocate every day
+            self.bits.extend(bytes(max(offset // 8 + 1 - len(self.bits), 4)))
+
+    def add(self, ordinal):
+        """Set the bit for a day; returns True if it was not set before"""
+        self._grow(ordinal)
+        offset = ordinal - self.base
+        mask = 1 << (offset % 8)
+        if self.bits[offset // 8] & mask:
+            return False
+        self.bits[offset // 8] |= mask
+        return True
+
+    def discard(self, ordinal):
+        offset = ordinal - self.base
+        if 0 <= offset < len(self.bits) * 8:
+            self.bits[offset // 8] &= ~(1 << (offset % 8)) & _FULL_BYTE
+
+    def __contains__(self, ordinal):
+        offset = ordinal - self.base
+        if offset < 0 or offset >= len(self.bits) * 8:
+            return False
+        return bool(self.bits[offset // 8] & (1 << (offset % 8)))
+
+    def range_int(self, start, end):
+        """Bits for days [start, end) as an int whose bit 0 is `start`"""
+        lo = max(start, self.base)
+        hi = min(end, self.base + len(self.bits) * 8)
+        if lo >= hi:
+            return 0
+        first, last = (lo - self.base) // 8, (hi - self.base - 1) // 8
+        value = int.from_bytes(self.bits[first:last + 1], "little")
+        value >>= (lo - self.base) - first * 8
+        value &= (1 << (hi - lo)) - 1
+        return value << (lo - start)
+
+    def count(self, start, end):
+        """Number of completed days in [start, end)"""
+        return self.range_int(start, end).bit_count()
+
+    def run_ending_at(self, ordinal):
+        """Length of the run of consecutive set days ending at `ordinal`"""
+        offset = ordinal - self.base
+        if offset < 0:
+            return 0
+        if offset >= len(self.bits) * 8:
+            return 0
+        run = 0
+        byte_index, bit = divmod(offset, 8)
+        # Finish the partial byte bit by bit, then skip whole 0xFF bytes at once
+        while bit >= 0:
+            if not self.bits[byte_index] & (1 << bit):
+                return run
+            run += 1
+            bit -= 1
+        byte_index -= 1
+        while byte_index >= 0 and self.bits[byte_index] == _FULL_BYTE:
+            run += 8
+            byte_index -= 1
+        if byte_index >= 0:
+            byte = self.bits[byte_index]
+            bit = 7
+            while bit >= 0 and byte & (1 << bit):
+                run += 1
+                bit -= 1
+        return run
+
+    def union(self, base, bits):
+        """OR in another bitset given as (base, bytes); base is a multiple of 8"""
+        if not bits:
+            return
+        self._grow(base)
+        self._grow(base + len(bits) * 8 - 1)
+        start = (base - self.base) // 8
+        end = start + len(bits)
+        value = int.from_bytes(self.bits[start:end], "little") | int.from_bytes(bits, "little")
+        self.bits[start:end] = value.to_bytes(len(bits), "little")
+
+    def days(self):
+        """Set day ordinals in ascending order"""
+        value = int.from_bytes(self.bits, "little")
+        while value:
+            low = value & -value
+            yield self.base + low.bit_length() - 1
+            value ^= low
+
+    def nbytes(self):
+        return len(self.bits)
+
+
+class CompletionBitmaps:
+    """Bitmaps keyed by (user_name, habit_key)"""
+
+    def __init__(self):
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_name, habit, ordinal):
+        """Record a completion; returns False if it was already recorded"""
+        key = (user_name or '', habit)
+        with self._lock:
+            bitmap = self._maps.get(key)
+            if bitmap is None:
+                bitmap = self._maps[key] = Bitmap(ordinal)
+            return bitmap.add(ordinal)
+
+    def merge(self, user_name, habit, base, bits):
+        """OR a partial bitmap (e.g. from dump() of another instance) into this one"""
+        key = (user_name or '', habit)
+        with self._lock:
+            bitmap = self._maps.get(key)
+            if bitmap is None:
+                bitmap = self._maps[key] = Bitmap(base)
+            bitmap.union(base, bits)
+
+    def dump(self):
+        """Picklable [(user_name, habit, base, bytes)] rows; load() or merge() reverses it"""
+        return [(u, h, b.base, bytes(b.bits)) for (u, h), b in self.items()]
+
+    @classmethod
+    def load(cls, rows):
+        bitmaps = cls()
+        for user_name, habit, base, bits in rows:
+            bitmaps.merge(user_name, habit, base, bits)
+        return bitmaps
+
+    def discard(self, user_name, habit, ordinal):
+        bitmap = self._maps.get((user_name or '', habit))
+        if bitmap is not None:
+            with self._lock:
+                bitmap.discard(ordinal)
+
+    def is_done(self, user_name, habit, ordinal):
+        """Single bit test: was the habit completed by the user on that day?"""
+        bitmap = self._maps.get((user_name or '', habit))
+        return bitmap is not None and ordinal in bitmap
+
+    def _select(self, user_name=None, habit=None):
+        if user_name is not None and habit is not None:
+            bitmap = self._maps.get((user_name, habit))
+            return [bitmap] if bitmap is not None else []
+        return [b for (u, h), b in list(self._maps.items())
+                if (user_name is None or u == user_name) and (habit is None or h == habit)]
+
+    def merged(self, start, end, user_name=None, habit=None):
+        """OR of the selected bitmaps over [start, end) as an int"""
+        value = 0
+        for bitmap in self._select(user_name, habit):
+            value |= bitmap.range_int(start, end)
+        return value
+
+    def streak(self, habit, today, user_name=None):
+        """Consecutive completed days ending today (or yesterday if today isn't done yet)"""
+        bitmaps = self._select(user_name, habit)
+        if not bitmaps:
+            return 0
+        if len(bitmaps) == 1:
+            bitmap = bitmaps[0]
+            return bitmap.run_ending_at(today) or bitmap.run_ending_at(today - 1)
+        # Several users share the habit: scan the OR of their bitmaps, doubling the window
+        earliest = min(b.base for b in bitmaps)
+        span = 64
+        while True:
+            start = today + 1 - span
+            value = self.merged(start, today + 1, user_name, habit)  # bit span-1 is today
+            anchor = span - 1 if value >> (span - 1) & 1 else span - 2
+            if not value >> anchor & 1:
+                return 0
+            window = (1 << (anchor + 1)) - 1
+            zeros = ~value & window
+            if zeros or start <= earliest:
+                return anchor + 1 - zeros.bit_length()
+            span *= 2
+
+    def day_counts(self, start, end, user_name=None, habit=None):
+        """Return {offset: number of (user, habit) pairs completed} for days in [start, end)"""
+        counts = {}
+        for bitmap in self._select(user_name, habit):
+            value = bitmap.range_int(start, end)
+            while value:
+                low = value & -value
+                offset = low.bit_length() - 1
+                counts[offset] = counts.get(offset, 0) + 1
+                value ^= low
+        return counts
+
+    def user_day_counts(self, start, end):
+        """Return {user_name: {offset: count}} for days in [start, end) in one pass over the bitmaps"""
+        by_user = {}
+        for (user_name, _habit), bitmap in list(self._maps.items()):
+            value = bitmap.range_int(start, end)
+            counts = by_user.setdefault(user_name, {})
+            while value:
+                low = value & -value
+                offset = low.bit_length() - 1
+                counts[offset] = counts.get(offset, 0) + 1
+                value ^= low
+        return by_user
+
+    def count(self, start, end, user_name=None, habit=None):
+        """Total completions in [start, end) via popcount"""
+        return sum(b.count(start, end) for b in self._select(user_name, habit))
+
+    def keys(self):
+        return list(self._maps)
+
+    def items(self):
+        return list(self._maps.items())
+
+    def __len__(self):
+        return len(self._maps)
+
+    def nbytes(self):
+        return sum(b.nbytes() for b in self._maps.values())
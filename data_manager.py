@@ -1,8 +1,35 @@
-import pandas as pd
 import os
+import csv
 import json
+import time
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
+try:
+    import fcntl
+except ImportError:
+    # Windows: the production server (serve.py) runs one process there
+    fcntl = None
+try:
+    from .memtrack import track_memory
+    from .lazy_import import LazyModule
+    from .event_store import EventStore, EVENT_STORE_DIR, to_ordinal, month_key
+    from .completion_bitmaps import CompletionBitmaps
+    from .group_commit import GroupCommitter
+    from .rewards import reward_engine
+    from .habit_index import HabitNameIndex, fold
+except Exception:
+    from memtrack import track_memory
+    from lazy_import import LazyModule
+    from event_store import EventStore, EVENT_STORE_DIR, to_ordinal, month_key
+    from completion_bitmaps import CompletionBitmaps
+    from group_commit import GroupCommitter
+    from rewards import reward_engine
+    from habit_index import HabitNameIndex, fold
+
+# pandas is imported on first use so the app can start serving without it
+pd = LazyModule("pandas")
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -12,92 +39,228 @@ POINTS_FILE = os.path.join(os.path.dirname(__file__), "data", "points.json")
 LEADERBOARD_PATH = os.path.join(os.path.dirname(__file__), "data", "leaderboard.csv")
 EVENTS_PATH = os.path.join(os.path.dirname(__file__), "data", "events.csv")
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        df = pd.DataFrame(columns=["habit_name", "days_completed", "total_days", "last_date"])
-        df.to_csv(DATA_PATH, index=False)
-    df = pd.read_csv(DATA_PATH)
+HABIT_COLUMNS = ["habit_id", "habit_name", "days_completed", "total_days", "last_date", "deleted", "last_txn"]
+EVENT_COLUMNS = ["date", "habit_id", "user_name"]
+
+def _replace_file(path, write, sync=True):
+    """Write a store through a temp file: write(f), fsync, then rename over `path`,
+    so a crash leaves either the old or the new file, never a torn one.
+    Journaled commits pass sync=False: the journal is their durable copy until
+    _checkpoint() fsyncs the stores.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        write(f)
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _write_csv(df, path, sync=True):
+    _replace_file(path, lambda f: df.to_csv(f, index=False), sync)
+
+def _assign_habit_ids(df):
+    """Give rows without a habit_id the next free ids; returns True if any were assigned"""
+    if "habit_id" not in df.columns:
+        df.insert(0, "habit_id", None)
+    ids = pd.to_numeric(df["habit_id"], errors="coerce")
+    missing = ids.isna()
+    if missing.any():
+        start = int(ids.max()) + 1 if ids.notna().any() else 1
+        ids[missing] = range(start, start + int(missing.sum()))
+    df["habit_id"] = ids.astype(int)
+    return bool(missing.any())
+
+def _normalize_habits(df):
+    """Bring older habits.csv layouts up to HABIT_COLUMNS; returns (df, changed)"""
+    changed = _assign_habit_ids(df)
     if "last_date" not in df.columns:
         df["last_date"] = ""
+    df["last_date"] = df["last_date"].fillna("").astype(str)
+    for column in ("days_completed", "total_days"):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0).astype(int)
+    if "deleted" not in df.columns:
+        df["deleted"] = 0
+        changed = True
+    df["deleted"] = df["deleted"].fillna(0).astype(int)
+    # Sequence number of the last journaled transaction applied to the row (see UnitOfWork)
+    if "last_txn" not in df.columns:
+        df["last_txn"] = 0
+    df["last_txn"] = pd.to_numeric(df["last_txn"], errors="coerce").fillna(0).astype("int64")
+    ordered = [c for c in HABIT_COLUMNS if c in df.columns] + [c for c in df.columns if c not in HABIT_COLUMNS]
+    return df[ordered], changed
+
+def _load_habit_table():
+    """All habit rows, including deleted ones kept as tombstones for their history"""
+    if not os.path.exists(DATA_PATH):
+        df = pd.DataFrame(columns=HABIT_COLUMNS)
+        _write_csv(df, DATA_PATH)
+    df, changed = _normalize_habits(pd.read_csv(DATA_PATH))
+    if changed:
+        # Persist newly assigned ids right away so they stay stable
+        _write_csv(df, DATA_PATH)
     return df
 
+@track_memory
+def load_data():
+    """Active habits (tombstoned rows filtered out)"""
+    df = _load_habit_table()
+    return df[df["deleted"] == 0].reset_index(drop=True)
+
 def save_data(df):
-    df.to_csv(DATA_PATH, index=False)
+    """Save habits; tombstones not present in `df` are carried over from disk.
+    Replaces the whole table under the transaction lock; single changes go through unit_of_work().
+    """
+    df = df.copy()
+    with _txn_guard():
+        if os.path.exists(DATA_PATH):
+            table = _load_habit_table()
+            tombstones = table[table["deleted"] == 1]
+            if "habit_id" in df.columns:
+                tombstones = tombstones[~tombstones["habit_id"].isin(pd.to_numeric(df["habit_id"], errors="coerce"))]
+            if not tombstones.empty:
+                df = pd.concat([df, tombstones], ignore_index=True)
+        _write_habit_table(df)
+    _notify_change("habits")
+
+def _write_habit_table(df, sync=True):
+    """Write the full habit table (tombstones included) without notifying listeners"""
+    df, _ = _normalize_habits(df)
+    _write_csv(df, DATA_PATH, sync)
+    _habit_ids["signature"] = None
+
+# --- Change notification ---
+
+# Callbacks taking a tuple of changed kinds ("habits", "events", "points",
+# "leaderboard"); snapshot.py uses them to publish a new read model
+_change_listeners = []
+
+def add_change_listener(callback):
+    _change_listeners.append(callback)
+
+# Counts changes made by any process sharing it (serve.py's workers, see share_change_generation),
+# so each can tell another one wrote since it last looked
+_change_generation = {"value": None}
+
+def share_change_generation():
+    """Create the change counter in shared memory; call before forking the processes that share it"""
+    import multiprocessing
+    _change_generation["value"] = multiprocessing.Value("Q", 0)
+
+def change_generation():
+    shared = _change_generation["value"]
+    return shared.value if shared is not None else 0
+
+def _notify_change(*kinds):
+    shared = _change_generation["value"]
+    if shared is not None:
+        with shared.get_lock():
+            shared.value += 1
+    for callback in list(_change_listeners):
+        try:
+            callback(kinds)
+        except Exception as e:
+            logger.error(f"Change listener error for {kinds}: {e}")
+
+# Callbacks taking the (ordinal, habit_id, user_name) completions a write just added to the
+# completion index, so readers can update their rollups for those days and users only
+_event_listeners = []
+
+def add_event_listener(callback):
+    _event_listeners.append(callback)
 
+# name <-> id lookups, refreshed whenever habits.csv changes on disk (so after every add, rename
+# and delete); "index" is the case-insensitive HabitNameIndex of active habits
+_habit_ids = {"signature": None, "active": {}, "history": {}, "names": {}, "index": HabitNameIndex()}
+
+def _habit_lookup():
+    signature = None
+    try:
+        st = os.stat(DATA_PATH)
+        signature = (DATA_PATH, st.st_mtime_ns, st.st_size)
+    except OSError:
+        pass
+    if signature is None or _habit_ids["signature"] != signature:
+        df = _load_habit_table()
+        active, history, names = {}, {}, {}
+        for row in df.itertuples(index=False):
+            hid, name = int(row.habit_id), str(row.habit_name)
+            names[hid] = name
+            history.setdefault(name, hid)
+            if not row.deleted:
+                active[name] = hid
+                history[name] = hid
+        _habit_ids.update(active=active, history=history, names=names, index=HabitNameIndex(active.items()),
+                          signature=signature)
+    return _habit_ids
+
+def get_habit_id(habit_name, include_deleted=False):
+    """Integer id of the active habit with this exact name (or None)"""
+    lookup = _habit_lookup()
+    table = lookup["history"] if include_deleted else lookup["active"]
+    return table.get(str(habit_name))
+
+def get_habit_name(habit_id):
+    """Current name for a habit id (deleted habits keep their last name)"""
+    return _habit_lookup()["names"].get(int(habit_id))
+
+def habit_exists(habit_name):
+    """True if an active habit has this name, ignoring case"""
+    return habit_name in _habit_lookup()["index"]
+
+def suggest_habits(prefix, limit=10):
+    """Active habits whose name starts with `prefix` (case-insensitive), alphabetically"""
+    return [{"habit_id": hid, "habit_name": name} for name, hid in _habit_lookup()["index"].suggest(prefix, limit)]
+
+@track_memory
 def mark_habit_done(habit_name):
-    df = load_data()
-    # normalize dtypes to avoid assignment errors when CSV had empty/NaN columns
-    if "last_date" in df.columns:
-        df["last_date"] = df["last_date"].fillna("").astype(str)
-    else:
-        df["last_date"] = ""
-    df["days_completed"] = df["days_completed"].fillna(0).astype(int)
-    df["total_days"] = df["total_days"].fillna(0).astype(int)
-    today = str(date.today())
-
-    for i, row in df.iterrows():
-        if row["habit_name"] == habit_name:
-            if str(row["last_date"]) != today:
-                df.at[i, "days_completed"] += 1
-                df.at[i, "total_days"] += 1
-                df.at[i, "last_date"] = today
-            else:
-                return "Already marked today ✅"
-            break
-    save_data(df)
-    return "Updated successfully ✅"
+    msg, = unit_of_work().mark_done(habit_name).commit()
+    return msg
 
+@track_memory
 def skip_habit(habit_name):
-    df = load_data()
-    df["total_days"] = df["total_days"].fillna(0).astype(int)
-    df["last_date"] = df["last_date"].fillna("").astype(str)
-    for i, row in df.iterrows():
-        if row["habit_name"] == habit_name:
-            df.at[i, "total_days"] = int(df.at[i, "total_days"]) + 1
-            break
-    save_data(df)
-    return "Skipped ❌"
+    msg, = unit_of_work().skip(habit_name).commit()
+    return msg
 
+@track_memory
 def delete_habit(habit_name):
-    """Delete a habit from the database"""
+    """Delete a habit (tombstoned so its event history stays attached to the id)"""
     try:
-        df = load_data()
-        df = df[df["habit_name"] != habit_name]
-        save_data(df)
+        msg, = unit_of_work().delete_habit(habit_name).commit()
+        if msg != "Habit deleted":
+            logger.warning(f"Cannot delete habit {habit_name}: {msg}")
+            return False
         logger.info(f"Habit deleted: {habit_name}")
         return True
     except Exception as e:
         logger.error(f"Error deleting habit {habit_name}: {e}")
         return False
 
+@track_memory
 def edit_habit(old_name, new_name):
-    """Rename a habit in the database"""
+    """Rename a habit; events reference its id, so history is untouched.
+    Another habit with the same name in any case blocks the rename (changing case is fine).
+    """
     try:
-        df = load_data()
-        # Check if new name already exists
-        if new_name in df["habit_name"].values and new_name != old_name:
-            logger.warning(f"Cannot rename: habit '{new_name}' already exists")
+        msg, = unit_of_work().rename_habit(old_name, new_name).commit()
+        if msg != "Habit renamed":
+            logger.warning(f"Cannot rename habit {old_name} → {new_name}: {msg}")
             return False
-        
-        # Rename the habit
-        df.loc[df["habit_name"] == old_name, "habit_name"] = new_name
-        save_data(df)
         logger.info(f"Habit renamed: {old_name} → {new_name}")
         return True
     except Exception as e:
         logger.error(f"Error renaming habit {old_name}: {e}")
         return False
 
+@track_memory
 def add_new_habit(habit_name):
-    df = load_data()
-    if habit_name in list(df["habit_name"]):
-        return "Habit already exists!"
-    new_row = {"habit_name": habit_name, "days_completed": 0, "total_days": 0, "last_date": ""}
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    save_data(df)
-    return f"Habit '{habit_name}' added successfully!"
+    msg, = unit_of_work().add_habit(habit_name).commit()
+    return msg
 
 
+@track_memory
 def get_weekly_data():
     """Return 7-day history of completion rates"""
     df = load_data()
@@ -111,6 +274,7 @@ def get_weekly_data():
         results.append((day, rate))
     return dates, results
 
+@track_memory
 def load_user_points():
     """Load user points from JSON file"""
     try:
@@ -123,160 +287,1116 @@ def load_user_points():
         return {}
 
 def save_user_points(points_data):
-    """Save user points to JSON file"""
+    """Save user points to JSON file (the whole file, under the transaction lock)"""
     try:
-        os.makedirs(os.path.dirname(POINTS_FILE), exist_ok=True)
-        with open(POINTS_FILE, "w") as f:
-            json.dump(points_data, f, indent=2)
+        with _txn_guard():
+            _write_points(points_data)
+        _notify_change("points")
     except IOError as e:
         logger.error(f"Error saving points: {e}")
 
+def _write_points(points_data, sync=True):
+    _replace_file(POINTS_FILE, lambda f: json.dump(points_data, f, indent=2), sync)
+
+@track_memory
 def add_points(user_name, points=10):
     """Add points to user and return total"""
-    data = load_user_points()
-    if user_name not in data:
-        data[user_name] = {"points": 0, "rewards": []}
-    current_points = int(data[user_name].get("points", 0))
-    data[user_name]["points"] = current_points + int(points)
-    data[user_name]["last_point_earned"] = datetime.now().isoformat()  # Timestamp
-    save_user_points(data)
-    return data[user_name]["points"]
+    total, = unit_of_work().add_points(user_name, points).commit()
+    return total
 
+@track_memory
 def check_rewards(user_name):
     """Return new rewards if milestones reached. Rewards now include earned_at timestamp."""
-    milestones = {50: "Bronze Badge 🥉", 100: "Silver Badge 🥈", 200: "Gold Badge 🥇"}
-    data = load_user_points()
-    user_data = data.get(user_name, {"points": 0, "rewards": []})
-    new_rewards = []
-    current_points = int(user_data.get("points", 0))
-    
-    # Normalize existing rewards to handle both string and dict formats
-    existing_rewards = user_data.get("rewards", [])
-    reward_names = [r if isinstance(r, str) else r.get("name", "") for r in existing_rewards]
-    
-    for points, reward_name in milestones.items():
-        if current_points >= points and reward_name not in reward_names:
-            reward_obj = {
-                "name": reward_name,
-                "earned_at": datetime.now().isoformat(),
-                "points_at_earn": current_points
-            }
-            user_data["rewards"].append(reward_obj)
-            new_rewards.append(reward_name)
-            logger.info(f"User {user_name} earned reward: {reward_name} at {current_points} points")
-    
-    if new_rewards:
-        data[user_name] = user_data
-        save_user_points(data)
-    
+    new_rewards, = unit_of_work().check_rewards(user_name).commit()
     return new_rewards
 
-def calculate_streak(habit_name):
+def _award_rewards(user_name, user_data, habit_id=None, completed=False):
+    """Append newly reached rewards (see rewards.py) to user_data in place; returns their names.
+    With `habit_id`, streak rules use the user's own streak on that habit; `completed`
+    counts a new completion towards its category.
+    """
+    engine = reward_engine()
+    streak = category = count = None
+    if habit_id is not None:
+        streak = _streak(int(habit_id), date.today().toordinal(), user_name=user_name)
+        category = engine.category_of(get_habit_name(habit_id))
+        if category is not None:
+            counts = user_data.setdefault("category_counts", {})
+            if completed:
+                counts[category] = int(counts.get(category, 0)) + 1
+            count = counts.get(category, 0)
+    return engine.evaluate(user_name, user_data, points=user_data.get("points", 0),
+                           streak=streak, category=category, category_count=count)
+
+@track_memory
+def calculate_streak(habit_name, habit_id=None):
     """Calculate current streak (consecutive days) for a habit"""
     try:
-        _ensure_events()
-        df = pd.read_csv(EVENTS_PATH)
-        if df.empty:
-            return 0
-        
-        # Filter for this habit
-        filt = df[df["habit_name"] == habit_name].copy()
-        if filt.empty:
-            return 0
-        
-        # Convert to datetime and sort
-        filt["date"] = pd.to_datetime(filt["date"], errors="coerce")
-        filt = filt.dropna(subset=["date"])
-        if filt.empty:
-            return 0
-        
-        filt = filt.sort_values("date", ascending=False)
-        dates = filt["date"].dt.date.unique()
-        
-        # Calculate streak from today backwards
-        today = date.today()
-        streak = 0
-        current_date = today
-        
-        for d in dates:
-            if d == current_date or d == current_date - timedelta(days=1):
-                streak += 1
-                current_date = d
-            else:
-                break
-        
-        return streak
+        if habit_id is None:
+            habit_id = get_habit_id(habit_name)
+            if habit_id is None:
+                return 0
+        return _streak(int(habit_id), date.today().toordinal())
     except Exception as e:
         logger.error(f"Error calculating streak for {habit_name}: {e}")
         return 0
 
+def _streak(habit_id, today, user_name=None):
+    """Streak ending today (or yesterday if today isn't done yet), loading months backwards only as far as it reaches.
+    With `user_name` only that user's completions count; otherwise anyone's do.
+    """
+    store = _event_store()
+    if store is None:
+        return completion_index().streak(habit_id, today, user_name=user_name)
+    available = set(store.partitions())
+    months = {month_key(today), month_key(today - 1)}
+    while True:
+        streak = completion_index(months).streak(habit_id, today, user_name=user_name)
+        # The day before the run decides whether it continues into an unloaded month
+        boundary = month_key(today - streak - 1)
+        if boundary in months or boundary not in available:
+            return streak
+        months.add(boundary)
+
 # --- Completion events logging for calendar / history ---
 
+_event_stores = {}
+
+def _event_store():
+    """Columnar event store if data/event_store exists (see event_store.py), else None"""
+    if not EventStore.exists(EVENT_STORE_DIR):
+        return None
+    if EVENT_STORE_DIR not in _event_stores:
+        store = EventStore(EVENT_STORE_DIR)
+        store.upgrade_habit_codes(_history_habit_id)
+        _event_stores[EVENT_STORE_DIR] = store
+    return _event_stores[EVENT_STORE_DIR]
+
+def _history_habit_id(habit_name):
+    """Id for a name found in old event history, creating a tombstone if the habit is gone"""
+    habit_id = get_habit_id(habit_name, include_deleted=True)
+    if habit_id is None:
+        df = _load_habit_table()
+        new_row = {"habit_name": habit_name, "days_completed": 0, "total_days": 0, "last_date": "", "deleted": 1}
+        save_data(pd.concat([df, pd.DataFrame([new_row])], ignore_index=True))
+        habit_id = get_habit_id(habit_name, include_deleted=True)
+    return habit_id
+
+def _migrate_event_names():
+    """Rewrite a name-based events.csv (date,habit_name,user_name) to habit ids"""
+    with open(EVENTS_PATH, "r", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    tmp = EVENTS_PATH + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(EVENT_COLUMNS)
+        for row in rows:
+            writer.writerow([row.get("date", ""), _history_habit_id(row.get("habit_name") or ""), row.get("user_name") or ""])
+    os.replace(tmp, EVENTS_PATH)
+    logger.info(f"Migrated {len(rows)} events in {EVENTS_PATH} to habit ids")
+
 def _ensure_events():
-    """Create events file if it doesn't exist"""
+    """Create events file if it doesn't exist, upgrading name-based files to habit ids"""
     try:
         os.makedirs(os.path.dirname(EVENTS_PATH), exist_ok=True)
         if not os.path.exists(EVENTS_PATH):
-            edf = pd.DataFrame(columns=["date", "habit_name", "user_name"])
+            edf = pd.DataFrame(columns=EVENT_COLUMNS)
             edf.to_csv(EVENTS_PATH, index=False)
+            return
+        with open(EVENTS_PATH, "r", encoding="utf-8") as f:
+            header = f.readline().strip().split(",")
+        if "habit_id" not in header:
+            _migrate_event_names()
     except IOError as e:
         logger.error(f"Error ensuring events file: {e}")
 
-def record_event(habit_name, when=None, user_name=None):
+def _iter_event_rows(months=None):
+    """Yield (date, habit_id, user_name) for recorded events (store partitions `months`, default all)"""
+    store = _event_store()
+    if store is not None:
+        yield from store.iter_rows(months)
+        return
+    _ensure_events()
+    with open(EVENTS_PATH, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                yield row.get("date"), int(row["habit_id"]), row.get("user_name") or ""
+            except (KeyError, TypeError, ValueError):
+                continue
+
+def iter_user_events(user_name, since=None):
+    """Yield (YYYY-MM-DD, habit_id) for one user's events on or after `since` (a date or
+    YYYY-MM-DD string). Oldest first from the event store, one month in memory at a time;
+    events.csv is streamed row by row in the order events were recorded.
+    """
+    start = to_ordinal(since) if since else None
+    store = _event_store()
+    if store is not None:
+        for day, habit_id in store.iter_user_days(str(user_name), start):
+            yield date.fromordinal(day).isoformat(), habit_id
+        return
+    for when, habit_id, name in _iter_event_rows():
+        if name != user_name:
+            continue
+        ordinal = to_ordinal(when)
+        if ordinal is not None and (start is None or ordinal >= start):
+            yield date.fromordinal(ordinal).isoformat(), habit_id
+
+def _events_signature():
+    """Identify the on-disk event log version (path, mtime, size)"""
+    store = _event_store()
+    if store is not None:
+        return store.signature()
+    try:
+        st = os.stat(EVENTS_PATH)
+        return (EVENTS_PATH, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (EVENTS_PATH, None, None)
+
+# Completion bitmaps keyed by (user_name, habit_id), derived from the event log.
+# With the partitioned store only the months asked for so far are loaded;
+# events.csv is always loaded whole. "position" records how far the log has
+# been read (see events_position()), so when another process appends, only
+# the new rows are read; a log rewritten in place is loaded again from scratch.
+# While rebuild.py works on a fresh index, a stale snapshot is served as-is and
+# completions recorded meanwhile are kept in "pending" to replay onto the new one.
+_index_lock = threading.RLock()
+_completion_index = {"signature": None, "bitmaps": None, "position": None, "complete": False,
+                     "stale": False, "pending": None}
+
+def events_position():
+    """How far the event log extends: ("store", {month: rows}) or ("csv", inode, bytes)"""
+    store = _event_store()
+    if store is not None:
+        return ("store", store.row_counts())
+    try:
+        st = os.stat(EVENTS_PATH)
+        return ("csv", st.st_ino, st.st_size)
+    except OSError:
+        return ("csv", None, 0)
+
+def _read_csv_events(offset, add):
+    """Call add(user_name, habit_id, ordinal) for each complete events.csv line after byte
+    `offset` (the header is skipped); returns the offset of the first line not read
+    """
+    with open(EVENTS_PATH, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written
+            offset += len(line)
+            for row in csv.reader([line.decode("utf-8")]):
+                ordinal = to_ordinal(row[0]) if len(row) > 1 else None
+                if ordinal is None:
+                    continue
+                try:
+                    add(row[2] if len(row) > 2 else '', int(row[1]), ordinal)
+                except ValueError:
+                    continue
+    return offset
+
+def _notify_events(rows):
+    for callback in list(_event_listeners):
+        try:
+            callback(rows)
+        except Exception as e:
+            logger.error(f"Event listener error: {e}")
+
+def _catch_up_index():
+    """Add the rows appended to the event log since the index position (and tell the
+    event listeners about the new completions); False if the index must be reloaded
+    """
+    position = _completion_index["position"]
+    bitmaps = _completion_index["bitmaps"]
+    store = _event_store()
+    if position is None or position[0] != ("store" if store is not None else "csv"):
+        return False
+    added = []
+
+    def add(user_name, habit_id, ordinal):
+        if bitmaps.add(user_name, habit_id, ordinal):
+            added.append((ordinal, habit_id, user_name or ''))
+
+    if store is None:
+        _kind, inode, offset = position
+        current = events_position()
+        if current[1] != inode or current[2] < offset:
+            return False
+        position = ("csv", inode, _read_csv_events(offset, add))
+    else:
+        counts = store.row_counts()
+        rows = dict(position[1])
+        months = set(rows) | (set(counts) if _completion_index["complete"] else set())
+        users = store.user_names()
+        for month in sorted(months):
+            start = rows.get(month, 0)
+            if counts.get(month, 0) < start:
+                return False
+            if counts.get(month, 0) > start:
+                day, habit, user = store.tail(month, start)
+                for d, h, u in zip(day.tolist(), habit.tolist(), user.tolist()):
+                    add(users[u], h, d)
+                rows[month] = start + len(day)
+        position = ("store", rows)
+    _completion_index["position"] = position
+    if added:
+        if _completion_index["pending"] is not None:
+            _completion_index["pending"].extend((u, h, o) for o, h, u in added)
+        _notify_events(added)
+    return True
+
+def completion_index(months=None):
+    """Return per-(user, habit_id) completion bitmaps covering at least `months` (YYYY-MM keys).
+    months=None loads the whole event history.
+    """
+    with _index_lock:
+        if _completion_index["stale"]:
+            return _completion_index["bitmaps"]
+        signature = _events_signature()
+        if _completion_index["bitmaps"] is None or (
+                _completion_index["signature"] != signature and not _catch_up_index()):
+            store = _event_store()
+            position = ("store", {}) if store is not None else ("csv", events_position()[1], 0)
+            _completion_index.update(bitmaps=CompletionBitmaps(), position=position, complete=False)
+        _completion_index["signature"] = signature
+        bitmaps = _completion_index["bitmaps"]
+        if _completion_index["complete"]:
+            return bitmaps
+        store = _event_store()
+        if store is None:
+            _ensure_events()
+            offset = _read_csv_events(0, bitmaps.add)
+            _completion_index.update(position=("csv", events_position()[1], offset), complete=True)
+            return bitmaps
+        loaded = _completion_index["position"][1]
+        missing = [m for m in (store.partitions() if months is None else months) if m not in loaded]
+        if missing:
+            users = store.user_names()
+            for month, (day, habit, user) in store.iter_partitions(missing):
+                for d, h, u in zip(day.tolist(), habit.tolist(), user.tolist()):
+                    bitmaps.add(users[u], h, d)
+                loaded[month] = len(day)
+        if months is None:
+            _completion_index["complete"] = True
+        return bitmaps
+
+def begin_index_rebuild():
+    """Start collecting completions recorded while a new index is being built"""
+    with _index_lock:
+        if _completion_index["pending"] is None:
+            _completion_index["pending"] = []
+
+def install_completion_index(bitmaps, signature, stale=False, position=None):
+    """Swap in a complete index built elsewhere (rebuild.py).
+    A stale index is served without signature checks until a fresh one is installed.
+    With the events_position() the build started from, rows appended since (by any
+    process) are read on the next query instead of reloading the whole log.
+    """
+    with _index_lock:
+        pending = _completion_index["pending"]
+        if not stale and pending:
+            for user_name, habit_id, ordinal in pending:
+                bitmaps.add(user_name, habit_id, ordinal)
+            if position is None:
+                # Those completions are already on disk, past the signature the index was built from
+                signature = _events_signature()
+        _completion_index.update(signature=signature, bitmaps=bitmaps, position=position, complete=True,
+                                 stale=stale, pending=pending if stale else None)
+    _notify_change("events")
+
+def abort_index_rebuild():
+    """Drop a stale index after a failed rebuild; the next query rebuilds from disk"""
+    with _index_lock:
+        if _completion_index["stale"]:
+            _completion_index.update(bitmaps=None, stale=False)
+        _completion_index["pending"] = None
+
+def is_habit_done(habit_name, user_name=None, when=None):
+    """Single bit test: did `user_name` complete the habit on `when` (default today)?"""
+    habit_id = get_habit_id(habit_name)
+    ordinal = to_ordinal(when or date.today())
+    if habit_id is None or ordinal is None:
+        return False
+    return completion_index([month_key(ordinal)]).is_done(user_name or '', habit_id, ordinal)
+
+def _record_events(rows):
+    """Record (ordinal, habit_id, user_name) completions with a single append to the event log.
+    Rows already recorded are dropped; returns the ones written.
+    """
+    # Under the transaction lock no other process appends between reading the log and writing it
+    with _txn_guard(), _index_lock:
+        bitmaps = completion_index({month_key(ordinal) for ordinal, _h, _u in rows})
+        new = [(ordinal, habit_id, user_name or '') for ordinal, habit_id, user_name in rows
+               if bitmaps.add(user_name or '', habit_id, ordinal)]
+        if not new:
+            return []
+        try:
+            lines = [(date.fromordinal(ordinal).isoformat(), habit_id, user_name) for ordinal, habit_id, user_name in new]
+            store = _event_store()
+            if store is not None:
+                store.append(lines)
+            else:
+                _ensure_events()
+                with open(EVENTS_PATH, "a", newline="", encoding="utf-8") as f:
+                    csv.writer(f, lineterminator="\n").writerows(lines)
+        except Exception:
+            for ordinal, habit_id, user_name in new:
+                bitmaps.discard(user_name, habit_id, ordinal)
+            raise
+        if _completion_index["pending"] is not None:
+            _completion_index["pending"].extend((u, h, o) for o, h, u in new)
+        # Our own write must not trigger a reload: move the position past it
+        _completion_index["signature"] = _events_signature()
+        if not _catch_up_index():
+            _completion_index["position"] = None
+        _notify_events(new)
+    return new
+
+@track_memory
+def record_event(habit_name, when=None, user_name=None, habit_id=None):
     """Append a completion event for habit_name on date `when` (YYYY-MM-DD or date obj).
-    Optionally associate the event with `user_name`.
+    Optionally associate the event with `user_name`. Events store the habit id.
+    Returns False without writing if that user already completed the habit that day.
     """
     try:
-        _ensure_events()
         if when is None:
             when = date.today().strftime("%Y-%m-%d")
         elif isinstance(when, date):
             when = when.strftime("%Y-%m-%d")
-        df = pd.read_csv(EVENTS_PATH)
-        new = {"date": str(when), "habit_name": str(habit_name), "user_name": str(user_name or '')}
-        df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-        df.to_csv(EVENTS_PATH, index=False)
+        ordinal = to_ordinal(when)
+        if ordinal is None:
+            logger.warning(f"Ignoring event with invalid date: {when}")
+            return False
+        if habit_id is None:
+            habit_id = get_habit_id(habit_name)
+            if habit_id is None:
+                logger.warning(f"Ignoring event for unknown habit: {habit_name}")
+                return False
+        if not _record_events([(ordinal, int(habit_id), user_name)]):
+            logger.debug(f"Event already recorded: {habit_name} on {when} for {user_name or 'anonymous'}")
+            return False
+        _notify_change("events")
+        return True
     except Exception as e:
         logger.error(f"Error recording event: {e}")
+        return False
 
+@track_memory
 def get_calendar_counts(month=None, year=None, user_name=None, habit_name=None):
     """Return a dict mapping day(int)->count of completion events for given month/year.
-    If month/year are None, use current month.
+    If month/year are None, use current month. Repeated completions of the same
+    habit by the same user on one day count once.
     """
     try:
-        _ensure_events()
-        df = pd.read_csv(EVENTS_PATH)
-        if df.empty:
-            return {}
-        df["date"] = df["date"].astype(str)
-        df["_dt"] = pd.to_datetime(df["date"], errors="coerce")
         now = datetime.today()
         m = int(month or now.month)
         y = int(year or now.year)
-        filt = df[df["_dt"].dt.month == m]
-        filt = filt[filt["_dt"].dt.year == y]
-        if user_name:
-            filt = filt[filt["user_name"] == str(user_name)]
+        habit_id = None
         if habit_name:
-            filt = filt[filt["habit_name"] == str(habit_name)]
-        if filt.empty:
-            return {}
-        counts = filt.groupby(filt["_dt"].dt.day).size().to_dict()
-        return {int(k): int(v) for k, v in counts.items()}
+            habit_id = get_habit_id(habit_name)
+            if habit_id is None:
+                return {}
+        start = date(y, m, 1).toordinal()
+        end = date(y + m // 12, m % 12 + 1, 1).toordinal()
+        counts = completion_index([f"{y:04d}-{m:02d}"]).day_counts(
+            start, end, user_name=str(user_name) if user_name else None, habit=habit_id
+        )
+        return {offset + 1: count for offset, count in sorted(counts.items())}
     except Exception as e:
         logger.error(f"Error getting calendar counts: {e}")
         return {}
 
+def months_between(start, end):
+    """YYYY-MM keys of every month touching day ordinals [start, end]"""
+    first, last = date.fromordinal(start), date.fromordinal(end)
+    y, m = first.year, first.month
+    keys = []
+    while (y, m) <= (last.year, last.month):
+        keys.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return keys
+
+def get_calendar_range(start, end, user_name=None, habit_name=None):
+    """Dense per-day completion counts for every day from `start` to `end` inclusive.
+    Both are dates (or YYYY-MM-DD strings); index 0 is `start`. Counted the same
+    way as get_calendar_counts, from one pass over the completion bitmaps.
+    """
+    try:
+        first, last = to_ordinal(start), to_ordinal(end)
+        if first is None or last is None or last < first:
+            return []
+        days = [0] * (last - first + 1)
+        habit_id = None
+        if habit_name:
+            habit_id = get_habit_id(habit_name)
+            if habit_id is None:
+                return days
+        counts = completion_index(months_between(first, last)).day_counts(
+            first, last + 1, user_name=str(user_name) if user_name else None, habit=habit_id
+        )
+        for offset, count in counts.items():
+            days[offset] = count
+        return days
+    except Exception as e:
+        logger.error(f"Error getting calendar range: {e}")
+        return []
+
+
+# --- Transactions: one journaled, fsynced write per unit of work ---
+
+JOURNAL_PATH = os.path.join(os.path.dirname(__file__), "data", "journal.jsonl")
+# Client action ids already applied (idempotency keys for /api/actions/batch) and their results
+ACTIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "actions.json")
+ACTION_IDS_KEEP = int(os.environ.get("TRACKIT_ACTION_IDS_KEEP", "10000"))
+# Stores are fsynced and the journal truncated after this many transactions
+JOURNAL_CHECKPOINT_TXNS = int(os.environ.get("TRACKIT_JOURNAL_CHECKPOINT_TXNS", "200"))
+
+_txn_lock = threading.RLock()
+# "journal": (inode, size) of the journal up to which this process has applied every record
+_txn_state = {"seq": 0, "since_checkpoint": 0, "recovered": False, "journal": None}
+# Open lock file and nesting depth of _txn_guard() in this process
+_txn_file = {"file": None, "depth": 0}
+
+@contextmanager
+def _txn_guard():
+    """Serialize transactions across threads and worker processes.
+
+    Besides _txn_lock, holds an exclusive flock on JOURNAL_PATH + ".lock",
+    which also stores the last transaction sequence number so every process
+    keeps numbering after the highest one written by any of them.
+    """
+    with _txn_lock:
+        if fcntl is None or _txn_file["depth"]:
+            _txn_file["depth"] += 1
+            try:
+                yield
+            finally:
+                _txn_file["depth"] -= 1
+            return
+        os.makedirs(os.path.dirname(JOURNAL_PATH), exist_ok=True)
+        with open(JOURNAL_PATH + ".lock", "a+", encoding="utf-8") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            _txn_file.update(file=f, depth=1)
+            try:
+                f.seek(0)
+                _txn_state["seq"] = max(_txn_state["seq"], _as_int(f.read().strip()))
+                yield
+            finally:
+                f.seek(0)
+                f.truncate()
+                f.write(str(_txn_state["seq"]))
+                f.flush()
+                _txn_file.update(file=None, depth=0)
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def reset_after_fork():
+    """Called in a freshly forked worker process (see serve.py).
+    The next commit replays the journal first, in case a worker that died
+    left a journaled transaction unapplied.
+    """
+    _txn_state["recovered"] = False
+    _txn_state["since_checkpoint"] = 0
+
+class UnitOfWork:
+    """Stage habit, event, points and reward changes and commit them together.
+
+        with unit_of_work() as uow:
+            uow.mark_done("Read")
+            uow.record_event("Read", user_name="ann")
+            uow.add_points("ann", 10)
+            uow.check_rewards("ann")
+        uow.results  # one result per staged operation, in order
+
+    commit() appends one record to the journal and fsyncs it, then applies
+    it to habits.csv, the event log and points.json, writing each at most
+    once (to a temp file that replaces the store, so none is ever torn).
+    The journal fsync is the only one on the commit path; the stores are
+    fsynced by the checkpoint every JOURNAL_CHECKPOINT_TXNS commits, and
+    until then a crash is repaired by replaying the journal.
+    Every operation is guarded so replaying it is a no-op, which lets
+    recover_journal() finish a commit interrupted between the two steps,
+    and the next commit in any process finish one whose worker died.
+
+    A unit created with an `action_id` is applied at most once: committing
+    the same id again returns the results recorded the first time.
+    """
+
+    def __init__(self, action_id=None):
+        self.action_id = action_id
+        self.ops = []
+        self.results = None
+        self.txn = None
+
+    def mark_done(self, habit_name, when=None):
+        self.ops.append({"op": "done", "habit_name": habit_name, "date": _iso_day(when)})
+        return self
+
+    def skip(self, habit_name):
+        self.ops.append({"op": "skip", "habit_name": habit_name})
+        return self
+
+    def add_habit(self, habit_name):
+        self.ops.append({"op": "add_habit", "habit_name": habit_name})
+        return self
+
+    def rename_habit(self, habit_name, new_name):
+        self.ops.append({"op": "rename_habit", "habit_name": habit_name, "new_name": new_name})
+        return self
+
+    def delete_habit(self, habit_name):
+        self.ops.append({"op": "delete_habit", "habit_name": habit_name})
+        return self
+
+    def record_event(self, habit_name, user_name=None, when=None):
+        self.ops.append({"op": "event", "habit_name": habit_name, "user_name": user_name or '', "date": _iso_day(when)})
+        return self
+
+    def add_points(self, user_name, points=10):
+        self.ops.append({"op": "points", "user_name": user_name, "points": int(points)})
+        return self
+
+    def check_rewards(self, user_name, habit_name=None):
+        """Evaluate reward rules for the user; with habit_name, also its streak and category"""
+        op = {"op": "rewards", "user_name": user_name}
+        if habit_name:
+            op["habit_name"] = habit_name
+        self.ops.append(op)
+        return self
+
+    def import_events(self, rows, points_per_event=10):
+        """Stage imported (ordinal, habit_id, user_name) completions with their habit stats,
+        points and category counts; completions already recorded are dropped at commit
+        """
+        self.ops.append({"op": "import", "rows": [[int(o), int(h), u or ''] for o, h, u in rows],
+                         "points": int(points_per_event)})
+        return self
+
+    def commit(self):
+        """Make the staged changes durable and apply them; returns the per-operation results.
+        Units committed within the group-commit window share one journal write and store rewrite.
+        """
+        _group_committer.submit(self)
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.results is None:
+            self.commit()
+        return False
+
+def unit_of_work(action_id=None):
+    return UnitOfWork(action_id)
+
+def _iso_day(when):
+    if when is None:
+        return date.today().isoformat()
+    ordinal = to_ordinal(when)
+    if ordinal is None:
+        raise ValueError(f"Invalid date: {when}")
+    return date.fromordinal(ordinal).isoformat()
+
+def _next_txn_seq():
+    # Microsecond clock, forced monotonic, so sequence numbers keep growing across restarts
+    _txn_state["seq"] = max(_txn_state["seq"] + 1, time.time_ns() // 1000)
+    return _txn_state["seq"]
+
+def _resolve_unit(unit, names, taken, next_id):
+    """Journal record for a unit: habit names resolved to ids, new habits given ids.
+    `taken` holds the folded names of active habits (see habit_index.fold).
+    """
+    ops = []
+    for staged in unit.ops:
+        op = dict(staged)
+        if op["op"] == "add_habit":
+            if fold(op["habit_name"]) in taken:
+                op["habit_id"] = None
+            else:
+                op["habit_id"] = names[op["habit_name"]] = next_id[0]
+                taken.add(fold(op["habit_name"]))
+                next_id[0] += 1
+        elif op["op"] == "rename_habit":
+            habit_id = op["habit_id"] = names.get(op["habit_name"])
+            old_key, new_key = fold(op["habit_name"]), fold(op["new_name"])
+            if habit_id is not None and new_key != old_key and new_key in taken:
+                op["habit_id"] = None
+                op["conflict"] = True
+            elif habit_id is not None:
+                del names[op["habit_name"]]
+                names[op["new_name"]] = habit_id
+                taken.discard(old_key)
+                taken.add(new_key)
+        elif op["op"] == "delete_habit":
+            op["habit_id"] = names.pop(op["habit_name"], None)
+            if op["habit_id"] is not None:
+                taken.discard(fold(op["habit_name"]))
+        elif op["op"] == "import":
+            op["rows"] = _new_completions(op["rows"])
+        elif "habit_name" in op:
+            op["habit_id"] = names.get(op["habit_name"])
+        ops.append(op)
+    record = {"txn": _next_txn_seq(), "at": datetime.now().isoformat(), "ops": ops}
+    if unit.action_id:
+        record["action_id"] = str(unit.action_id)
+    return record
+
+def _new_completions(rows):
+    """The [ordinal, habit_id, user_name] rows not recorded yet, each once"""
+    bitmaps = completion_index({month_key(ordinal) for ordinal, _h, _u in rows})
+    seen, new = set(), []
+    for ordinal, habit_id, user_name in rows:
+        key = (ordinal, habit_id, user_name)
+        if key not in seen and not bitmaps.is_done(user_name, habit_id, ordinal):
+            seen.add(key)
+            new.append([ordinal, habit_id, user_name])
+    return new
+
+def _fresh(key, last_txn, seq, touched):
+    """True if transaction `seq` has not been applied to this row/user yet"""
+    if key in touched:
+        return True
+    try:
+        applied = int(last_txn or 0)
+    except (TypeError, ValueError):
+        applied = 0
+    if applied >= seq:
+        return False
+    touched.add(key)
+    return True
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _apply_import(op, record, table, rows, points, touched, kinds):
+    """Fold an "import" op's completions into habit stats, points and category counts.
+    The counts come from the journaled rows, not from what the event log accepts, so a
+    replay after the events were written still applies them (once, by last_txn).
+    """
+    seq = record["txn"]
+    per_habit, per_user = {}, {}
+    for ordinal, habit_id, user_name in op["rows"]:
+        count, last = per_habit.get(habit_id, (0, ordinal))
+        per_habit[habit_id] = (count + 1, max(last, ordinal))
+        if user_name:
+            habits = per_user.setdefault(user_name, {})
+            habits[habit_id] = habits.get(habit_id, 0) + 1
+    for habit_id, (count, last) in per_habit.items():
+        label = rows.get(int(habit_id))
+        if label is None or not _fresh(("habit", habit_id), table.at[label, "last_txn"], seq, touched):
+            continue
+        table.at[label, "days_completed"] = _as_int(table.at[label, "days_completed"]) + count
+        table.at[label, "total_days"] = _as_int(table.at[label, "total_days"]) + count
+        table.at[label, "last_date"] = max(str(table.at[label, "last_date"]), date.fromordinal(last).isoformat())
+        table.at[label, "last_txn"] = seq
+        kinds.add("habits")
+    engine = reward_engine()
+    for user_name, habits in per_user.items():
+        user_data = points.setdefault(user_name, {"points": 0, "rewards": []})
+        if not _fresh(("user", user_name), user_data.get("last_txn"), seq, touched):
+            continue
+        if op["points"]:
+            user_data["points"] = _as_int(user_data.get("points")) + sum(habits.values()) * op["points"]
+            user_data["last_point_earned"] = record["at"]
+        for habit_id, count in habits.items():
+            category = engine.category_of(get_habit_name(habit_id))
+            if category is not None:
+                counts = user_data.setdefault("category_counts", {})
+                counts[category] = int(counts.get(category, 0)) + count
+        user_data["last_txn"] = seq
+        kinds.add("points")
+
+def _counted(op, last_date, counted):
+    """True if a "done" op's day already counts towards its habit: it is the habit's last
+    completed day, was counted earlier in the batch, or anyone's completion is recorded for it.
+    (Anonymous marks record no completion, so for them only the first two apply.)
+    """
+    if str(last_date) == op["date"] or (op["habit_id"], op["date"]) in counted:
+        return True
+    ordinal = to_ordinal(op["date"])
+    return completion_index({month_key(ordinal)}).count(ordinal, ordinal + 1, habit=op["habit_id"]) > 0
+
+def _apply_records(records, table, points, actions=None):
+    """Apply journal records to the in-memory habit table and points, then write each changed store once.
+    `actions` (see _load_actions) is required if any record carries an action_id.
+    Returns (results per record, changed kinds).
+    """
+    rows = {int(hid): label for label, hid in zip(table.index, table["habit_id"])}
+    kinds = set()
+    results = []
+    events, event_slots = [], []
+    imported = []
+    batch_actions, repeats = {}, []
+    rewards = []
+    # (habit_id, day) completions counted earlier in this batch
+    counted = set()
+    for record in records:
+        seq = record["txn"]
+        action_id = record.get("action_id")
+        if action_id:
+            # A retried client action: answer with what it did the first time
+            if action_id in actions:
+                results.append(list(actions[action_id]["results"]))
+                continue
+            if action_id in batch_actions:
+                repeats.append((len(results), batch_actions[action_id]))
+                results.append(None)
+                continue
+            batch_actions[action_id] = len(results)
+        touched = set()
+        out = []
+        for op in record["ops"]:
+            kind = op["op"]
+            label = rows.get(op.get("habit_id")) if op.get("habit_id") is not None else None
+            result = None
+            if kind in ("done", "skip"):
+                if label is None:
+                    result = "Habit not found"
+                elif not _fresh(("habit", op["habit_id"]), table.at[label, "last_txn"], seq, touched):
+                    result = "Already applied"
+                elif kind == "skip":
+                    table.at[label, "total_days"] = _as_int(table.at[label, "total_days"]) + 1
+                    table.at[label, "last_txn"] = seq
+                    kinds.add("habits")
+                    result = "Skipped ❌"
+                elif _counted(op, table.at[label, "last_date"], counted):
+                    result = "Already marked today ✅"
+                else:
+                    counted.add((op["habit_id"], op["date"]))
+                    table.at[label, "days_completed"] = _as_int(table.at[label, "days_completed"]) + 1
+                    table.at[label, "total_days"] = _as_int(table.at[label, "total_days"]) + 1
+                    # Actions queued offline can arrive after later ones
+                    table.at[label, "last_date"] = max(str(table.at[label, "last_date"]), op["date"])
+                    table.at[label, "last_txn"] = seq
+                    kinds.add("habits")
+                    result = "Updated successfully ✅"
+            elif kind == "add_habit":
+                if op["habit_id"] is None:
+                    result = "Habit already exists!"
+                else:
+                    if label is None:
+                        label = (table.index.max() + 1) if len(table) else 0
+                        table.loc[label] = {"habit_id": op["habit_id"], "habit_name": op["habit_name"], "days_completed": 0,
+                                            "total_days": 0, "last_date": "", "deleted": 0, "last_txn": seq}
+                        rows[op["habit_id"]] = label
+                        kinds.add("habits")
+                    result = f"Habit '{op['habit_name']}' added successfully!"
+            elif kind in ("rename_habit", "delete_habit"):
+                if label is None:
+                    result = "Habit already exists!" if op.get("conflict") else "Habit not found"
+                else:
+                    if _fresh(("habit", op["habit_id"]), table.at[label, "last_txn"], seq, touched):
+                        if kind == "rename_habit":
+                            table.at[label, "habit_name"] = op["new_name"]
+                        else:
+                            table.at[label, "deleted"] = 1
+                        table.at[label, "last_txn"] = seq
+                        kinds.add("habits")
+                    result = "Habit renamed" if kind == "rename_habit" else "Habit deleted"
+            elif kind == "event":
+                if op.get("habit_id") is not None:
+                    events.append((to_ordinal(op["date"]), int(op["habit_id"]), op["user_name"]))
+                    event_slots.append((len(results), len(out)))
+                result = False
+            elif kind == "points":
+                user_data = points.setdefault(op["user_name"], {"points": 0, "rewards": []})
+                if _fresh(("user", op["user_name"]), user_data.get("last_txn"), seq, touched):
+                    user_data["points"] = _as_int(user_data.get("points")) + op["points"]
+                    user_data["last_point_earned"] = record["at"]
+                    user_data["last_txn"] = seq
+                    kinds.add("points")
+                result = user_data["points"]
+            elif kind == "import":
+                imported.extend(tuple(row) for row in op["rows"])
+                _apply_import(op, record, table, rows, points, touched, kinds)
+                result = len(op["rows"])
+            elif kind == "rewards":
+                # Evaluated once this batch's events are written (streaks and category counts need them)
+                rewards.append((len(results), len(out), record, op))
+                result = []
+            out.append(result)
+        results.append(out)
+
+    if "habits" in kinds:
+        _write_habit_table(table, sync=False)
+    if events:
+        written = set(_record_events(events))
+        for (ordinal, habit_id, user_name), (i, j) in zip(events, event_slots):
+            results[i][j] = (ordinal, habit_id, user_name or '') in written
+        if written:
+            kinds.add("events")
+    if imported and _record_events(imported):
+        kinds.add("events")
+    for i, j, record, op in rewards:
+        user_data = points.get(op["user_name"])
+        if not user_data:
+            continue
+        # Only a completion this record newly wrote counts towards the category
+        completed = any(
+            other["op"] == "event" and other.get("habit_id") == op.get("habit_id")
+            and other["user_name"] == op["user_name"] and results[i][k] is True
+            for k, other in enumerate(record["ops"])
+        )
+        results[i][j] = _award_rewards(op["user_name"], user_data, op.get("habit_id"), completed)
+        if results[i][j] or completed:
+            kinds.add("points")
+    if "points" in kinds:
+        _write_points(points, sync=False)
+    for i, first in repeats:
+        results[i] = list(results[first])
+    if batch_actions:
+        for action_id, i in batch_actions.items():
+            actions[action_id] = {"txn": records[i]["txn"], "results": results[i]}
+        _write_actions(actions)
+    return results, kinds
+
+def _load_actions():
+    try:
+        if os.path.exists(ACTIONS_PATH):
+            with open(ACTIONS_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"Error loading applied actions: {e}")
+    return {}
+
+def _write_actions(actions):
+    """Persist applied action ids, keeping only the newest ACTION_IDS_KEEP (journaled, so not fsynced)"""
+    if len(actions) > ACTION_IDS_KEEP:
+        newest = sorted(actions.items(), key=lambda item: item[1].get("txn", 0))[-ACTION_IDS_KEEP:]
+        actions.clear()
+        actions.update(newest)
+    _replace_file(ACTIONS_PATH, lambda f: json.dump(actions, f, ensure_ascii=False), sync=False)
+
+def _fsync_path(path):
+    try:
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+    except OSError:
+        pass
+
+def _journal_append(records):
+    """The commit point: append records and fsync once"""
+    os.makedirs(os.path.dirname(JOURNAL_PATH), exist_ok=True)
+    with open(JOURNAL_PATH, "ab") as f:
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if f.tell() and _journal_tail() != b"\n":
+            # Start after the torn last line of a process that died mid-write
+            data = b"\n" + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _journal_tail():
+    with open(JOURNAL_PATH, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1)
+
+def _journal_position():
+    """(inode, size) of the journal; checkpoints replace the file, so the inode changes"""
+    try:
+        st = os.stat(JOURNAL_PATH)
+        return (st.st_ino, st.st_size)
+    except OSError:
+        return (None, 0)
+
+def _read_journal(offset=0):
+    """Journal records from byte `offset` on"""
+    records = []
+    if not os.path.exists(JOURNAL_PATH):
+        return records
+    with open(JOURNAL_PATH, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # A torn line was never acknowledged to anyone
+                logger.warning(f"Ignoring incomplete journal record in {JOURNAL_PATH}")
+    return records
+
+def _checkpoint():
+    """Flush every store to disk, after which the journal is no longer needed.
+    Commits fsync only the journal; the stores they replaced or appended to are synced here.
+    """
+    store = _event_store()
+    if store is not None:
+        store.sync()
+    else:
+        _fsync_path(EVENTS_PATH)
+    for path in (DATA_PATH, POINTS_FILE, ACTIONS_PATH):
+        if os.path.exists(path):
+            _fsync_path(path)
+    # The renames of rewritten stores must be durable before the journal goes
+    _fsync_dir(os.path.dirname(DATA_PATH))
+    _replace_file(JOURNAL_PATH, lambda f: None)
+    _fsync_dir(os.path.dirname(JOURNAL_PATH))
+    _txn_state["journal"] = _journal_position()
+    _txn_state["since_checkpoint"] = 0
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Windows cannot open directories; renames there are not fsynced
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _replay_journal(offset=0):
+    """Apply journaled records from byte `offset` on again (applied ones are no-ops);
+    returns (records, changed kinds)
+    """
+    records = _read_journal(offset)
+    kinds = set()
+    if records:
+        _txn_state["seq"] = max([_txn_state["seq"]] + [int(r.get("txn", 0)) for r in records])
+        actions = _load_actions() if any(r.get("action_id") for r in records) else None
+        _results, kinds = _apply_records(records, _load_habit_table(), load_user_points(), actions)
+    _txn_state["journal"] = _journal_position()
+    return records, kinds
+
+def _catch_up_journal():
+    """Apply the records other processes journaled since this one last committed.
+    Normally they were applied by their writer already and this is a no-op, but a
+    worker that died between its journal write and applying it left them pending;
+    they must land before this process numbers a newer transaction for the same
+    rows, or the last_txn guard would skip them for good. Returns changed kinds.
+    """
+    inode, size = _journal_position()
+    seen = _txn_state["journal"]
+    offset = seen[1] if seen is not None and seen[0] == inode and seen[1] <= size else 0
+    if size <= offset:
+        _txn_state["journal"] = (inode, size)
+        return set()
+    return _replay_journal(offset)[1]
+
+def recover_journal():
+    """Re-apply journaled transactions that may not have reached the stores; returns how many were replayed"""
+    try:
+        with _txn_guard():
+            _txn_state["recovered"] = True
+            records, kinds = _replay_journal()
+            if not records:
+                return 0
+            _checkpoint()
+        logger.info(f"Replayed {len(records)} journaled transactions from {JOURNAL_PATH}")
+        if kinds:
+            _notify_change(*kinds)
+        return len(records)
+    except Exception as e:
+        logger.error(f"Error recovering journal: {e}")
+        return 0
+
+@track_memory
+def commit_units(units):
+    """Commit several units of work with one journal write; each unit's results are set on it"""
+    with _txn_guard():
+        if not _txn_state["recovered"]:
+            recover_journal()
+        kinds = _catch_up_journal()
+        table = _load_habit_table()
+        active = table[table["deleted"] == 0]
+        names = {str(n): int(i) for n, i in zip(active["habit_name"], active["habit_id"])}
+        taken = {fold(n) for n in names}
+        next_id = [int(table["habit_id"].max()) + 1 if len(table) else 1]
+        records = [_resolve_unit(unit, names, taken, next_id) for unit in units]
+        _journal_append(records)
+        actions = _load_actions() if any(r.get("action_id") for r in records) else None
+        results, applied = _apply_records(records, table, load_user_points(), actions)
+        kinds |= applied
+        _txn_state["journal"] = _journal_position()
+        for unit, record, result in zip(units, records, results):
+            unit.txn, unit.results = record["txn"], result
+        _txn_state["since_checkpoint"] += len(records)
+        if _txn_state["since_checkpoint"] >= JOURNAL_CHECKPOINT_TXNS:
+            _checkpoint()
+    if kinds:
+        _notify_change(*kinds)
+    return results
+
+# Coalesces concurrent commits (TRACKIT_COMMIT_WINDOW_MS) into one commit_units() call
+_group_committer = GroupCommitter(commit_units)
+
+def commit_stats():
+    """Group-commit batch sizes and flush/acknowledgement latency"""
+    return _group_committer.stats()
+
+def reset_commit_stats():
+    _group_committer.reset_stats()
+
+
+# --- Bulk import (see bulk_import.py) ---
+
+def resolve_habit_ids(names, create=False):
+    """({name: habit_id}, created names) for habit names matched ignoring case.
+    With `create`, missing habits are added in one unit of work; otherwise they are left out.
+    """
+    index = _habit_lookup()["index"]
+    ids, missing = {}, {}
+    for name in names:
+        found = index.get(name)
+        if found is not None:
+            ids[name] = found[1]
+        elif create:
+            missing.setdefault(fold(name), name)
+    if not missing:
+        return ids, []
+    uow = unit_of_work()
+    for name in missing.values():
+        uow.add_habit(name)
+    uow.commit()
+    index = _habit_lookup()["index"]
+    for name in names:
+        found = index.get(name)
+        if found is not None:
+            ids[name] = found[1]
+    return ids, list(missing.values())
+
+def finish_import(imported):
+    """Evaluate rewards for the (user_name, habit_id) pairs an import touched, in one unit
+    of work, refreeze the backfilled event store months and update the leaderboard.
+    Habit stats and points were committed with each chunk; returns {user: points}.
+    """
+    users = sorted({user_name for user_name, _h in imported if user_name})
+    if users:
+        uow = unit_of_work()
+        for user_name, habit_id in sorted(imported):
+            if user_name:
+                uow.check_rewards(user_name, get_habit_name(habit_id))
+        uow.commit()
+    store = _event_store()
+    if store is not None:
+        # Backfilled months were thawed to append to them
+        store.freeze_old()
+    if not users:
+        return {}
+    table = _load_habit_table()
+    active = table[table["deleted"] == 0]
+    rates = [int(d / t * 100) if t else 0 for d, t in zip(active["days_completed"], active["total_days"])]
+    update_leaderboard_scores({user_name: int(sum(rates) / len(rates)) if rates else 0 for user_name in users})
+    points = load_user_points()
+    return {user_name: _as_int(points.get(user_name, {}).get("points")) for user_name in users}
+
 
 # --- Leaderboard helpers ---
 
+@track_memory
 def load_leaderboard(top_n=10):
-    """Load top N users from leaderboard"""
+    """Load top N users from leaderboard (all of them if top_n is None)"""
     try:
         os.makedirs(os.path.dirname(LEADERBOARD_PATH), exist_ok=True)
         if not os.path.exists(LEADERBOARD_PATH):
             df = pd.DataFrame(columns=["user_name", "score", "last_updated"])
-            df.to_csv(LEADERBOARD_PATH, index=False)
+            _write_csv(df, LEADERBOARD_PATH)
         df = pd.read_csv(LEADERBOARD_PATH)
         if df.empty:
             return []
@@ -284,13 +1404,20 @@ def load_leaderboard(top_n=10):
             df["score"] = 0
         df["score"] = df["score"].fillna(0).astype(int)
         df = df.sort_values("score", ascending=False)
-        return df.head(top_n).to_dict(orient="records")
+        if top_n:
+            df = df.head(top_n)
+        return df.to_dict(orient="records")
     except Exception as e:
         logger.error(f"Error loading leaderboard: {e}")
         return []
 
+@track_memory
 def update_leaderboard(user_name, score):
     """Update or insert user score in leaderboard"""
+    return update_leaderboard_scores({user_name: score})
+
+def update_leaderboard_scores(scores, notify=True):
+    """Update or insert several {user_name: score} entries with one rewrite of the leaderboard"""
     try:
         os.makedirs(os.path.dirname(LEADERBOARD_PATH), exist_ok=True)
         if not os.path.exists(LEADERBOARD_PATH):
@@ -299,18 +1426,18 @@ def update_leaderboard(user_name, score):
             df = pd.read_csv(LEADERBOARD_PATH)
         if "score" not in df.columns:
             df["score"] = 0
-        exists = False
-        user_name = str(user_name).strip()
+        pending = {str(user_name).strip(): int(score) for user_name, score in scores.items()}
         for i, row in df.iterrows():
-            if str(row.get("user_name", "")).strip() == user_name:
-                df.at[i, "score"] = int(score)
+            user_name = str(row.get("user_name", "")).strip()
+            if user_name in pending:
+                df.at[i, "score"] = pending.pop(user_name)
                 df.at[i, "last_updated"] = str(date.today())
-                exists = True
-                break
-        if not exists:
-            new = {"user_name": user_name, "score": int(score), "last_updated": str(date.today())}
-            df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-        df.to_csv(LEADERBOARD_PATH, index=False)
+        if pending:
+            new = [{"user_name": u, "score": s, "last_updated": str(date.today())} for u, s in pending.items()]
+            df = pd.concat([df, pd.DataFrame(new)], ignore_index=True)
+        _write_csv(df, LEADERBOARD_PATH)
+        if notify:
+            _notify_change("leaderboard")
         return True
     except Exception as e:
         logger.error(f"Error updating leaderboard: {e}")
@@ -0,0 +1,25 @@
+"""
+Loads settings from a .env file into os.environ.
+
+Most modules read their TRACKIT_* settings at import time, so app.py and
+serve.py call load_env() before importing any of them. Variables already
+set in the environment win over the file. python-dotenv is only imported
+when there is a .env file to read.
+"""
+import os
+
+# The working directory's .env, else the one next to the app
+ENV_FILES = (
+    ".env",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
+)
+
+
+def load_env(paths=ENV_FILES):
+    """Load the first .env file in `paths` that exists; returns its path or None"""
+    for path in paths:
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return path
+    return None
@@ -0,0 +1,612 @@
+"""
+Compact columnar storage for completion events, partitioned by month.
+
+Each event is stored as three fixed-width little-endian columns:
+
+    day.i32    date as a proleptic Gregorian day ordinal (date.toordinal())
+    habit.u16  habit_id from habits.csv
+    user.u32   index into users.dict.json
+
+so an event costs 10 bytes instead of a repeated "date,habit,user" text row.
+Events live in one directory per calendar month:
+
+    event_store/
+        manifest.json      {"partitions": {"2026-03": {"rows": 412, "frozen": false, "compressed": false}}}
+        users.dict.json
+        2026-03/day.i32 habit.u16 user.u32   open month, memory-mapped
+        2026-01.npz                          frozen and compressed month
+
+Queries name the months they need, so a calendar month opens one partition
+and a streak walks back from today one partition at a time. Months older
+than the previous one are frozen (and compressed unless
+TRACKIT_COMPRESS_FROZEN=0) once a newer month starts; late writes thaw them.
+
+Writers hold an flock on event_store/.lock, and every instance re-reads the
+dictionaries and manifest when another process has rewritten them, so
+several processes can share one store.
+
+Convert an existing events.csv (upgraded to habit ids first) or a flat
+single-directory store with:
+
+    python event_store.py convert [events.csv|old_store_dir] [store_dir]
+    python event_store.py freeze [--before YYYY-MM] [--no-compress] [store_dir]
+    python event_store.py info [store_dir]
+"""
+import os
+import re
+import csv
+import sys
+import json
+import shutil
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    from .lazy_import import LazyModule
+except Exception:
+    from lazy_import import LazyModule
+
+np = LazyModule("numpy")
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+EVENT_STORE_DIR = os.path.join(os.path.dirname(__file__), "data", "event_store")
+COMPRESS_FROZEN = os.environ.get("TRACKIT_COMPRESS_FROZEN", "1") != "0"
+
+COLUMNS = (("day", "<i4", "day.i32"), ("habit", "<u2", "habit.u16"), ("user", "<u4", "user.u32"))
+DICTIONARIES = {"user": "users.dict.json"}
+CODE_LIMITS = {"user": 0xFFFFFFFF}
+HABIT_ID_LIMIT = 0xFFFF
+MANIFEST = "manifest.json"
+# Held (flock) by whichever process is writing the store
+LOCK_FILE = ".lock"
+PARTITION_NAME = re.compile(r"^(\d{4}-\d{2})(\.npz)?$")
+# Stores written before habit ids existed dictionary-encoded habit names here
+LEGACY_HABIT_DICTIONARY = "habits.dict.json"
+
+
+def to_ordinal(when):
+    """Day ordinal for a date, datetime or YYYY-MM-DD string (None if unparseable)"""
+    if isinstance(when, datetime):
+        return when.date().toordinal()
+    if isinstance(when, date):
+        return when.toordinal()
+    try:
+        return date.fromisoformat(str(when).strip()[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def month_key(ordinal):
+    """Partition key (YYYY-MM) of a day ordinal"""
+    d = date.fromordinal(int(ordinal))
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def month_bounds(key):
+    """Day ordinals [start, end) covered by a YYYY-MM partition"""
+    y, m = int(key[:4]), int(key[5:7])
+    return date(y, m, 1).toordinal(), date(y + m // 12, m % 12 + 1, 1).toordinal()
+
+
+def previous_month(key):
+    y, m = int(key[:4]), int(key[5:7])
+    return f"{y - 1:04d}-12" if m == 1 else f"{y:04d}-{m - 1:02d}"
+
+
+def _stat_signature(path):
+    """(inode, mtime, size) of a file, or None; os.replace() always changes it"""
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _empty_columns():
+    return tuple(np.empty(0, dtype=dtype) for _c, dtype, _f in COLUMNS)
+
+
+class EventStore:
+    """Append-only columnar event log keyed by habit id, split into monthly partitions"""
+
+    def __init__(self, path=EVENT_STORE_DIR, compress_frozen=COMPRESS_FROZEN, auto_freeze=True):
+        self.path = path
+        self.compress_frozen = compress_frozen
+        self.auto_freeze = auto_freeze
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._names = None     # {"user": [names]}
+        self._codes = None     # {"user": {name: code}}
+        self._manifest = None  # {"version": 1, "partitions": {month: entry}}
+        # File signatures the dictionaries and manifest were read at; other
+        # processes (and other instances) write the same files
+        self._dictionary_signatures = {}
+        self._manifest_signature = None
+        self._cache = {}       # month -> (file state, (day, habit, user))
+
+    @classmethod
+    def exists(cls, path=EVENT_STORE_DIR):
+        return os.path.isdir(path)
+
+    def _file(self, *names):
+        return os.path.join(self.path, *names)
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive access for a write: the thread lock plus, where fcntl exists, a flock
+        on the store's lock file so several processes can append to one store. The
+        dictionaries and manifest are re-read under it if another writer changed them.
+        """
+        with self._lock:
+            lock_file = None
+            if fcntl is not None and not self._lock_depth and os.path.isdir(self.path):
+                lock_file = open(self._file(LOCK_FILE), "a+")
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if lock_file is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    lock_file.close()
+
+    # --- Dictionaries ---
+
+    def _load_dictionaries(self):
+        """Load the name dictionaries, again whenever their file was rewritten"""
+        if self._names is None:
+            self._names, self._codes = {}, {}
+        for kind, filename in DICTIONARIES.items():
+            signature = _stat_signature(self._file(filename))
+            if kind in self._names and self._dictionary_signatures.get(kind) == signature:
+                continue
+            names = []
+            if signature is not None:
+                with open(self._file(filename), "r", encoding="utf-8") as f:
+                    names = json.load(f)
+            self._names[kind] = names
+            self._codes[kind] = {n: i for i, n in enumerate(names)}
+            self._dictionary_signatures[kind] = signature
+
+    def _encode(self, kind, name, new_names):
+        codes = self._codes[kind]
+        code = codes.get(name)
+        if code is None:
+            code = len(self._names[kind])
+            if code > CODE_LIMITS[kind]:
+                raise OverflowError(f"Too many distinct {kind} names for the event store")
+            self._names[kind].append(name)
+            codes[name] = code
+            new_names.add(kind)
+        return code
+
+    def _save_dictionaries(self, kinds):
+        for kind in kinds:
+            tmp = self._file(DICTIONARIES[kind] + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._names[kind], f, ensure_ascii=False)
+            os.replace(tmp, self._file(DICTIONARIES[kind]))
+            self._dictionary_signatures[kind] = _stat_signature(self._file(DICTIONARIES[kind]))
+
+    def code(self, kind, name):
+        """Integer code for a user name, or None if never recorded"""
+        with self._lock:
+            self._load_dictionaries()
+            return self._codes[kind].get(str(name))
+
+    def name(self, kind, code):
+        with self._lock:
+            self._load_dictionaries()
+            return self._names[kind][int(code)]
+
+    def user_names(self):
+        """Code -> user name list (codes index into it)"""
+        with self._lock:
+            self._load_dictionaries()
+            return self._names["user"]
+
+    # --- Manifest ---
+
+    def _load_manifest(self):
+        signature = _stat_signature(self._file(MANIFEST))
+        if self._manifest is not None and signature == self._manifest_signature:
+            return self._manifest
+        manifest = {"version": 1, "partitions": {}}
+        if os.path.exists(self._file(MANIFEST)):
+            with open(self._file(MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        partitions = manifest.setdefault("partitions", {})
+        # Partitions written just before a crash may be missing from the manifest
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                match = PARTITION_NAME.match(name)
+                if match and match.group(1) not in partitions:
+                    packed = bool(match.group(2))
+                    partitions[match.group(1)] = {"rows": 0, "frozen": packed, "compressed": packed}
+        self._manifest = manifest
+        self._manifest_signature = signature
+        if os.path.exists(self._file("day.i32")) and not os.path.exists(self._file(LEGACY_HABIT_DICTIONARY)):
+            self._upgrade_flat_layout()
+        return manifest
+
+    def _save_manifest(self):
+        tmp = self._file(MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._file(MANIFEST))
+        self._manifest_signature = _stat_signature(self._file(MANIFEST))
+
+    def partitions(self):
+        """Sorted YYYY-MM keys of every partition"""
+        with self._lock:
+            return sorted(self._load_manifest()["partitions"])
+
+    def partition_info(self, month):
+        with self._lock:
+            entry = self._load_manifest()["partitions"].get(month)
+            return dict(entry) if entry else None
+
+    def row_counts(self):
+        """{month: rows} for every partition, from the manifest and file sizes (no column is read)"""
+        with self._lock:
+            counts = {}
+            for month, entry in self._load_manifest()["partitions"].items():
+                if entry.get("frozen"):
+                    counts[month] = int(entry.get("rows", 0))
+                    continue
+                sizes = [os.path.getsize(self._file(month, f)) if os.path.exists(self._file(month, f)) else 0
+                         for _c, _d, f in COLUMNS]
+                counts[month] = min(size // np.dtype(dtype).itemsize for size, (_c, dtype, _f) in zip(sizes, COLUMNS))
+            return counts
+
+    def signature(self):
+        """Changes whenever events are appended, frozen or thawed"""
+        try:
+            st = os.stat(self._file(MANIFEST))
+            return (self.path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (self.path, None, None)
+
+    # --- Writing ---
+
+    def upgrade_habit_codes(self, habit_id_for_name):
+        """Rewrite a pre-habit-id habit column from dictionary codes to habit ids"""
+        legacy = self._file(LEGACY_HABIT_DICTIONARY)
+        if not os.path.exists(legacy):
+            return False
+        with self._writing():
+            if not os.path.exists(legacy):
+                return False
+            with open(legacy, "r", encoding="utf-8") as f:
+                names = json.load(f)
+            mapping = np.asarray([habit_id_for_name(n) for n in names] or [0], dtype="<u2")
+            path = self._file("habit.u16")
+            if os.path.exists(path):
+                codes = np.fromfile(path, dtype="<u2")
+                mapping[codes].tofile(path + ".tmp")
+                os.replace(path + ".tmp", path)
+            os.remove(legacy)
+            # Stores that old are also unpartitioned; reload to split them by month
+            self._manifest = self._manifest_signature = None
+            self._cache = {}
+            logger.info(f"Upgraded {self.path} habit column to habit ids")
+            return True
+
+    def _upgrade_flat_layout(self):
+        """Split a single-directory store (day.i32 etc. at the top level) into month partitions"""
+        arrays = [np.fromfile(self._file(f), dtype=dtype) if os.path.exists(self._file(f)) else np.empty(0, dtype=dtype)
+                  for _c, dtype, f in COLUMNS]
+        rows = min(len(a) for a in arrays)
+        self._append_columns(*(a[:rows] for a in arrays))
+        for _col, _dtype, filename in COLUMNS:
+            if os.path.exists(self._file(filename)):
+                os.remove(self._file(filename))
+        logger.info(f"Split {rows} events in {self.path} into {len(self._manifest['partitions'])} monthly partitions")
+
+    def append(self, rows):
+        """Append (when, habit_id, user_name) rows; returns the number written"""
+        os.makedirs(self.path, exist_ok=True)
+        with self._writing():
+            self._load_dictionaries()
+            self._load_manifest()
+            new_names = set()
+            days, habits, users = [], [], []
+            for when, habit_id, user_name in rows:
+                ordinal = to_ordinal(when)
+                if ordinal is None:
+                    logger.warning(f"Skipping event with invalid date: {when!r}")
+                    continue
+                if not 0 <= int(habit_id) <= HABIT_ID_LIMIT:
+                    raise OverflowError(f"habit_id {habit_id} does not fit the event store")
+                days.append(ordinal)
+                habits.append(int(habit_id))
+                users.append(self._encode("user", str(user_name or ''), new_names))
+            if not days:
+                return 0
+            # Dictionaries first, so every code on disk always resolves to a name
+            self._save_dictionaries(new_names)
+            self._append_columns(*(np.asarray(v, dtype=dtype) for v, (_c, dtype, _f) in zip((days, habits, users), COLUMNS)))
+            return len(days)
+
+    def _append_columns(self, day, habit, user):
+        """Route column arrays to their month partitions and update the manifest"""
+        partitions = self._manifest["partitions"]
+        newest_before = max(partitions) if partitions else None
+        unique_days, inverse = np.unique(day, return_inverse=True)
+        keys = np.asarray([month_key(d) for d in unique_days.tolist()] or [""])[inverse]
+        for month in sorted(set(keys.tolist())):
+            selected = keys == month
+            entry = partitions.get(month)
+            if entry is not None and entry.get("frozen"):
+                self._thaw(month)
+            os.makedirs(self._file(month), exist_ok=True)
+            for (_col, dtype, filename), values in zip(COLUMNS, (day, habit, user)):
+                with open(self._file(month, filename), "ab") as f:
+                    f.write(values[selected].astype(dtype).tobytes())
+            rows = (partitions.get(month) or {}).get("rows", 0) + int(selected.sum())
+            partitions[month] = {"rows": rows, "frozen": False, "compressed": False}
+            self._cache.pop(month, None)
+        self._save_manifest()
+        if self.auto_freeze and newest_before is not None and max(partitions) > newest_before:
+            self.freeze_old()
+
+    def sync(self):
+        """fsync the manifest, dictionaries and every writable partition"""
+        with self._lock:
+            paths = [self._file(MANIFEST)] + [self._file(f) for f in DICTIONARIES.values()]
+            for month, entry in self._load_manifest()["partitions"].items():
+                if not entry.get("frozen"):
+                    paths.extend(self._file(month, f) for _c, _d, f in COLUMNS)
+            for path in paths:
+                if os.path.exists(path):
+                    with open(path, "rb+") as f:
+                        os.fsync(f.fileno())
+
+    def freeze(self, before, compress=None):
+        """Freeze every month older than `before` (YYYY-MM), compressing it by default.
+        Returns the months frozen.
+        """
+        compress = self.compress_frozen if compress is None else compress
+        frozen = []
+        with self._writing():
+            partitions = self._load_manifest()["partitions"]
+            for month in sorted(partitions):
+                entry = partitions[month]
+                if month >= before or entry.get("frozen"):
+                    continue
+                columns = self._partition_columns(month)
+                rows = len(columns[0])
+                if compress:
+                    tmp = self._file(month + ".npz.tmp")
+                    with open(tmp, "wb") as f:
+                        np.savez_compressed(f, **{col: np.asarray(a) for (col, _d, _f), a in zip(COLUMNS, columns)})
+                    os.replace(tmp, self._file(month + ".npz"))
+                partitions[month] = {"rows": rows, "frozen": True, "compressed": bool(compress)}
+                self._save_manifest()
+                # The manifest now points at the archive; drop the memory maps before deleting their files
+                self._cache.pop(month, None)
+                del columns
+                if compress:
+                    shutil.rmtree(self._file(month), ignore_errors=True)
+                frozen.append(month)
+        if frozen:
+            logger.info(f"Froze event partitions {', '.join(frozen)} in {self.path}")
+        return frozen
+
+    def freeze_old(self, compress=None):
+        """Freeze months older than the one before the newest partition"""
+        months = self.partitions()
+        return self.freeze(previous_month(months[-1]), compress) if months else []
+
+    def _thaw(self, month):
+        """Make a frozen month writable again (late or backfilled events)"""
+        entry = self._manifest["partitions"][month]
+        if entry.get("compressed"):
+            columns = self._partition_columns(month)
+            os.makedirs(self._file(month), exist_ok=True)
+            for (_col, dtype, filename), values in zip(COLUMNS, columns):
+                values.astype(dtype).tofile(self._file(month, filename + ".tmp"))
+                os.replace(self._file(month, filename + ".tmp"), self._file(month, filename))
+            self._manifest["partitions"][month] = {"rows": len(columns[0]), "frozen": False, "compressed": False}
+            self._save_manifest()
+            os.remove(self._file(month + ".npz"))
+        else:
+            entry["frozen"] = False
+        self._cache.pop(month, None)
+        logger.info(f"Thawed event partition {month} in {self.path}")
+
+    # --- Reading ---
+
+    def _partition_columns(self, month, cache=True):
+        """(day, habit, user) arrays for one month: memory maps, or decompressed if frozen"""
+        entry = self._load_manifest()["partitions"].get(month)
+        if entry is None:
+            return _empty_columns()
+        if entry.get("compressed"):
+            path = self._file(month + ".npz")
+            state = ("npz", os.stat(path).st_mtime_ns)
+            cached = self._cache.get(month)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            with np.load(path) as data:
+                arrays = tuple(data[col].astype(dtype, copy=False) for col, dtype, _f in COLUMNS)
+        else:
+            state = tuple(
+                os.path.getsize(self._file(month, f)) if os.path.exists(self._file(month, f)) else 0
+                for _c, _d, f in COLUMNS
+            )
+            cached = self._cache.get(month)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            # A crash between column appends can leave ragged columns; read the common prefix
+            rows = min(size // np.dtype(dtype).itemsize for size, (_c, dtype, _f) in zip(state, COLUMNS))
+            if rows == 0:
+                arrays = _empty_columns()
+            else:
+                arrays = tuple(np.memmap(self._file(month, filename), dtype=dtype, mode="r", shape=(rows,))
+                               for _col, dtype, filename in COLUMNS)
+        if cache:
+            self._cache[month] = (state, arrays)
+        return arrays
+
+    def iter_partitions(self, months=None):
+        """Yield (month, (day, habit, user)) for the requested months that exist, oldest first"""
+        with self._lock:
+            existing = self.partitions()
+            if months is not None:
+                months = set(months)
+                existing = [m for m in existing if m in months]
+            selected = [(m, self._partition_columns(m)) for m in existing]
+        yield from selected
+
+    def tail(self, month, start):
+        """(day, habit, user) arrays of one month's rows from row `start` on (rows are only ever appended)"""
+        with self._lock:
+            return tuple(values[start:] for values in self._partition_columns(month))
+
+    def columns(self, months=None):
+        """Return (day, habit, user) arrays for the requested months (default all)"""
+        parts = [cols for _m, cols in self.iter_partitions(months)]
+        if not parts:
+            return _empty_columns()
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate([p[i] for p in parts]) for i in range(len(COLUMNS)))
+
+    def __len__(self):
+        return sum(len(cols[0]) for _m, cols in self.iter_partitions())
+
+    def _mask(self, habit_id=None, user_name=None, start=None, end=None, months=None):
+        """Boolean row mask plus the day column; None if the user is unknown"""
+        day, habit, user = self.columns(months)
+        mask = np.ones(len(day), dtype=bool)
+        if start is not None:
+            mask &= day >= start
+        if end is not None:
+            mask &= day < end
+        if habit_id is not None:
+            mask &= habit == int(habit_id)
+        if user_name is not None:
+            code = self.code("user", user_name)
+            if code is None:
+                return None, day
+            mask &= user == code
+        return mask, day
+
+    def habit_days(self, habit_id, user_name=None, months=None):
+        """Sorted unique day ordinals on which the habit was completed"""
+        mask, day = self._mask(habit_id=habit_id, user_name=user_name, months=months)
+        if mask is None:
+            return np.empty(0, dtype="<i4")
+        return np.unique(day[mask])
+
+    def calendar_counts(self, year, month, user_name=None, habit_id=None):
+        """Return {day_of_month: event count} for one month, reading only its partition"""
+        key = f"{year:04d}-{month:02d}"
+        start, end = month_bounds(key)
+        mask, day = self._mask(habit_id=habit_id, user_name=user_name, start=start, end=end, months=[key])
+        if mask is None:
+            return {}
+        counts = np.bincount(day[mask] - start, minlength=end - start)
+        return {int(i) + 1: int(c) for i, c in enumerate(counts) if c}
+
+    def iter_user_days(self, user_name, start=None):
+        """Yield (day ordinal, habit_id) of one user's events from day `start` on, oldest first.
+        Partitions are read one at a time and frozen months are not kept in the cache, so a
+        full-history scan holds one month of columns at most.
+        """
+        code = self.code("user", user_name)
+        if code is None:
+            return
+        for month in self.partitions():
+            if start is not None and month_bounds(month)[1] <= start:
+                continue
+            with self._lock:
+                day, habit, user = self._partition_columns(month, cache=False)
+            mask = user == code
+            if start is not None:
+                mask &= day >= start
+            days, habits = day[mask], habit[mask]
+            # Late (offline) writes are appended out of order within a month
+            order = np.argsort(days, kind="stable")
+            for d, h in zip(days[order].tolist(), habits[order].tolist()):
+                yield d, h
+
+    def iter_rows(self, months=None):
+        """Yield (YYYY-MM-DD, habit_id, user_name) for stored events, month by month"""
+        users = self.user_names()
+        for _month, (day, habit, user) in self.iter_partitions(months):
+            for d, h, u in zip(day.tolist(), habit.tolist(), user.tolist()):
+                yield date.fromordinal(d).isoformat(), h, users[u]
+
+
+def convert_csv(csv_path, store_dir=EVENT_STORE_DIR, chunk_size=50000):
+    """Append every row of an id-based events.csv (date,habit_id,user_name) to a partitioned store"""
+    store = EventStore(store_dir, auto_freeze=False)
+    total = 0
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append((row.get("date"), int(row["habit_id"]), row.get("user_name", "")))
+            if len(chunk) >= chunk_size:
+                total += store.append(chunk)
+                chunk = []
+        total += store.append(chunk)
+    # Freeze once at the end rather than thawing months for every out-of-order chunk
+    store.freeze_old()
+    return total
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the partitioned completion event store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert events.csv, or partition a flat store in place")
+    convert.add_argument("src", nargs="?", default=os.path.join(os.path.dirname(__file__), "data", "events.csv"))
+    convert.add_argument("dst", nargs="?", default=EVENT_STORE_DIR)
+    freeze = sub.add_parser("freeze", help="freeze and compress old months")
+    freeze.add_argument("--before", help="freeze months before YYYY-MM (default: all but the last two)")
+    freeze.add_argument("--no-compress", action="store_true")
+    freeze.add_argument("store", nargs="?", default=EVENT_STORE_DIR)
+    info = sub.add_parser("info", help="list partitions")
+    info.add_argument("store", nargs="?", default=EVENT_STORE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        if os.path.isdir(args.src):
+            store = EventStore(args.src)
+            print(f"{args.src}: {len(store)} events in {len(store.partitions())} monthly partitions")
+            return 0
+        if EventStore.exists(args.dst) and os.listdir(args.dst):
+            print(f"{args.dst} already exists; remove it first to re-convert")
+            return 1
+        # Make sure the CSV has been upgraded from habit names to habit ids
+        import data_manager
+        data_manager.EVENTS_PATH = args.src
+        data_manager._ensure_events()
+        count = convert_csv(args.src, args.dst)
+        print(f"Converted {count} events from {args.src} into {args.dst}")
+    elif args.command == "freeze":
+        store = EventStore(args.store)
+        compress = not args.no_compress
+        frozen = store.freeze(args.before, compress) if args.before else store.freeze_old(compress)
+        print(f"Froze {len(frozen)} partitions" + (f": {', '.join(frozen)}" if frozen else ""))
+    else:
+        store = EventStore(args.store)
+        for month in store.partitions():
+            entry = store.partition_info(month)
+            state = "compressed" if entry.get("compressed") else "frozen" if entry.get("frozen") else "open"
+            print(f"{month}  {entry.get('rows', 0):>10}  {state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
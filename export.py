@@ -0,0 +1,128 @@
+"""
+Streaming export of one user's history.
+
+GET /export streams the habits table, the user's completion events and their
+points and rewards as NDJSON (one JSON object per line, "record" says which
+kind) or as one CSV with the columns in EXPORT_COLUMNS, blank where a field
+does not apply:
+
+    habit   habit_id, habit_name, days_completed, total_days, date (last done), deleted
+    event   date, habit_id, habit_name
+    points  points, date (last point earned)
+    reward  reward, date (earned), points (at the time)
+
+Events are read one month of the event store at a time and written out in
+chunks of TRACKIT_EXPORT_CHUNK_BYTES, optionally through an incremental gzip
+compressor, so memory stays flat however long the history is.
+
+Events come oldest first. An interrupted download resumes with
+since=YYYY-MM-DD (the last date fully received): events and rewards before
+that day are left out, habits and the points total are always sent.
+"""
+import io
+import os
+import re
+import csv
+import json
+import zlib
+import logging
+try:
+    from . import data_manager
+except Exception:
+    import data_manager
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_BYTES = int(os.environ.get("TRACKIT_EXPORT_CHUNK_BYTES", "65536"))
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_COLUMNS = ["record", "date", "habit_id", "habit_name", "days_completed", "total_days",
+                  "deleted", "points", "reward"]
+
+
+def iter_records(user_name, since=None):
+    """Yield the export records (dicts) for one user, `since` a YYYY-MM-DD string or None"""
+    for row in data_manager._load_habit_table().itertuples(index=False):
+        yield {"record": "habit", "habit_id": int(row.habit_id), "habit_name": str(row.habit_name),
+               "days_completed": int(row.days_completed), "total_days": int(row.total_days),
+               "date": str(row.last_date or ""), "deleted": int(row.deleted)}
+
+    names = {}
+    for day, habit_id in data_manager.iter_user_events(user_name, since):
+        if habit_id not in names:
+            names[habit_id] = data_manager.get_habit_name(habit_id) or ""
+        yield {"record": "event", "date": day, "habit_id": habit_id, "habit_name": names[habit_id]}
+
+    user_data = data_manager.load_user_points().get(user_name, {})
+    yield {"record": "points", "points": int(user_data.get("points", 0)),
+           "date": user_data.get("last_point_earned", "")}
+    for reward in user_data.get("rewards", []):
+        # Rewards from before earned_at was recorded are plain names
+        if isinstance(reward, str):
+            reward = {"name": reward}
+        earned_at = reward.get("earned_at", "")
+        if since and earned_at[:10] < since:
+            continue
+        yield {"record": "reward", "reward": reward.get("name", ""), "date": earned_at,
+               "points": reward.get("points_at_earn", "")}
+
+
+def iter_lines(records, fmt):
+    """Encode records as NDJSON or CSV lines (the CSV starts with a header)"""
+    if fmt == "ndjson":
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        return
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, restval="", lineterminator="\n")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def iter_chunks(lines, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Group encoded lines into byte chunks of about `chunk_bytes`"""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of chunks into one gzip member as they arrive"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(user_name, fmt="csv", since=None, compress=False, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Bytes of a user's export, as a generator"""
+    chunks = iter_chunks(iter_lines(iter_records(user_name, since), fmt), chunk_bytes)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        logger.info(f"Exported {sent} bytes of {fmt} history for {user_name}"
+                    f"{f' since {since}' if since else ''}{' (gzip)' if compress else ''}")
+
+
+def export_filename(user_name, fmt, since=None, compress=False):
+    """Download name, e.g. trackit-ann-2026-03-01.csv.gz"""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", str(user_name)).strip("_") or "user"
+    return f"trackit-{slug}{f'-{since}' if since else ''}.{fmt}{'.gz' if compress else ''}"
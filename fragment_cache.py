@@ -0,0 +1,87 @@
+"""
+Render cache for dashboard fragments.
+
+The habit grid, the user's points and rewards and the user header are
+rendered as separate templates (templates/fragments/) and cached under a
+key made of the data versions they show (Snapshot.part_versions) and the
+user, so a / request where nothing changed reuses the previous HTML
+byte-for-byte instead of re-rendering every card and edit modal.
+
+Entries are kept in an LRU of TRACKIT_FRAGMENT_CACHE_SIZE. stats() reports
+hits, misses and the render time saved, estimated per fragment from the
+average time its misses took to render.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get("TRACKIT_FRAGMENT_CACHE_SIZE", "512"))
+
+
+class FragmentCache:
+    """LRU of rendered HTML keyed by (fragment name, key)"""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {}
+
+    def render(self, name, key, render):
+        """Cached HTML for `name` at `key`, calling `render()` on a miss"""
+        cache_key = (name, key)
+        with self._lock:
+            html = self._entries.get(cache_key)
+            if html is not None:
+                self._entries.move_to_end(cache_key)
+                self._stat(name)["hits"] += 1
+                return html
+        # Rendered outside the lock; two concurrent misses just render twice
+        started = time.perf_counter()
+        html = Markup(render())
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stat = self._stat(name)
+            stat["misses"] += 1
+            stat["render_ms"] += elapsed
+            if self.max_entries:
+                self._entries[cache_key] = html
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    stat["evictions"] += 1
+        return html
+
+    def _stat(self, name):
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats[name] = {"hits": 0, "misses": 0, "evictions": 0, "render_ms": 0.0}
+        return stat
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def stats(self):
+        """Per-fragment hits/misses, time spent rendering and time saved by hits (ms)"""
+        with self._lock:
+            fragments = {name: dict(stat) for name, stat in self._stats.items()}
+            entries = len(self._entries)
+        saved_total = 0.0
+        for stat in fragments.values():
+            lookups = stat["hits"] + stat["misses"]
+            avg = stat["render_ms"] / stat["misses"] if stat["misses"] else 0.0
+            stat["hit_rate"] = round(stat["hits"] / lookups, 3) if lookups else 0.0
+            stat["avg_render_ms"] = round(avg, 3)
+            stat["saved_ms"] = round(avg * stat["hits"], 3)
+            stat["render_ms"] = round(stat["render_ms"], 3)
+            saved_total += stat["saved_ms"]
+        return {"entries": entries, "max_entries": self.max_entries,
+                "saved_ms": round(saved_total, 3), "fragments": fragments}
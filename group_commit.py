@@ -0,0 +1,141 @@
+"""
+Group commit: coalesce units of work that arrive close together.
+
+Bursts of /done and /skip requests would otherwise each pay for a journal
+fsync and a full rewrite of habits.csv and points.json. A GroupCommitter
+holds the first unit for up to `window_ms` (TRACKIT_COMMIT_WINDOW_MS,
+default 10), collects everything that arrives meanwhile, and hands the whole
+batch to one commit call. Every submitter is released only after its batch
+is durable, so acknowledgements never get ahead of the disk.
+
+stats() reports batch sizes and flush/acknowledgement latency so the
+window can be tuned between latency (small) and throughput (large).
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+COMMIT_WINDOW_MS = float(os.environ.get("TRACKIT_COMMIT_WINDOW_MS", "10"))
+COMMIT_MAX_BATCH = int(os.environ.get("TRACKIT_COMMIT_MAX_BATCH", "256"))
+# Latency samples kept for percentiles
+STATS_SAMPLES = 1000
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.5), 3), "p95": round(pick(0.95), 3), "max": round(ordered[-1], 3)}
+
+
+def _size_bucket(size):
+    if size == 1:
+        return "1"
+    if size <= 4:
+        return "2-4"
+    if size <= 16:
+        return "5-16"
+    return "17+"
+
+
+class _Pending:
+    __slots__ = ("unit", "submitted", "done", "error")
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitter:
+    """Batches submitted units and commits each batch with one call to `commit(units)`"""
+
+    def __init__(self, commit, window_ms=COMMIT_WINDOW_MS, max_batch=COMMIT_MAX_BATCH):
+        self.commit = commit
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self._cond = threading.Condition()
+        self._queue = []
+        self._thread_pid = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def submit(self, unit):
+        """Commit `unit` with whatever else arrives within the window; returns once it is durable"""
+        pending = _Pending(unit)
+        if self.window <= 0:
+            self._flush([pending])
+        else:
+            with self._cond:
+                # The flusher thread does not survive a fork; each worker process starts its own
+                if self._thread_pid != os.getpid():
+                    self._thread_pid = os.getpid()
+                    threading.Thread(target=self._run, name="trackit-group-commit", daemon=True).start()
+                self._queue.append(pending)
+                self._cond.notify()
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = self._queue[0].submitted + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+            self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        error = None
+        try:
+            self.commit([p.unit for p in batch])
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} units failed: {e}")
+            error = e
+        finished = time.monotonic()
+        for pending in batch:
+            pending.error = error
+            pending.done.set()
+        with self._stats_lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["units"] += len(batch)
+            stats["errors"] += error is not None
+            stats["max_batch_size"] = max(stats["max_batch_size"], len(batch))
+            bucket = _size_bucket(len(batch))
+            stats["batch_size_histogram"][bucket] = stats["batch_size_histogram"].get(bucket, 0) + 1
+            self._flush_ms.append((finished - started) * 1000)
+            self._ack_ms.extend((finished - p.submitted) * 1000 for p in batch)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {"batches": 0, "units": 0, "errors": 0, "max_batch_size": 0, "batch_size_histogram": {}}
+            self._flush_ms = deque(maxlen=STATS_SAMPLES)
+            self._ack_ms = deque(maxlen=STATS_SAMPLES)
+
+    def stats(self):
+        """Batch sizes and latencies (ms): flush = one commit call, ack = submit until durable"""
+        with self._stats_lock:
+            stats = dict(self._stats, batch_size_histogram=dict(self._stats["batch_size_histogram"]))
+            flush_ms, ack_ms = list(self._flush_ms), list(self._ack_ms)
+        stats["window_ms"] = self.window * 1000
+        stats["max_batch"] = self.max_batch
+        stats["mean_batch_size"] = round(stats["units"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["flush_ms"] = _percentiles(flush_ms)
+        stats["ack_ms"] = _percentiles(ack_ms)
+        return stats
@@ -1,12 +1,15 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, session
 try:
-    from .data_manager import load_data, mark_habit_done, skip_habit, add_new_habit, get_weekly_data
+    from .data_manager import load_data, get_weekly_data, unit_of_work
+    from .reminders import get_scheduler, set_user_reminder, REMINDER_FILE
+    from .rebuild import warm_start
+    from .classifier import classify
 except Exception:
-    from data_manager import load_data, mark_habit_done, skip_habit, add_new_habit, get_weekly_data
-import os, datetime, random
-import threading, time
-
-REMINDER_FILE = os.path.join(os.path.dirname(__file__), "reminder.txt")
+    from data_manager import load_data, get_weekly_data, unit_of_work
+    from reminders import get_scheduler, set_user_reminder, REMINDER_FILE
+    from rebuild import warm_start
+    from classifier import classify
+import os, random
 
 # Reward system
 REWARD_CATEGORIES = {
@@ -38,10 +41,9 @@ MONTHLY_REWARDS = [
 
 def get_reward(habit_name):
     """Get a personalized reward based on habit"""
-    habit_lower = (habit_name or '').lower()
-    for category, rewards in REWARD_CATEGORIES.items():
-        if category in habit_lower:
-            return random.choice(rewards)
+    category = classify("reward", habit_name)
+    if category in REWARD_CATEGORIES:
+        return random.choice(REWARD_CATEGORIES[category])
     # Default rewards if no category match
     default_rewards = [
         'You earned a 10-min break! ☕',
@@ -51,30 +53,9 @@ def get_reward(habit_name):
     ]
     return random.choice(default_rewards)
 
-def get_reminder_time():
-    if os.path.exists(REMINDER_FILE):
-        with open(REMINDER_FILE, "r") as f:
-            t = f.read().strip()
-            if t:
-                h, m = map(int, t.split(":"))
-                return h, m
-    return 20, 0  # default 8 PM
-
 def reminder_loop():
-    from plyer import notification
-    while True:
-        h, m = get_reminder_time()
-        now = datetime.datetime.now()
-        target = now.replace(hour=h, minute=m, second=0)
-        wait = (target - now).total_seconds()
-        if wait < 0:
-            wait += 86400
-        time.sleep(wait)
-        notification.notify(
-            title="TrackIt Reminder 🌿",
-            message="Hey user! Time to update your habits!",
-            timeout=10
-        )
+    """Serve all users' reminders on the current thread (see reminders.ReminderScheduler)"""
+    get_scheduler().run()
 
 
 # Flask API handlers
@@ -83,7 +64,7 @@ def create_gui_routes(app):
     
     @app.route("/api/mark-done/<habit_name>", methods=["POST"])
     def mark_done(habit_name):
-        msg = mark_habit_done(habit_name)
+        msg, = unit_of_work().mark_done(habit_name).commit()
         quotes = [
             "Keep going, you're doing amazing! 💪",
             "Small steps lead to big change 🌱",
@@ -102,7 +83,7 @@ def create_gui_routes(app):
 
     @app.route("/api/skip-day/<habit_name>", methods=["POST"])
     def skip_day(habit_name):
-        msg = skip_habit(habit_name)
+        msg, = unit_of_work().skip(habit_name).commit()
         return jsonify({"status": "success", "message": msg})
 
     @app.route("/api/add-habit", methods=["POST"])
@@ -111,22 +92,21 @@ def create_gui_routes(app):
         habit_name = data.get("habit_name", "").strip()
         if not habit_name:
             return jsonify({"status": "error", "message": "Please enter a habit name!"}), 400
-        msg = add_new_habit(habit_name)
+        msg, = unit_of_work().add_habit(habit_name).commit()
         return jsonify({"status": "success", "message": msg})
 
     @app.route("/api/set-reminder", methods=["POST"])
     def set_reminder():
-        data = request.json
+        data = request.json or {}
         time_str = data.get("time", "").strip()
+        # Always the session user's own reminder; without one, the shared reminder in reminder.txt
+        user_name = (session.get("user_name") or "").strip()
         try:
-            h, m = map(int, time_str.split(":"))
-            if 0 <= h < 24 and 0 <= m < 60:
-                with open(REMINDER_FILE, "w") as f:
-                    f.write(time_str)
-                return jsonify({"status": "success", "message": f"Reminder set for {time_str}"})
-            else:
+            time_str = set_user_reminder(user_name, time_str)
+            return jsonify({"status": "success", "message": f"Reminder set for {time_str}"})
+        except ValueError:
+            if time_str.replace(":", "", 1).isdigit():
                 return jsonify({"status": "error", "message": "Please enter valid time (00:00–23:59)"}), 400
-        except:
             return jsonify({"status": "error", "message": "Invalid format! Example: 20:30"}), 400
 
     @app.route("/api/weekly-reward", methods=["GET"])
@@ -142,12 +122,13 @@ def create_gui_routes(app):
         return jsonify({"status": "success", "reward": reward})
 
 def run_app():
-    """Start the reminder background thread"""
-    threading.Thread(target=reminder_loop, daemon=True).start()
+    """Start the reminder background thread and warm the completion index"""
+    get_scheduler().start()
+    warm_start()
 
 if __name__ == "__main__":
     # For testing, the Flask app from app.py should be used instead
     from app import app
     create_gui_routes(app)
-    threading.Thread(target=reminder_loop, daemon=True).start()
+    run_app()
     app.run(debug=True)
@@ -0,0 +1,47 @@
+"""
+Case-insensitive habit name index.
+
+Names are folded (NFKC + casefold, surrounding whitespace dropped) so "Read",
+"read " and "READ" are the same habit. A dict on the folded name gives O(1)
+duplicate checks, and a sorted array of folded names answers prefix queries
+for autocomplete with one bisection plus the matches returned.
+"""
+import unicodedata
+from bisect import bisect_left
+
+
+def fold(name):
+    """Comparison key for a habit name"""
+    return unicodedata.normalize("NFKC", str(name or "")).casefold().strip()
+
+
+class HabitNameIndex:
+    """Immutable index over (habit_name, habit_id) pairs"""
+
+    def __init__(self, habits=()):
+        self._by_key = {}
+        for name, habit_id in habits:
+            self._by_key.setdefault(fold(name), (str(name), habit_id))
+        self._keys = sorted(self._by_key)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        return fold(name) in self._by_key
+
+    def get(self, name):
+        """(stored name, habit_id) for a name in any case, or None"""
+        return self._by_key.get(fold(name))
+
+    def suggest(self, prefix, limit=10):
+        """Up to `limit` (name, habit_id) pairs whose folded name starts with `prefix`, alphabetically"""
+        key = fold(prefix)
+        if not key or limit <= 0:
+            return []
+        out = []
+        for i in range(bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key) or len(out) >= limit:
+                break
+            out.append(self._by_key[self._keys[i]])
+        return out
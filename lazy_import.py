@@ -0,0 +1,29 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a heavy module that is imported on first attribute access.
+
+    `pd = LazyModule("pandas")` keeps `pd.read_csv(...)` call sites unchanged
+    while moving the import cost from startup to the first request that needs it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
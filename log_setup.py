@@ -0,0 +1,227 @@
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+LOG_FILE = os.environ.get('TRACKIT_LOG_FILE', 'trackit.log')
+LOG_LEVEL = os.environ.get('TRACKIT_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('TRACKIT_LOG_FORMAT', 'json')  # json | text
+LOG_MAX_BYTES = int(os.environ.get('TRACKIT_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('TRACKIT_LOG_BACKUPS', '7'))
+LOG_ROTATE_HOURS = float(os.environ.get('TRACKIT_LOG_ROTATE_HOURS', '24'))
+LOG_COMPRESS = os.environ.get('TRACKIT_LOG_COMPRESS', '1') == '1'
+LOG_QUEUE_SIZE = int(os.environ.get('TRACKIT_LOG_QUEUE_SIZE', '10000'))
+LOG_BATCH_SIZE = 256
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_rotator(source, dest):
+    """Compress a rotated log file and remove the original"""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every `interval` seconds.
+
+    Flushes are deferred while a batch is being written so the listener
+    thread pays for one flush per batch instead of one per record.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, interval=0, compress=False):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval > 0 else None
+        self._batching = False
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = _gzip_rotator
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval > 0:
+            self.rollover_at = time.time() + self.interval
+
+    def flush(self):
+        if not self._batching:
+            super().flush()
+
+    def handle_batch(self, records):
+        """Write several records and flush once"""
+        self._batching = True
+        try:
+            for record in records:
+                self.handle(record)
+        finally:
+            self._batching = False
+        self.flush()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener:
+    """Background thread draining the log queue in batches into the real handlers"""
+
+    _sentinel = None
+
+    def __init__(self, log_queue, handlers, batch_size=LOG_BATCH_SIZE):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="trackit-log-writer", daemon=True)
+        self._thread.start()
+
+    def _dispatch(self, batch):
+        for handler in self.handlers:
+            records = [r for r in batch if r.levelno >= handler.level]
+            if not records:
+                continue
+            try:
+                if hasattr(handler, "handle_batch"):
+                    handler.handle_batch(records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+            except Exception:
+                handler.handleError(records[-1])
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            stop = record is self._sentinel
+            batch = [] if stop else [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                    break
+                batch.append(record)
+            if batch:
+                self._dispatch(batch)
+            if stop:
+                return
+
+    def stop(self):
+        """Flush everything still queued and stop the writer thread"""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.flush()
+
+
+_listener = None
+_queue_handler = None
+
+
+def configure_logging(log_file=LOG_FILE):
+    """Route all logging through a non-blocking queue to a background writer.
+
+    The file handler rotates by size (TRACKIT_LOG_MAX_BYTES) and age
+    (TRACKIT_LOG_ROTATE_HOURS), optionally gzips rotated files and writes
+    JSON lines unless TRACKIT_LOG_FORMAT=text. Console output stays plain text.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    file_handler = SizeAndTimeRotatingFileHandler(
+        log_file,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        interval=LOG_ROTATE_HOURS * 3600,
+        compress=LOG_COMPRESS,
+    )
+    file_handler.setFormatter(JsonLinesFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = BatchingQueueListener(log_queue, [file_handler, console_handler])
+    _listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def reinit_after_fork(log_file=LOG_FILE):
+    """Start a new queue and writer thread in a forked child process.
+
+    The parent's writer thread does not exist in the child, so records put
+    on the inherited queue would never be written.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+    _listener = _queue_handler = None
+    return configure_logging(log_file)
+
+
+def shutdown_logging():
+    """Drain queued records to disk; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    """Number of log records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -1,5 +1,27 @@
+import argparse
+import multiprocessing
+
 from app import app
+from rebuild import warm_start
 
-if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run TrackIt")
+    parser.add_argument("--prod", action="store_true",
+                        help="serve with the multi-worker production server (see serve.py)")
+    parser.add_argument("--bind", default=None, help="host:port (default TRACKIT_BIND or 0.0.0.0:5000)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default 2 x CPUs + 1)")
+    parser.add_argument("--threads", type=int, default=None, help="threads per worker")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    # Needed by the rebuild worker pool in a PyInstaller build
+    multiprocessing.freeze_support()
+    args = parse_args()
+    if args.prod:
+        import serve
+        serve.serve(bind=args.bind or serve.BIND, workers=args.workers, threads=args.threads or serve.THREADS)
+    else:
+        warm_start()
+        app.run(debug=True, host='0.0.0.0', port=5000)
@@ -6,7 +6,10 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # pandas is imported by name via lazy_import.LazyModule, which the analyser can't see;
+    # gunicorn loads its worker and logger classes from strings (main.py --prod)
+    hiddenimports=['pandas', 'gunicorn.glogging', 'gunicorn.workers.sync',
+                   'gunicorn.workers.gthread', 'waitress'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,174 @@
+import os
+import heapq
+import logging
+import threading
+import tracemalloc
+from functools import wraps
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+MEMTRACE_ENABLED = os.environ.get('TRACKIT_MEMTRACE', '0') == '1'
+MEMTRACE_FRAMES = int(os.environ.get('TRACKIT_MEMTRACE_FRAMES', '5') or 5)
+MEMTRACE_WORST_N = int(os.environ.get('TRACKIT_MEMTRACE_WORST', '10') or 10)
+MEMTRACE_TOP_SITES = 10
+
+_lock = threading.Lock()
+_local = threading.local()
+_route_stats = {}
+_call_stats = {}
+_worst_requests = []  # min-heap of (peak_bytes, seq, record)
+_seq = 0
+
+# tracemalloc's peak counter is process-wide, so concurrent requests on a
+# threaded server can inflate each other's peaks; numbers are upper bounds.
+
+
+def is_enabled():
+    """Return True when tracemalloc instrumentation is active"""
+    return MEMTRACE_ENABLED and tracemalloc.is_tracing()
+
+
+def start():
+    """Start tracemalloc if TRACKIT_MEMTRACE=1"""
+    if MEMTRACE_ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start(MEMTRACE_FRAMES)
+        logger.info(f"Memory tracing enabled ({MEMTRACE_FRAMES} frames)")
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _enter():
+    """Begin a measured section; nested sections keep the outer peak intact"""
+    stack = _stack()
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, current])
+
+
+def _exit():
+    """Finish the innermost section and return its peak growth in bytes"""
+    stack = _stack()
+    _current, peak = tracemalloc.get_traced_memory()
+    start_bytes, peak_seen = stack.pop()
+    peak = max(peak, peak_seen)
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return max(0, peak - start_bytes)
+
+
+def _record(table, key, peak):
+    entry = table.setdefault(key, {"count": 0, "total_peak": 0, "max_peak": 0, "last_peak": 0})
+    entry["count"] += 1
+    entry["total_peak"] += peak
+    entry["max_peak"] = max(entry["max_peak"], peak)
+    entry["last_peak"] = peak
+
+
+def track_memory(func):
+    """Decorator recording the peak allocation of each call when tracing is on"""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_enabled():
+            return func(*args, **kwargs)
+        _enter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            peak = _exit()
+            with _lock:
+                _record(_call_stats, name, peak)
+    return wrapper
+
+
+def _top_sites():
+    """Largest live allocation sites, excluding tracemalloc's own frames"""
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    sites = []
+    for stat in snapshot.statistics("lineno")[:MEMTRACE_TOP_SITES]:
+        frame = stat.traceback[0]
+        sites.append({"site": f"{frame.filename}:{frame.lineno}", "size": stat.size, "count": stat.count})
+    return sites
+
+
+def _is_worst(peak):
+    return len(_worst_requests) < MEMTRACE_WORST_N or peak > _worst_requests[0][0]
+
+
+def install_memory_tracking(app):
+    """Register request hooks measuring peak allocated bytes per route"""
+    from flask import g, request
+
+    start()
+    if not is_enabled():
+        return
+
+    @app.before_request
+    def _start_memory():
+        if request.endpoint == 'static':
+            return
+        _enter()
+        g._trackit_memtrace = True
+
+    @app.teardown_request
+    def _finish_memory(exc):
+        global _seq
+        if not g.pop('_trackit_memtrace', False):
+            return
+        peak = _exit()
+        route = request.url_rule.rule if request.url_rule else request.path
+        with _lock:
+            _record(_route_stats, route, peak)
+            worst = _is_worst(peak)
+        if worst:
+            # Snapshots are expensive, so only take them for candidate worst requests
+            record = {"route": route, "method": request.method, "path": request.full_path.rstrip('?'),
+                      "peak_bytes": peak, "top_sites": _top_sites()}
+            with _lock:
+                if _is_worst(peak):
+                    _seq += 1
+                    if len(_worst_requests) >= MEMTRACE_WORST_N:
+                        heapq.heapreplace(_worst_requests, (peak, _seq, record))
+                    else:
+                        heapq.heappush(_worst_requests, (peak, _seq, record))
+        logger.info(f"Memory {request.method} {route}: peak {peak / 1024:.1f} KiB")
+
+
+def _summarize(table):
+    rows = []
+    for key, entry in table.items():
+        row = dict(entry, name=key)
+        row["avg_peak"] = int(entry["total_peak"] / entry["count"]) if entry["count"] else 0
+        rows.append(row)
+    return sorted(rows, key=lambda r: r["max_peak"], reverse=True)
+
+
+def get_memory_report():
+    """Return per-route and per-call peak statistics plus the worst requests"""
+    with _lock:
+        routes = _summarize(_route_stats)
+        calls = _summarize(_call_stats)
+        worst = [rec for _peak, _s, rec in sorted(_worst_requests, reverse=True)]
+    current, peak = tracemalloc.get_traced_memory() if is_enabled() else (0, 0)
+    return {"enabled": is_enabled(), "traced_current": current, "traced_peak": peak,
+            "routes": routes, "calls": calls, "worst_requests": worst}
+
+
+def reset_stats():
+    """Clear collected statistics"""
+    with _lock:
+        _route_stats.clear()
+        _call_stats.clear()
+        del _worst_requests[:]
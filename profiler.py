@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+from flask import g, request
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get(
+    'TRACKIT_PROFILE_DIR', os.path.join(os.path.dirname(__file__), "profiles")
+)
+PROFILE_HEADER = 'X-TrackIt-Profile'
+PROFILE_SAMPLE_RATE = float(os.environ.get('TRACKIT_PROFILE_SAMPLE_RATE', '0') or 0)
+PROFILE_MAX_FILES = int(os.environ.get('TRACKIT_PROFILE_MAX_FILES', '50') or 50)
+# Most functions a summary lists
+PROFILE_MAX_TOP = 50
+
+# Parsed summaries (PROFILE_MAX_TOP functions) keyed by profile id, oldest first;
+# pstats files never change once written
+_summary_cache = {}
+
+
+def _should_profile(authorize):
+    """Decide whether the current request gets profiled"""
+    if request.endpoint == 'static':
+        return False
+    if request.headers.get(PROFILE_HEADER) and authorize():
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _rotate_profiles():
+    """Keep only the newest PROFILE_MAX_FILES profiles on disk"""
+    try:
+        names = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".pstats"))
+        for name in names[:-PROFILE_MAX_FILES] if PROFILE_MAX_FILES > 0 else names:
+            profile_id = name[:-len(".pstats")]
+            for ext in (".pstats", ".json"):
+                path = os.path.join(PROFILE_DIR, profile_id + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+            _summary_cache.pop(profile_id, None)
+    except OSError as e:
+        logger.error(f"Error rotating profiles: {e}")
+
+
+def _save_profile(profiler, response, duration):
+    """Write pstats plus a small JSON sidecar describing the request"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # Timestamp prefix keeps lexical order == creation order for rotation
+    profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, profile_id + ".pstats"))
+    meta = {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "created_at": time.time(),
+    }
+    with open(os.path.join(PROFILE_DIR, profile_id + ".json"), "w") as f:
+        json.dump(meta, f)
+    _rotate_profiles()
+    return profile_id
+
+
+def install_profiler(app, authorize=lambda: False):
+    """Register request hooks that wrap selected requests in cProfile.
+
+    A request is profiled when it carries the X-TrackIt-Profile header and
+    `authorize()` accepts it, or when it is picked by TRACKIT_PROFILE_SAMPLE_RATE.
+    """
+
+    @app.before_request
+    def _start_profile():
+        if not _should_profile(authorize):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. concurrent request on 3.12+)
+            return
+        g._trackit_profiler = profiler
+        g._trackit_profile_start = time.perf_counter()
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop('_trackit_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration = time.perf_counter() - g.pop('_trackit_profile_start', time.perf_counter())
+        try:
+            profile_id = _save_profile(profiler, response, duration)
+            response.headers['X-TrackIt-Profile-Id'] = profile_id
+            logger.info(f"Profiled {request.method} {request.path} in {duration * 1000:.1f} ms ({profile_id})")
+        except Exception as e:
+            logger.error(f"Error saving profile: {e}")
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc):
+        # after_request is skipped if the response could not be built
+        profiler = g.pop('_trackit_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+
+def summarize_profile(profile_id, top_n=10):
+    """Return request metadata and the top functions (at most PROFILE_MAX_TOP) of a saved profile"""
+    top_n = max(1, min(int(top_n), PROFILE_MAX_TOP))
+    meta = _summary_cache.get(profile_id)
+    if meta is None:
+        meta = _read_summary(profile_id)
+        _summary_cache[profile_id] = meta
+        while len(_summary_cache) > max(1, PROFILE_MAX_FILES):
+            _summary_cache.pop(next(iter(_summary_cache)))
+    return dict(meta, top_functions=meta["top_functions"][:top_n])
+
+
+def _read_summary(profile_id):
+    meta_path = os.path.join(PROFILE_DIR, profile_id + ".json")
+    meta = {"id": profile_id}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+    stats = pstats.Stats(os.path.join(PROFILE_DIR, profile_id + ".pstats"))
+    stats.sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:PROFILE_MAX_TOP]:
+        cc, nc, tt, ct, _callers = stats.stats[func]
+        filename, line, name = func
+        top.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        })
+    meta["top_functions"] = top
+    meta["total_ms"] = round(stats.total_tt * 1000, 3)
+    return meta
+
+
+def list_recent_profiles(limit=20, top_n=10):
+    """List the newest saved profiles with their top functions"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".pstats")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            profiles.append(summarize_profile(name[:-len(".pstats")], top_n=top_n))
+        except Exception as e:
+            logger.error(f"Error reading profile {name}: {e}")
+    return profiles
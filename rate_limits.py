@@ -0,0 +1,78 @@
+"""
+Sliding-window request limits (see app.rate_limit).
+
+Request times are kept per client in memory. Under serve.py's gunicorn
+workers each process would only count the requests it served, so the
+server calls share() before forking: from then on the times live in
+RATE_LIMITS_FILE, read and rewritten under an exclusive flock on every
+check, and all workers count all requests. Without fcntl (Windows, where
+serve.py runs one process) the limiter stays in memory.
+"""
+import os
+import json
+import time
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RATE_LIMITS_FILE = os.path.join(os.path.dirname(__file__), "data", "rate_limits.json")
+
+
+def _take(store, key, max_requests, now):
+    """Drop expired request times from `store` ({"<window>:<who>": [times]}), then count a
+    request for `key` unless it already made `max_requests`; returns whether it is allowed
+    """
+    for k in list(store):
+        window = float(k.split(":", 1)[0])
+        recent = [t for t in store[k] if now - t < window]
+        if recent:
+            store[k] = recent
+        else:
+            del store[k]
+    recent = store.setdefault(key, [])
+    if len(recent) >= max_requests:
+        return False
+    recent.append(now)
+    return True
+
+
+class RateLimiter:
+    """Request times per client and window, in process memory or in a file shared by processes"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._store = {}
+
+    def share(self, path=RATE_LIMITS_FILE):
+        """Keep request times in `path`, so every process using it counts them"""
+        if fcntl is not None:
+            self.path = path
+
+    def hit(self, identifier, max_requests, window, now=None):
+        """Record a request by `identifier`; False if it is over `max_requests` per `window` seconds"""
+        key = f"{window}:{identifier}"
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.path is None:
+                return _take(self._store, key, max_requests, now)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".lock", "a", encoding="utf-8") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            store = json.load(f)
+                    except (OSError, ValueError):
+                        store = {}
+                    allowed = _take(store, key, max_requests, now)
+                    # Replaced whole, so a crash never leaves a torn file
+                    tmp = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(store, f)
+                    os.replace(tmp, self.path)
+                    return allowed
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,265 @@
+"""
+Parallel rebuild of the derived completion index.
+
+Streaks, calendar counts and done-today checks all come from per-(user, habit)
+completion bitmaps derived from the event history (data_manager.completion_index).
+After a crash, a migration or a bulk import they have to be rebuilt from
+scratch. The history is split into chunks (one per month partition of the
+event store, or byte ranges of events.csv), each chunk is aggregated into
+partial bitmaps in a process pool, and the partials are ORed together.
+
+The finished index is saved to data/derived/completion_index.pickle along
+with the event-log signature it was built from. warm_start() loads that
+snapshot on startup; if the log has changed since, the stale snapshot keeps
+serving requests while a background rebuild runs, and the new index (plus
+any completions recorded meanwhile) is swapped in when it finishes.
+
+    python rebuild.py [--workers N] [--chunk-bytes N]
+"""
+import os
+import io
+import csv
+import sys
+import time
+import pickle
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+try:
+    from . import data_manager
+    from .event_store import EventStore, to_ordinal
+    from .completion_bitmaps import CompletionBitmaps
+except Exception:
+    import data_manager
+    from event_store import EventStore, to_ordinal
+    from completion_bitmaps import CompletionBitmaps
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+INDEX_SNAPSHOT = os.path.join(os.path.dirname(__file__), "data", "derived", "completion_index.pickle")
+SNAPSHOT_VERSION = 1
+REBUILD_WORKERS = int(os.environ.get("TRACKIT_REBUILD_WORKERS", "0")) or os.cpu_count() or 1
+CHUNK_BYTES = int(os.environ.get("TRACKIT_REBUILD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+_status_lock = threading.Lock()
+_status = {"state": "idle", "chunks_done": 0, "chunks_total": 0, "events": 0,
+           "workers": 0, "started_at": None, "elapsed": None, "error": None}
+
+
+def rebuild_status():
+    """Progress of the current or last rebuild"""
+    with _status_lock:
+        status = dict(_status)
+    if status["state"] == "running" and status["started_at"]:
+        status["elapsed"] = round(time.time() - status["started_at"], 3)
+    return status
+
+
+def _set_status(**fields):
+    with _status_lock:
+        _status.update(fields)
+
+
+# --- Chunking and per-chunk aggregation (runs in worker processes) ---
+
+def plan_chunks(chunk_bytes=CHUNK_BYTES):
+    """Split the event history into independently aggregatable chunk specs"""
+    store = data_manager._event_store()
+    if store is not None:
+        return [("store", store.path, month) for month in store.partitions()]
+    data_manager._ensure_events()
+    path = data_manager.EVENTS_PATH
+    size = os.path.getsize(path)
+    chunk_bytes = max(int(chunk_bytes), 1)
+    return [("csv", path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def _csv_lines(path, start, end):
+    """Lines of events.csv whose first byte lies in [start, end), header excluded"""
+    with open(path, "rb") as f:
+        if start == 0:
+            f.readline()
+        else:
+            # Land on the first line starting at or after `start`
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode("utf-8")
+
+
+def aggregate_chunk(spec):
+    """Build partial bitmaps for one chunk; returns (events read, CompletionBitmaps.dump())"""
+    bitmaps = CompletionBitmaps()
+    rows = 0
+    if spec[0] == "store":
+        _kind, path, month = spec
+        store = EventStore(path, auto_freeze=False)
+        users = store.user_names()
+        for _month, (day, habit, user) in store.iter_partitions([month]):
+            for d, h, u in zip(day.tolist(), habit.tolist(), user.tolist()):
+                bitmaps.add(users[u], h, d)
+                rows += 1
+    else:
+        _kind, path, start, end = spec
+        for row in csv.reader(io.StringIO("".join(_csv_lines(path, start, end)))):
+            if len(row) < 2:
+                continue
+            ordinal = to_ordinal(row[0])
+            try:
+                habit_id = int(row[1])
+            except ValueError:
+                continue
+            if ordinal is not None:
+                bitmaps.add(row[2] if len(row) > 2 else '', habit_id, ordinal)
+                rows += 1
+    return rows, bitmaps.dump()
+
+
+# --- Rebuild ---
+
+def rebuild_index(workers=None, chunk_bytes=CHUNK_BYTES, progress=None):
+    """Aggregate every chunk (in parallel when there is more than one) and merge the partials.
+    Returns (bitmaps, signature the history had when the rebuild started, events read).
+    """
+    signature = data_manager._events_signature()
+    chunks = plan_chunks(chunk_bytes)
+    workers = max(1, min(workers or REBUILD_WORKERS, len(chunks) or 1))
+    bitmaps = CompletionBitmaps()
+    events = 0
+    started = time.perf_counter()
+
+    def merge(done, result):
+        nonlocal events
+        rows, partial = result
+        events += rows
+        for row in partial:
+            bitmaps.merge(*row)
+        if progress is not None:
+            progress(done, len(chunks), events, time.perf_counter() - started)
+
+    if workers == 1:
+        for done, spec in enumerate(chunks, 1):
+            merge(done, aggregate_chunk(spec))
+    else:
+        # spawn: forking a process that runs the log writer and scheduler threads is unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(aggregate_chunk, spec) for spec in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                merge(done, future.result())
+    return bitmaps, signature, events
+
+
+def save_snapshot(bitmaps, signature, path=INDEX_SNAPSHOT, position=None):
+    """Persist a complete index with the event-log signature (and position) it reflects"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": SNAPSHOT_VERSION, "signature": signature, "position": position,
+                     "bitmaps": bitmaps.dump()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path=INDEX_SNAPSHOT):
+    """Return (bitmaps, signature, position or None) from a saved snapshot, or None"""
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return CompletionBitmaps.load(data["bitmaps"]), tuple(data["signature"]), data.get("position")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable index snapshot {path}: {e}")
+        return None
+
+
+def _log_progress(done, total, events, elapsed):
+    _set_status(chunks_done=done, events=events)
+    # Roughly every 10% so long rebuilds don't flood the log
+    if total and (done == total or done * 10 // total != (done - 1) * 10 // total):
+        logger.info(f"Index rebuild: {done}/{total} chunks, {events} events, {elapsed:.2f}s")
+
+
+def run_rebuild(workers=None, chunk_bytes=CHUNK_BYTES, snapshot_path=INDEX_SNAPSHOT):
+    """Rebuild, persist and install the completion index; returns True on success"""
+    with _status_lock:
+        if _status["state"] == "running":
+            return False
+        _status.update(state="running", chunks_done=0, chunks_total=0, events=0, error=None,
+                       workers=0, started_at=time.time(), elapsed=None)
+    data_manager.begin_index_rebuild()
+    try:
+        chunks = len(plan_chunks(chunk_bytes))
+        _set_status(chunks_total=chunks, workers=max(1, min(workers or REBUILD_WORKERS, chunks or 1)))
+        # Everything appended after this point is read again when the index is next queried
+        position = data_manager.events_position()
+        bitmaps, signature, events = rebuild_index(workers, chunk_bytes, progress=_log_progress)
+        # Save before installing: the snapshot must match its signature exactly
+        save_snapshot(bitmaps, signature, snapshot_path, position)
+        data_manager.install_completion_index(bitmaps, signature, position=position)
+    except Exception as e:
+        data_manager.abort_index_rebuild()
+        logger.error(f"Index rebuild failed: {e}")
+        _set_status(state="failed", error=str(e), elapsed=round(time.time() - _status["started_at"], 3))
+        return False
+    elapsed = round(time.time() - _status["started_at"], 3)
+    _set_status(state="done", elapsed=elapsed)
+    logger.info(f"Index rebuild finished: {events} events, {len(bitmaps)} bitmaps in {elapsed}s")
+    return True
+
+
+def start_background_rebuild(workers=None):
+    """Run run_rebuild() on a daemon thread; returns False if one is already running"""
+    if rebuild_status()["state"] == "running":
+        return False
+    thread = threading.Thread(target=run_rebuild, kwargs={"workers": workers}, name="trackit-rebuild", daemon=True)
+    thread.start()
+    return True
+
+
+def warm_start(snapshot_path=INDEX_SNAPSHOT, background=True):
+    """Load the saved index; if the event log moved on, serve it stale and rebuild in the background.
+    With background=False the rebuild runs before returning (used before forking server workers).
+    """
+    try:
+        snapshot = load_snapshot(snapshot_path)
+        if snapshot is not None:
+            bitmaps, signature, position = snapshot
+            if signature == tuple(data_manager._events_signature()):
+                data_manager.install_completion_index(bitmaps, signature, position=position)
+                logger.info(f"Loaded completion index snapshot ({len(bitmaps)} bitmaps)")
+                return False
+            data_manager.begin_index_rebuild()
+            data_manager.install_completion_index(bitmaps, signature, stale=True)
+            logger.info("Event log changed since the last index snapshot; serving it stale while rebuilding")
+        if not background:
+            return run_rebuild()
+        return start_background_rebuild()
+    except Exception as e:
+        logger.error(f"Error warming completion index: {e}")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the derived completion index from the event history")
+    parser.add_argument("--workers", type=int, default=None, help=f"worker processes (default {REBUILD_WORKERS})")
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES, help="events.csv bytes per chunk")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    ok = run_rebuild(args.workers, args.chunk_bytes)
+    status = rebuild_status()
+    print(f"{status['state']}: {status['events']} events in {status['chunks_total']} chunks, "
+          f"{status['workers']} workers, {status['elapsed']}s")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
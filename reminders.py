@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import heapq
+import logging
+import itertools
+import threading
+from datetime import datetime, timedelta
+try:
+    import fcntl
+except ImportError:
+    # Windows: the production server (serve.py) runs one process there
+    fcntl = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+REMINDER_FILE = os.path.join(os.path.dirname(__file__), "reminder.txt")
+REMINDERS_FILE = os.path.join(os.path.dirname(__file__), "data", "reminders.json")
+DEFAULT_REMINDER = (20, 0)  # 8 PM
+GLOBAL_USER = ""  # the single reminder stored in reminder.txt
+
+
+def parse_reminder_time(time_str):
+    """Parse 'HH:MM' into (hour, minute); raise ValueError if out of range"""
+    h, m = map(int, time_str.strip().split(":"))
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"Invalid reminder time: {time_str}")
+    return h, m
+
+
+def next_fire_time(hour, minute, now):
+    """Timestamp of the next local hour:minute strictly after `now`"""
+    current = datetime.fromtimestamp(now)
+    target = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target.timestamp() <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+
+def reminder_message(user_name):
+    """Notification text for a user's reminder"""
+    return f"Hey {user_name or 'there'}! Time to update your habits!"
+
+
+class PlyerNotifier:
+    """Desktop notification sink (default)"""
+
+    def __call__(self, user_name, message):
+        from plyer import notification
+        notification.notify(title="TrackIt Reminder 🌿", message=message, timeout=10)
+
+
+class ReminderScheduler:
+    """Per-user daily reminders served from one thread via a timer heap.
+
+    The heap holds (fire_at, seq, user_name) entries. Changing or removing a
+    reminder bumps the user's live seq, so superseded entries are skipped
+    when they reach the top instead of being searched for and removed.
+    """
+
+    def __init__(self, notifier=None, clock=time.time):
+        self.notifier = notifier or PlyerNotifier()
+        self.clock = clock
+        self._heap = []
+        self._times = {}
+        self._live_seq = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def _schedule(self, user_name, now):
+        h, m = self._times[user_name]
+        seq = next(self._seq)
+        self._live_seq[user_name] = seq
+        heapq.heappush(self._heap, (next_fire_time(h, m, now), seq, user_name))
+
+    def set_reminder(self, user_name, hour, minute):
+        """Add or change a user's reminder; takes effect immediately"""
+        with self._cond:
+            self._times[user_name] = (hour, minute)
+            self._schedule(user_name, self.clock())
+            self._cond.notify()
+
+    def remove_reminder(self, user_name):
+        """Cancel a user's reminder"""
+        with self._cond:
+            self._times.pop(user_name, None)
+            self._live_seq.pop(user_name, None)
+            self._cond.notify()
+
+    def get_reminder(self, user_name):
+        """Return 'HH:MM' for a user, or None"""
+        with self._cond:
+            t = self._times.get(user_name)
+        return f"{t[0]:02d}:{t[1]:02d}" if t else None
+
+    def __len__(self):
+        return len(self._times)
+
+    def _pop_due(self, now):
+        """Pop due live entries and reschedule them for tomorrow"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _fire_at, seq, user_name = heapq.heappop(self._heap)
+            if self._live_seq.get(user_name) != seq:
+                continue  # superseded or removed
+            due.append(user_name)
+            self._schedule(user_name, now)
+        # Drop stale entries from the top so the next wait is accurate
+        while self._heap and self._live_seq.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return due
+
+    def _dispatch(self, users):
+        for user_name in users:
+            try:
+                self.notifier(user_name, reminder_message(user_name))
+            except Exception as e:
+                logger.error(f"Reminder notification failed for {user_name or 'global'}: {e}")
+
+    def run_pending(self, now=None):
+        """Fire every reminder due at `now`; returns the users notified"""
+        with self._cond:
+            due = self._pop_due(self.clock() if now is None else now)
+        self._dispatch(due)
+        return due
+
+    def run(self):
+        """Block the current thread serving reminders until stop()"""
+        with self._cond:
+            self._running = True
+        self._serve()
+
+    def _serve(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                due = self._pop_due(self.clock())
+                if not due:
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    # Woken early by set_reminder/remove_reminder/stop
+                    self._cond.wait(timeout=max(0, timeout) if timeout is not None else None)
+                    continue
+            self._dispatch(due)
+
+    def start(self):
+        """Run the scheduler on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            # Set here, not in the thread, so a stop() before it gets to run is not undone
+            with self._cond:
+                self._running = True
+            self._thread = threading.Thread(target=self._serve, name="trackit-reminders", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+# --- Persistence ---
+
+def load_reminders():
+    """Return {user_name: 'HH:MM'} including the legacy global reminder under ''"""
+    reminders = {}
+    try:
+        if os.path.exists(REMINDERS_FILE):
+            with open(REMINDERS_FILE, "r") as f:
+                reminders = json.load(f) or {}
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"Error loading reminders: {e}")
+    if GLOBAL_USER not in reminders:
+        try:
+            if os.path.exists(REMINDER_FILE):
+                with open(REMINDER_FILE, "r") as f:
+                    t = f.read().strip()
+                if t:
+                    reminders[GLOBAL_USER] = t
+        except IOError as e:
+            logger.error(f"Error loading reminder file: {e}")
+    return reminders
+
+
+def _replace_file(path, write):
+    """Write through a temp file and rename it over `path`, so readers never see a torn file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# Serializes the read-modify-write of REMINDERS_FILE across threads; an flock
+# on REMINDERS_FILE + ".lock" does the same across worker processes
+_save_lock = threading.Lock()
+
+
+def save_reminder(user_name, time_str):
+    """Persist one user's reminder ('' writes the legacy reminder.txt)"""
+    if user_name == GLOBAL_USER:
+        _replace_file(REMINDER_FILE, lambda f: f.write(time_str))
+        return
+    with _save_lock:
+        os.makedirs(os.path.dirname(REMINDERS_FILE), exist_ok=True)
+        with open(REMINDERS_FILE + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                reminders = {}
+                if os.path.exists(REMINDERS_FILE):
+                    with open(REMINDERS_FILE, "r") as f:
+                        reminders = json.load(f) or {}
+                reminders[user_name] = time_str
+                _replace_file(REMINDERS_FILE, lambda f: json.dump(reminders, f, indent=2))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Shared scheduler loaded from disk; the global reminder defaults to 20:00"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+            reminders = load_reminders()
+            reminders.setdefault(GLOBAL_USER, "%02d:%02d" % DEFAULT_REMINDER)
+            for user_name, time_str in reminders.items():
+                try:
+                    _scheduler.set_reminder(user_name, *parse_reminder_time(time_str))
+                except ValueError as e:
+                    logger.warning(f"Skipping reminder for {user_name or 'global'}: {e}")
+    return _scheduler
+
+
+def set_user_reminder(user_name, time_str):
+    """Validate, persist and schedule a reminder; raises ValueError on bad input"""
+    h, m = parse_reminder_time(time_str)
+    normalized = f"{h:02d}:{m:02d}"
+    save_reminder(user_name, normalized)
+    get_scheduler().set_reminder(user_name, h, m)
+    return normalized
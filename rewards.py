@@ -0,0 +1,190 @@
+"""
+Data-driven rewards engine.
+
+Rules come from a JSON file (TRACKIT_REWARDS_FILE, default data/rewards.json)
+or DEFAULT_RULES when it does not exist:
+
+    {
+      "rules": [
+        {"kind": "points",   "threshold": 50, "name": "Bronze Badge 🥉"},
+        {"kind": "streak",   "threshold": 7,  "name": "Week Warrior 🔥"},
+        {"kind": "category", "category": "read", "threshold": 10, "name": "Bookworm 📚"}
+      ],
+      "categories": {"read": ["read", "book", "pages"]}
+    }
+
+points rules fire on a user's point total, streak rules on the current
+streak of the habit just completed, category rules on how many completions
+a user has in a habit category (habits are put in the first category whose
+keyword appears in their name).
+
+Thresholds are kept sorted per kind (and per category), and each user keeps
+a high-water mark per kind in points.json ("reward_progress"; reset when the
+rules change), so a change from one value to the next finds the newly
+crossed milestones with two bisections. Earned reward names are kept as a
+per-user set, so neither the number of rules nor the number of rewards a
+user already has is scanned.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime
+try:
+    from .classifier import KeywordClassifier
+except Exception:
+    from classifier import KeywordClassifier
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+REWARDS_FILE = os.environ.get(
+    "TRACKIT_REWARDS_FILE", os.path.join(os.path.dirname(__file__), "data", "rewards.json")
+)
+
+DEFAULT_RULES = {
+    "rules": [
+        {"kind": "points", "threshold": 50, "name": "Bronze Badge 🥉"},
+        {"kind": "points", "threshold": 100, "name": "Silver Badge 🥈"},
+        {"kind": "points", "threshold": 200, "name": "Gold Badge 🥇"},
+        {"kind": "streak", "threshold": 7, "name": "Week Warrior 🔥"},
+        {"kind": "streak", "threshold": 30, "name": "Monthly Master 🏆"},
+        {"kind": "category", "category": "read", "threshold": 10, "name": "Bookworm 📚"},
+        {"kind": "category", "category": "exercise", "threshold": 10, "name": "Fitness Fan 💪"},
+        {"kind": "category", "category": "meditation", "threshold": 10, "name": "Zen Master 🧘"},
+        {"kind": "category", "category": "water", "threshold": 30, "name": "Hydration Hero 💧"},
+    ],
+    "categories": {
+        "read": ["read", "book", "pages"],
+        "exercise": ["run", "jog", "walk", "exercise", "gym"],
+        "meditation": ["medit", "yoga"],
+        "water": ["water", "drink"],
+    },
+}
+
+RULE_KINDS = ("points", "streak", "category")
+
+
+class RewardEngine:
+    """Sorted milestone tables plus per-user earned sets"""
+
+    def __init__(self, config):
+        # Progress recorded under other rules is re-evaluated from zero (the earned set prevents repeats)
+        self.fingerprint = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        # kind (or "category:<name>") -> (sorted thresholds, reward names in the same order)
+        tables = {}
+        for rule in config.get("rules", []):
+            kind = rule.get("kind")
+            if kind not in RULE_KINDS or not rule.get("name"):
+                logger.warning(f"Ignoring invalid reward rule: {rule}")
+                continue
+            key = f"category:{rule.get('category', '')}" if kind == "category" else kind
+            tables.setdefault(key, []).append((int(rule["threshold"]), str(rule["name"])))
+        self._tables = {}
+        for key, rules in tables.items():
+            rules.sort()
+            self._tables[key] = ([t for t, _n in rules], [n for _t, n in rules])
+        self._categories = KeywordClassifier(list(config.get("categories", {}).items()))
+        # user -> (set of earned names, len(rewards) it was built from)
+        self._earned = {}
+        self._lock = threading.Lock()
+
+    def category_of(self, habit_name):
+        """First category whose keyword appears in the habit name, or None"""
+        return self._categories(habit_name)
+
+    def _earned_set(self, user_name, rewards):
+        cached = self._earned.get(user_name)
+        # Rebuilt only when the stored list was changed by someone else
+        if cached is None or cached[1] != len(rewards):
+            cached = ({r if isinstance(r, str) else r.get("name", "") for r in rewards}, len(rewards))
+            self._earned[user_name] = cached
+        return cached[0]
+
+    def crossed(self, key, old, new):
+        """Reward names with old < threshold <= new"""
+        table = self._tables.get(key)
+        if table is None or new <= old:
+            return []
+        thresholds, names = table
+        return names[bisect_right(thresholds, old):bisect_right(thresholds, new)]
+
+    def evaluate(self, user_name, user_data, points=None, streak=None, category=None, category_count=None):
+        """Award rewards for the values that changed; mutates user_data in place and returns the new names"""
+        progress = user_data.setdefault("reward_progress", {})
+        if progress.get("rules") != self.fingerprint:
+            progress.clear()
+            progress["rules"] = self.fingerprint
+        rewards = user_data.setdefault("rewards", [])
+        values = []
+        if points is not None:
+            values.append(("points", points))
+        if streak is not None:
+            values.append(("streak", streak))
+        if category is not None and category_count is not None:
+            values.append((f"category:{category}", category_count))
+
+        new_names = []
+        with self._lock:
+            earned = None
+            for key, value in values:
+                value = int(value or 0)
+                # Users from before reward_progress existed start from zero
+                old = int(progress.get(key, 0))
+                candidates = self.crossed(key, old, value)
+                if value > old:
+                    progress[key] = value
+                if not candidates:
+                    continue
+                if earned is None:
+                    earned = self._earned_set(user_name, rewards)
+                current_points = int(user_data.get("points", 0))
+                for name in candidates:
+                    if name in earned:
+                        continue
+                    rewards.append({
+                        "name": name,
+                        "earned_at": datetime.now().isoformat(),
+                        "points_at_earn": current_points,
+                    })
+                    earned.add(name)
+                    new_names.append(name)
+                    logger.info(f"User {user_name} earned reward: {name} ({key} reached {value})")
+            if earned is not None:
+                self._earned[user_name] = (earned, len(rewards))
+        return new_names
+
+
+_engine = {"signature": None, "engine": None}
+_engine_lock = threading.Lock()
+
+
+def load_rules(path=None):
+    """Rules config from `path` (REWARDS_FILE by default), falling back to DEFAULT_RULES"""
+    path = path or REWARDS_FILE
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"Error loading reward rules from {path}: {e}")
+    return DEFAULT_RULES
+
+
+def reward_engine():
+    """Shared engine, rebuilt when the rules file changes"""
+    try:
+        st = os.stat(REWARDS_FILE)
+        signature = (REWARDS_FILE, st.st_mtime_ns, st.st_size)
+    except OSError:
+        signature = (REWARDS_FILE, None, None)
+    engine = _engine["engine"]
+    if engine is None or _engine["signature"] != signature:
+        with _engine_lock:
+            if _engine["engine"] is None or _engine["signature"] != signature:
+                _engine["engine"] = RewardEngine(load_rules(REWARDS_FILE))
+                _engine["signature"] = signature
+            engine = _engine["engine"]
+    return engine
@@ -0,0 +1,91 @@
+"""
+Startup benchmark: time from process launch until the first request is served.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--max-seconds 3.0]
+
+Each run starts the app in a fresh interpreter, polls GET / until it answers,
+then stops the server. Exits non-zero if the median exceeds --max-seconds so
+it can be used as a regression gate.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_CODE = (
+    "import sys; from app import app; "
+    "app.run(host='127.0.0.1', port=int(sys.argv[1]), debug=False, use_reloader=False)"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(timeout=60.0, path="/"):
+    """Launch the app and return seconds until `path` first returns a response"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER_CODE, str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited early with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    resp.read()
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"no response from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def import_time():
+    """Seconds spent importing app.py in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TrackIt time-to-first-request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="fail if the median time-to-first-request exceeds this")
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    firsts = [time_to_first_request(path=args.path) for _ in range(args.runs)]
+    print(f"import app:           median {statistics.median(imports) * 1000:.0f} ms "
+          f"(min {min(imports) * 1000:.0f} ms)")
+    print(f"first request {args.path:<6} median {statistics.median(firsts) * 1000:.0f} ms "
+          f"(min {min(firsts) * 1000:.0f} ms, max {max(firsts) * 1000:.0f} ms)")
+
+    if args.max_seconds is not None and statistics.median(firsts) > args.max_seconds:
+        print(f"FAIL: median exceeds {args.max_seconds:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Production server: python main.py --prod (or python serve.py).
+
+Runs the Flask app under gunicorn with several worker processes, each with
+a pool of threads (the gthread worker). Application state is loaded once in
+the master before forking: the journal is recovered, the completion index
+is loaded (or rebuilt, synchronously), static assets are fingerprinted and
+compressed (assets.py) and the first dashboard snapshot is built, so
+workers start warm and share those pages copy-on-write. Each worker then
+restarts what does not survive a fork: the log writer thread and journal
+recovery (see post_fork).
+
+Each worker keeps its own read state, consistent across workers as follows:
+    dashboard snapshot  a write bumps a change counter in shared memory
+                        (data_manager.share_change_generation); a worker
+                        that sees it moved refreshes before its next read
+    completion index    refreshed from the event log's length on disk, so
+                        only rows other workers appended are read
+    /api/changes        every worker's log has the master's epoch and hands
+                        out cursors valid on any worker (see changes.py)
+    fragment cache      keyed on the worker's own snapshot versions, so it
+                        is as fresh as that worker's snapshot
+    rate limiter        request times in a shared file (rate_limits.py)
+
+Signals (to the master, its pid is in TRACKIT_PIDFILE if set):
+    TERM / INT  graceful shutdown: workers finish in-flight requests
+                (up to TRACKIT_GRACEFUL_TIMEOUT seconds)
+    HUP         zero-downtime restart: new workers are forked before the
+                old ones are stopped gracefully
+    USR2        zero-downtime upgrade to new code: starts a new master
+                beside the old one; send the old master TERM once it is up
+
+gunicorn needs fork, so on Windows (or when gunicorn is not installed)
+the app is served by waitress in a single multi-threaded process instead.
+
+    TRACKIT_BIND=0.0.0.0:5000   TRACKIT_WORKERS=0 (= 2 x CPUs + 1)
+    TRACKIT_THREADS=4           TRACKIT_WORKER_TIMEOUT=60
+    TRACKIT_MAX_REQUESTS=0      (recycle a worker after N requests)
+"""
+import os
+import sys
+import logging
+import multiprocessing
+try:
+    from .env_setup import load_env
+except Exception:
+    from env_setup import load_env
+
+# Settings below and in the modules imported next may come from .env
+load_env()
+
+try:
+    from . import data_manager
+    from .log_setup import reinit_after_fork, shutdown_logging
+    from .rebuild import warm_start
+except Exception:
+    import data_manager
+    from log_setup import reinit_after_fork, shutdown_logging
+    from rebuild import warm_start
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+BIND = os.environ.get("TRACKIT_BIND", "0.0.0.0:5000")
+WORKERS = int(os.environ.get("TRACKIT_WORKERS", "0"))
+THREADS = int(os.environ.get("TRACKIT_THREADS", "4"))
+WORKER_TIMEOUT = int(os.environ.get("TRACKIT_WORKER_TIMEOUT", "60"))
+GRACEFUL_TIMEOUT = int(os.environ.get("TRACKIT_GRACEFUL_TIMEOUT", "30"))
+MAX_REQUESTS = int(os.environ.get("TRACKIT_MAX_REQUESTS", "0"))
+PIDFILE = os.environ.get("TRACKIT_PIDFILE", "")
+
+
+def default_workers(cpus=None):
+    """gunicorn's recommended 2 x CPUs + 1"""
+    return 2 * (cpus or os.cpu_count() or 1) + 1
+
+
+def preload(workers=False):
+    """Import the app and load the state every worker shares; returns the WSGI app.
+    With workers, set up the cross-process state before they are forked.
+    """
+    try:
+        from .app import app, snapshots, assets, rate_limiter
+    except Exception:
+        from app import app, snapshots, assets, rate_limiter
+    if workers:
+        data_manager.share_change_generation()
+        rate_limiter.share()
+    warm_start(background=False)
+    snapshots.refresh()
+    assets.build()
+    return app
+
+
+def post_fork(server, worker):
+    """gunicorn hook, runs in each new worker process"""
+    reinit_after_fork()
+    data_manager.reset_after_fork()
+    logger.info(f"Worker {os.getpid()} started")
+
+
+def worker_exit(server, worker):
+    """gunicorn hook: write out queued log records before the worker exits"""
+    shutdown_logging()
+
+
+def gunicorn_options(bind=BIND, workers=None, threads=THREADS):
+    return {
+        "bind": bind,
+        "workers": workers or WORKERS or default_workers(),
+        "threads": max(1, threads),
+        "worker_class": "gthread" if threads > 1 else "sync",
+        "preload_app": True,
+        "timeout": WORKER_TIMEOUT,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS // 10,
+        "pidfile": PIDFILE or None,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }
+
+
+def serve_gunicorn(app, options):
+    from gunicorn.app.base import BaseApplication
+
+    class TrackItApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    logger.info(f"Serving on {options['bind']} with {options['workers']} workers x {options['threads']} threads")
+    TrackItApplication(app, options).run()
+
+
+def serve_waitress(app, bind, threads):
+    from waitress import serve as waitress_serve
+
+    logger.info(f"Serving on {bind} with waitress ({threads} threads)")
+    waitress_serve(app, listen=bind, threads=threads)
+
+
+def serve(bind=BIND, workers=None, threads=THREADS):
+    """Run the production server until it is shut down"""
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = os.name != "nt"
+    except ImportError:
+        use_gunicorn = False
+    app = preload(workers=use_gunicorn)
+    if use_gunicorn:
+        return serve_gunicorn(app, gunicorn_options(bind, workers, threads))
+    try:
+        # One process, so it gets the threads all workers would have had
+        return serve_waitress(app, bind, max(1, threads) * (workers or WORKERS or default_workers()))
+    except ImportError:
+        logger.error("No production server available: pip install gunicorn (or waitress on Windows)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    serve()
@@ -0,0 +1,332 @@
+"""
+Copy-on-write in-memory snapshot of everything the read-only routes show.
+
+A Snapshot holds fully derived data (habits with rates and streaks, points,
+leaderboard, weekly chart, calendar rollups, reminder) and is never mutated
+once published. Writers build the next version, reusing every part that
+did not change, and publish it with a single reference assignment, so GET
+routes read a consistent view without locks, disk I/O or pandas.
+
+New versions are built when data_manager reports a change (see
+data_manager.add_change_listener) and, for edits made by other processes,
+when a background thread notices a data file changed on disk. Under
+serve.py's worker processes a read also refreshes first when the shared
+change counter (data_manager.change_generation) moved, so a worker serves
+another worker's write from its next request on.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import date
+try:
+    from . import data_manager
+    from .reminders import REMINDER_FILE
+except Exception:
+    import data_manager
+    from reminders import REMINDER_FILE
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = float(os.environ.get("TRACKIT_SNAPSHOT_REFRESH_SECONDS", "2"))
+# Calendar rollups cover the current month and this many months before it
+CALENDAR_MONTHS = int(os.environ.get("TRACKIT_SNAPSHOT_CALENDAR_MONTHS", "12"))
+LEADERBOARD_TOP = 10
+
+# Which snapshot parts each kind of change invalidates
+PARTS_FOR_CHANGE = {
+    "habits": ("habits",),
+    "events": ("habits", "calendar"),
+    "points": ("points",),
+    "leaderboard": ("leaderboard",),
+    "reminder": ("reminder",),
+}
+PARTS = ("habits", "calendar", "points", "leaderboard", "reminder")
+# Served when a part has never been built successfully
+EMPTY_PARTS = {
+    "habits": ((), 0, {"dates": [], "values": []}),
+    "calendar": {},
+    "points": {},
+    "leaderboard": ([], {}),
+    "reminder": "",
+}
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (path, None, None)
+
+
+def _source_signatures():
+    """On-disk version of every source the snapshot is derived from"""
+    return {
+        "habits": _file_signature(data_manager.DATA_PATH),
+        "events": data_manager._events_signature(),
+        "points": _file_signature(data_manager.POINTS_FILE),
+        "leaderboard": _file_signature(data_manager.LEADERBOARD_PATH),
+        "reminder": _file_signature(REMINDER_FILE),
+    }
+
+
+def _recent_months(today, count):
+    y, m = today.year, today.month
+    months = []
+    for _ in range(count + 1):
+        months.append((y, m))
+        y, m = (y - 1, 12) if m == 1 else (y, m - 1)
+    return months
+
+
+def _month_span(year, month):
+    """[start, end) day ordinals of a month"""
+    return date(year, month, 1).toordinal(), date(year + month // 12, month % 12 + 1, 1).toordinal()
+
+
+class Snapshot:
+    """One immutable version of the derived read model (treat every attribute as read-only)"""
+
+    __slots__ = ("version", "part_versions", "built_at", "built_on", "checked_at", "signatures", "habits",
+                 "overall_rate", "weekly", "calendar", "points", "leaderboard", "scores", "reminder")
+
+    def __init__(self, version, signatures, parts, part_versions=None, checked_at=0):
+        self.version = version
+        # part -> version that last rebuilt it (cache key for anything derived from that part)
+        self.part_versions = part_versions or {part: version for part in PARTS}
+        self.built_at = time.time()
+        # Microsecond time the sources were read: every write finished before it is included
+        self.checked_at = checked_at
+        self.built_on = date.today()
+        self.signatures = signatures
+        self.habits, self.overall_rate, self.weekly = parts["habits"]
+        self.calendar = parts["calendar"]
+        self.points = parts["points"]
+        self.leaderboard, self.scores = parts["leaderboard"]
+        self.reminder = parts["reminder"]
+
+    def parts(self):
+        return {
+            "habits": (self.habits, self.overall_rate, self.weekly),
+            "calendar": self.calendar,
+            "points": self.points,
+            "leaderboard": (self.leaderboard, self.scores),
+            "reminder": self.reminder,
+        }
+
+    def user_points(self, user_name):
+        """(points, rewards) for a user"""
+        user_data = self.points.get(user_name) or {}
+        return user_data.get("points", 0), user_data.get("rewards", [])
+
+    def calendar_counts(self, year, month, user_name=None):
+        """{day: count} for a month in the rollup window, or None if outside it"""
+        return self.calendar.get((year, month, user_name or None))
+
+    def calendar_range(self, start, end, user_name=None):
+        """Dense per-day counts for dates start..end (inclusive) from the monthly rollups,
+        or None if any month in the span is outside the rollup window
+        """
+        first = start.toordinal()
+        days = [0] * (end.toordinal() - first + 1)
+        y, m = start.year, start.month
+        while (y, m) <= (end.year, end.month):
+            counts = self.calendar.get((y, m, user_name or None))
+            if counts is None:
+                return None
+            month_start = date(y, m, 1).toordinal()
+            for day, count in counts.items():
+                offset = month_start + day - 1 - first
+                if 0 <= offset < len(days):
+                    days[offset] = count
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return days
+
+
+class SnapshotManager:
+    """Builds, swaps and serves Snapshot versions"""
+
+    def __init__(self, load_habits, refresh_seconds=REFRESH_SECONDS):
+        self.load_habits = load_habits
+        self.refresh_seconds = refresh_seconds
+        self._current = None
+        # Re-entrant: building can itself write (e.g. assigning habit ids) and notify
+        self._build_lock = threading.RLock()
+        self._refresher_pid = None
+        self._stop = threading.Event()
+        self._publish_listeners = []
+        self.builds = 0
+        # Latest time a refresh read the sources (published or found nothing new),
+        # and the change generation it saw
+        self.checked_at = 0
+        self._clock = 0
+        self._generation = 0
+        # Calendar rollups our own writes touched since the last calendar build, and the
+        # completion index that build read (another index means a full rebuild)
+        self._dirty_lock = threading.Lock()
+        self._dirty_months = set()
+        self._calendar_bitmaps = None
+        data_manager.add_change_listener(self.on_change)
+        data_manager.add_event_listener(self.on_events)
+
+    def add_publish_listener(self, callback):
+        """Call `callback(previous, snapshot)` after each new version is published (under the build lock)"""
+        self._publish_listeners.append(callback)
+
+    # --- Building (writer side) ---
+
+    def _build_part(self, part, previous=None):
+        if part == "habits":
+            habits = tuple(self.load_habits())
+            overall_rate = int(sum(h.get('rate', 0) for h in habits) / len(habits)) if habits else 0
+            dates, results = data_manager.get_weekly_data()
+            return habits, overall_rate, {"dates": list(dates), "values": [r[1] for r in results]}
+        if part == "calendar":
+            return self._build_calendar(previous)
+        if part == "points":
+            return data_manager.load_user_points()
+        if part == "leaderboard":
+            board = data_manager.load_leaderboard(top_n=None)
+            return board[:LEADERBOARD_TOP], {str(r.get("user_name", "")).strip(): int(r.get("score", 0)) for r in board}
+        if os.path.exists(REMINDER_FILE):
+            with open(REMINDER_FILE, "r") as f:
+                return f.read().strip()
+        return ""
+
+    def _build_calendar(self, previous=None):
+        """{(year, month, user_name or None): {day: count}} for the recent months.
+        When the index has only grown since `previous` was built (our own writes, or
+        appends by other processes it caught up on), just the touched months and users
+        are recounted; every other rollup is reused as is.
+        """
+        months = _recent_months(date.today(), CALENDAR_MONTHS)
+        keys = [f"{y:04d}-{m:02d}" for y, m in months]
+        built_from, self._calendar_bitmaps = self._calendar_bitmaps, None
+        # Catching up on other processes' appends notifies on_events, so query first
+        bitmaps = data_manager.completion_index(keys)
+        with self._dirty_lock:
+            dirty, self._dirty_months = self._dirty_months, set()
+        rollup = lambda counts: {offset + 1: count for offset, count in sorted(counts.items())}
+        if previous is not None and previous.built_on == date.today() and bitmaps is built_from:
+            calendar = dict(previous.calendar)
+            window = set(months)
+            touched = {(y, m, user) for y, m, user in dirty if (y, m) in window}
+            touched.update((y, m, None) for y, m, _user in list(touched))
+            for y, m, user in touched:
+                counts = bitmaps.day_counts(*_month_span(y, m), user_name=user)
+                calendar[(y, m, user)] = rollup(counts)
+        else:
+            users = sorted({u for u, _h in bitmaps.keys()})
+            calendar = {}
+            for y, m in months:
+                by_user = bitmaps.user_day_counts(*_month_span(y, m))
+                everyone = {}
+                for user in users:
+                    counts = by_user.get(user, {})
+                    calendar[(y, m, user)] = rollup(counts)
+                    for offset, count in counts.items():
+                        everyone[offset] = everyone.get(offset, 0) + count
+                calendar[(y, m, None)] = rollup(everyone)
+        self._calendar_bitmaps = bitmaps
+        return calendar
+
+    def refresh(self, changes=()):
+        """Build and publish the next version, rebuilding only the parts whose sources changed"""
+        with self._build_lock:
+            previous = self._current
+            generation = data_manager.change_generation()
+            self._clock = checked = max(self._clock + 1, time.time_ns() // 1000)
+            signatures = _source_signatures()
+            if previous is None:
+                stale = set(PARTS)
+            else:
+                # Sources changed on disk (by anyone), plus whatever the caller says it changed
+                changed = {kind for kind, sig in signatures.items() if previous.signatures.get(kind) != sig}
+                changed.update(changes or ())
+                stale = {part for kind in changed for part in PARTS_FOR_CHANGE.get(kind, ())}
+            # Streaks and the calendar window move at midnight
+            if previous is not None and previous.built_on != date.today():
+                stale.update(("calendar", "habits"))
+            if not stale:
+                self.checked_at, self._generation = checked, generation
+                return previous
+            started = time.perf_counter()
+            parts = previous.parts() if previous is not None else {}
+            for part in PARTS:
+                if part not in stale:
+                    continue
+                try:
+                    parts[part] = self._build_part(part, previous)
+                except Exception as e:
+                    # Keep serving the previous version of this part; retry on the next refresh
+                    logger.error(f"Error building snapshot part {part}: {e}")
+                    parts.setdefault(part, EMPTY_PARTS[part])
+                    # Writes this part missed are not all in the snapshot
+                    checked = previous.checked_at if previous is not None else 0
+                    for kind, affected in PARTS_FOR_CHANGE.items():
+                        if part in affected:
+                            signatures[kind] = None
+            version = (previous.version + 1) if previous else 1
+            part_versions = dict(previous.part_versions) if previous is not None else {}
+            part_versions.update((part, version) for part in stale)
+            snapshot = Snapshot(version, signatures, parts, part_versions, checked)
+            self._current = snapshot
+            self.builds += 1
+            logger.debug(f"Published snapshot v{snapshot.version} ({', '.join(sorted(stale))}) "
+                         f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+            for callback in list(self._publish_listeners):
+                try:
+                    callback(previous, snapshot)
+                except Exception as e:
+                    logger.error(f"Snapshot publish listener error: {e}")
+            self.checked_at, self._generation = max(self.checked_at, checked), generation
+            return snapshot
+
+    def on_events(self, rows):
+        """data_manager event listener: remember which calendar rollups need recounting"""
+        touched = set()
+        for ordinal, _habit_id, user_name in rows:
+            day = date.fromordinal(ordinal)
+            touched.add((day.year, day.month, user_name or ''))
+        with self._dirty_lock:
+            self._dirty_months.update(touched)
+
+    def on_change(self, kinds):
+        """data_manager change listener"""
+        try:
+            if self._current is not None:
+                self.refresh(kinds)
+        except Exception as e:
+            logger.error(f"Error refreshing snapshot after {kinds} change: {e}")
+
+    # --- Reading ---
+
+    def current(self):
+        """Latest published snapshot (built on first use, rebuilt first if another process wrote)"""
+        snapshot = self._current
+        if snapshot is None or self._generation != data_manager.change_generation():
+            snapshot = self.refresh()
+        if self._refresher_pid != os.getpid() and self.refresh_seconds > 0:
+            self._start_refresher()
+        return snapshot
+
+    # --- Picking up edits from other processes ---
+
+    def _start_refresher(self):
+        with self._build_lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh_loop, name="trackit-snapshot", daemon=True).start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing snapshot: {e}")
+
+    def stop(self):
+        self._stop.set()
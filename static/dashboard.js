@@ -8,8 +8,169 @@ document.addEventListener('DOMContentLoaded', ()=>{
   darkToggle && darkToggle.addEventListener('click', ()=>{
     const isDark = document.body.classList.toggle('dark');
     localStorage.setItem('trackit-dark', isDark ? '1' : '0');
+    theme = readTheme();
+    repaintProgress();
   });
 
+  /* --- One requestAnimationFrame loop for every animation and DOM batch --- */
+  // progress tweens, staggered entrances and queued frame jobs (grid windowing) all run in tick()
+  const TWEEN_MS = 280;
+  const tweens = new Map();      // element -> {from, to, start}
+  const entrances = [];          // [{el, at}], in time order
+  const frameJobs = new Set();
+  let frame = null;
+  let theme = readTheme();
+
+  // theme colours are read once (and again when dark mode is toggled), never per frame
+  function readTheme(){
+    const root = getComputedStyle(document.documentElement);
+    return {
+      accent: root.getPropertyValue('--accent-teal').trim() || '#2bb6af',
+      surface: root.getPropertyValue('--surface').trim() || '#0b1220'
+    };
+  }
+
+  function paintProgress(el, value){
+    const deg = Math.round((value / 100) * 360);
+    el.style.background = `conic-gradient(${theme.accent} ${deg}deg, ${theme.surface} ${deg}deg)`;
+    const label = el.parentElement && el.parentElement.querySelector('.progress-label');
+    if(label) label.textContent = `${value}%`;
+    el.dataset.shown = value;
+  }
+
+  function tick(now){
+    frame = null;
+    const jobs = Array.from(frameJobs);
+    frameJobs.clear();
+    jobs.forEach(job=>job(now));
+    tweens.forEach((t, el)=>{
+      const p = Math.max(0, Math.min(1, (now - t.start) / TWEEN_MS));
+      if(now >= t.start) paintProgress(el, Math.round(t.from + (t.to - t.from) * p));
+      if(p >= 1) tweens.delete(el);
+    });
+    while(entrances.length && entrances[0].at <= now) entrances.shift().el.classList.add('enter');
+    if(tweens.size || entrances.length || frameJobs.size) frame = requestAnimationFrame(tick);
+  }
+
+  function wake(){ if(frame === null) frame = requestAnimationFrame(tick); }
+
+  // run `job` once on the next frame (adding the same job twice runs it once)
+  function nextFrame(job){ frameJobs.add(job); wake(); }
+
+  // Animate a progress circle from the value it shows to `target` percent
+  function animateProgress(el, target, delay){
+    target = Math.max(0, Math.min(100, parseInt(target, 10) || 0));
+    if(!el.isConnected){
+      // a card windowed out of the DOM just takes the final value
+      tweens.delete(el);
+      paintProgress(el, target);
+      return;
+    }
+    const from = parseInt(el.dataset.shown || '0', 10) || 0;
+    tweens.set(el, {from, to: target, start: performance.now() + (delay || 0)});
+    wake();
+  }
+
+  function enter(el, delay){
+    entrances.push({el, at: performance.now() + delay});
+    wake();
+  }
+
+  function repaintProgress(){
+    habitGrid.cards().forEach(card=>{
+      const prog = card.querySelector('.progress');
+      if(prog && prog.dataset.shown !== undefined) paintProgress(prog, parseInt(prog.dataset.shown, 10));
+    });
+    const ring = document.querySelector('.glow-ring .ring');
+    if(ring && ring.dataset.shown !== undefined) paintProgress(ring, parseInt(ring.dataset.shown, 10));
+  }
+
+  /* --- Habit grid windowing: with many habits only the cards near the viewport are in the DOM --- */
+  const VIRTUAL_MIN_CARDS = 40;
+  const OVERSCAN_ROWS = 6;
+  const habitGrid = (function(){
+    const container = document.querySelector('.habits');
+    // every card, in page order; cards outside the window are detached but keep their handlers
+    const pool = container ? Array.from(container.querySelectorAll('.habit-card')) : [];
+    const topSpacer = document.createElement('div');
+    const bottomSpacer = document.createElement('div');
+    topSpacer.setAttribute('aria-hidden', 'true');
+    bottomSpacer.setAttribute('aria-hidden', 'true');
+    let virtual = false, started = false, rowHeight = 0, gap = 0, start = 0, end = pool.length;
+
+    function setSpacer(el, rows){
+      // the spacer's own flex gap makes up the rest of the skipped rows' height
+      el.style.display = rows > 0 ? '' : 'none';
+      el.style.height = `${Math.max(0, rows * rowHeight - gap)}px`;
+    }
+
+    function render(){
+      if(!virtual) return;
+      const rect = container.getBoundingClientRect();
+      const first = Math.floor(Math.max(0, -rect.top) / rowHeight) - OVERSCAN_ROWS;
+      const s = Math.max(0, Math.min(first, pool.length - 1));
+      const e = Math.min(pool.length, s + Math.ceil(window.innerHeight / rowHeight) + 2 * OVERSCAN_ROWS);
+      if(s === start && e === end) return;
+      // only cards entering or leaving the window are touched, so the rest keep their animations
+      for(let i = start; i < end; i++) if(i < s || i >= e) pool[i].remove();
+      const before = document.createDocumentFragment();
+      for(let i = s; i < Math.min(start, e); i++) before.appendChild(pool[i]);
+      topSpacer.after(before);
+      const after = document.createDocumentFragment();
+      for(let i = Math.max(end, s); i < e; i++){
+        // cards scrolled into view enter at once (the first screen gets the staggered entrance)
+        if(started) pool[i].classList.add('enter');
+        after.appendChild(pool[i]);
+      }
+      bottomSpacer.before(after);
+      start = s; end = e;
+      setSpacer(topSpacer, start);
+      setSpacer(bottomSpacer, pool.length - end);
+    }
+
+    function relayout(){
+      if(!virtual) return;
+      // rebuild the window from scratch (row height may have changed)
+      const sample = pool[start] && pool[start].isConnected ? pool[start] : null;
+      if(sample) rowHeight = sample.offsetHeight + gap || rowHeight;
+      pool.slice(start, end).forEach(card=>card.remove());
+      start = end = 0;
+      render();
+    }
+
+    return {
+      start(){
+        if(!container || pool.length < VIRTUAL_MIN_CARDS) return;
+        gap = parseFloat(getComputedStyle(container).rowGap) || 0;
+        rowHeight = pool[0].offsetHeight + gap;
+        if(!rowHeight) return;
+        virtual = true;
+        pool.forEach(card=>card.remove());
+        container.append(topSpacer, bottomSpacer);
+        start = end = 0;
+        render();
+        started = true;
+        window.addEventListener('scroll', ()=>nextFrame(render), {passive: true});
+        window.addEventListener('resize', ()=>nextFrame(relayout));
+      },
+      cards(){ return pool; },
+      visible(){ return pool.slice(start, end); },
+      byId(id){ return pool.find(c=>c.getAttribute('data-habit-id') === String(id)); },
+      byName(name){ return pool.find(c=>c.getAttribute('data-name') === name); },
+      remove(card){
+        const i = pool.indexOf(card);
+        if(i < 0) return;
+        card.remove();
+        pool.splice(i, 1);
+        if(virtual){
+          if(i < end) end--;
+          if(i < start) start--;
+          nextFrame(relayout);
+        }
+      }
+    };
+  })();
+
   /* --- Day Chips: Interactive filtering --- */
   const dayChips = document.getElementById('dayChips');
   const habitsContainer = document.querySelector('.habits');
@@ -17,7 +178,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
   let selectedDay = 2; // Wednesday by default (today)
 
   function filterHabitsByDay(dayOfWeek) {
-    const cards = document.querySelectorAll('.habit-card');
+    const cards = habitGrid.cards();
     let visibleCount = 0;
     
     cards.forEach(card => {
@@ -48,14 +209,14 @@ document.addEventListener('DOMContentLoaded', ()=>{
         // Get the day number
         selectedDay = parseInt(chip.getAttribute('data-day'), 10);
         
-        // Animate habit cards
-        const cards = document.querySelectorAll('.habit-card');
-        cards.forEach((card, idx) => {
-          card.style.animation = 'none';
-          setTimeout(() => {
+        // Animate the habit cards on screen (restarted together on the next frame)
+        const cards = habitGrid.visible();
+        cards.forEach(card => { card.style.animation = 'none'; });
+        nextFrame(() => {
+          cards.forEach((card, idx) => {
             card.style.animation = 'fadeInScale 0.3s ease-out forwards';
             card.style.animationDelay = `${idx * 0.05}s`;
-          }, 10);
+          });
         });
         
         // Save preference
@@ -78,13 +239,14 @@ document.addEventListener('DOMContentLoaded', ()=>{
     }
   }
 
-  // Handle Done micro-interaction: animate then submit
-  // When the user marks a habit Done, show flame animation then send request
+  // Handle Done micro-interaction: animate, apply locally and queue for sync
+  // When the user marks a habit Done, show flame animation then queue the action
   document.querySelectorAll('.doneForm').forEach(form=>{
     form.addEventListener('submit', async (e)=>{
       e.preventDefault();
       const btn = form.querySelector('.btn.done');
-      if(!btn) return form.submit();
+      const name = (new FormData(form)).get('name');
+      if(!btn || !window.localStorage) return form.submit();
       btn.classList.add('animate');
       btn.disabled = true;
 
@@ -98,43 +260,33 @@ document.addEventListener('DOMContentLoaded', ()=>{
         flame.classList.add('pop');
       }
 
+      enqueueAction('done', name);
+      applyOptimistic(card, 'done');
+
       // small delay to let the animation feel satisfying
       await new Promise(r=>setTimeout(r, 520));
-
-      try{
-        const data = new FormData(form);
-        await fetch(form.action, {method:'POST', body:data});
-        // brief success pulse
-        btn.textContent = '✓';
-        setTimeout(()=>{ location.reload(); }, 600);
-      }catch(err){
-        btn.classList.remove('animate');
-        btn.disabled = false;
-      }
+      // brief success pulse
+      btn.textContent = '✓';
+      setTimeout(()=>{ btn.textContent = 'Done'; btn.classList.remove('animate'); btn.disabled = false; }, 600);
     });
   });
 
-  // Handle Skip button: submit and reload
+  // Handle Skip button: apply locally and queue for sync
   document.querySelectorAll('.skipForm').forEach(form=>{
     form.addEventListener('submit', async (e)=>{
       e.preventDefault();
       const btn = form.querySelector('.btn.skip');
-      if(!btn) return form.submit();
+      const name = (new FormData(form)).get('name');
+      if(!btn || !window.localStorage) return form.submit();
       btn.disabled = true;
       btn.textContent = '⊘ Skipped';
       btn.style.opacity = '0.6';
 
-      await new Promise(r=>setTimeout(r, 300));
+      enqueueAction('skip', name);
+      applyOptimistic(form.closest('.habit-card'), 'skip');
 
-      try{
-        const data = new FormData(form);
-        await fetch(form.action, {method:'POST', body:data});
-        setTimeout(()=>{ location.reload(); }, 400);
-      }catch(err){
-        btn.disabled = false;
-        btn.textContent = 'Skip';
-        btn.style.opacity = '1';
-      }
+      await new Promise(r=>setTimeout(r, 300));
+      setTimeout(()=>{ btn.disabled = false; btn.textContent = 'Skip'; btn.style.opacity = '1'; }, 400);
     });
   });
 
@@ -236,44 +388,48 @@ document.addEventListener('DOMContentLoaded', ()=>{
     });
   }
 
+  // Add form: suggest existing habits while typing so duplicates are easy to spot
+  const addInput = document.querySelector('#addForm input[name="name"]');
+  const suggestList = document.getElementById('habitSuggestions');
+  if(addInput && suggestList){
+    let suggestTimer = null;
+    addInput.addEventListener('input', ()=>{
+      clearTimeout(suggestTimer);
+      const q = addInput.value.trim();
+      if(!q){ suggestList.innerHTML = ''; return; }
+      suggestTimer = setTimeout(async ()=>{
+        try{
+          const res = await fetch(`/api/habits/suggest?q=${encodeURIComponent(q)}&limit=8`);
+          const js = await res.json();
+          suggestList.innerHTML = '';
+          (js.suggestions || []).forEach(s=>{
+            const opt = document.createElement('option');
+            opt.value = s.habit_name;
+            suggestList.appendChild(opt);
+          });
+        }catch(e){ console.warn('Habit suggestions failed', e); }
+      }, 150);
+    });
+  }
+
   /* --- Progressive visual enhancements --- */
-  // Entrance animation for habit cards (staggered)
-  const cards = Array.from(document.querySelectorAll('.habit-card'));
-  cards.forEach((c,i)=>{
-    setTimeout(()=> c.classList.add('enter'), 90 * i);
-  });
+  // Cards leave the DOM from here on (the per-card handlers above are already bound)
+  habitGrid.start();
+
+  // Entrance animation for the cards on screen (staggered)
+  habitGrid.visible().forEach((c,i)=> enter(c, 90 * i));
 
-  // Animate progress circles from 0 -> target percent using small JS tween
-  function animateProgress(el, target){
-    let current = 0;
-    const step = Math.max(1, Math.floor(target / 20));
-    const interval = setInterval(()=>{
-      current = Math.min(target, current + step);
-      const deg = Math.round((current / 100) * 360);
-      // choose accent color depending on theme
-      const accent = getComputedStyle(document.documentElement).getPropertyValue('--accent-teal').trim() || '#2bb6af';
-      const bg = getComputedStyle(document.documentElement).getPropertyValue('--surface').trim() || '#0b1220';
-      el.style.background = `conic-gradient(${accent} ${deg}deg, ${bg} ${deg}deg)`;
-      const label = el.parentElement.querySelector('.progress-label');
-      if(label) label.textContent = `${current}%`;
-      if(current >= target) clearInterval(interval);
-    }, 14);
-  }
-
-  document.querySelectorAll('.habit-card').forEach(card=>{
+  // Progress circles tween from 0 to their rate, a little after the entrance
+  habitGrid.cards().forEach(card=>{
     const prog = card.querySelector('.progress');
-    const target = parseInt(card.getAttribute('data-rate') || 0, 10);
-    if(prog){
-      // start a little after entrance for nicer effect
-      setTimeout(()=> animateProgress(prog, target), 220);
-    }
+    if(prog) animateProgress(prog, card.getAttribute('data-rate'), 220);
   });
 
   // hero ring animation
   const heroRing = document.querySelector('.glow-ring .ring');
   if(heroRing){
     const v = parseInt(heroRing.getAttribute('data-value') || heroRing.dataset.value || 0,10);
-    setTimeout(()=> animateProgress(heroRing, v), 260);
+    animateProgress(heroRing, v, 260);
     // update hero label color for light on dark
     const label = document.querySelector('.glow-ring .ring-label');
     if(label) label.textContent = `${v}%`;
@@ -284,11 +440,16 @@ document.addEventListener('DOMContentLoaded', ()=>{
     try{
       const res = await fetch('/leaderboard');
       const data = await res.json();
+      renderLeaderboard(data.top || []);
+    }catch(e){ console.warn('Failed to load leaderboard', e); }
+  }
+
+  function renderLeaderboard(top){
       const list = document.getElementById('leaderboardList');
       if(!list) return;
       list.innerHTML = '';
       const current = (document.body.dataset.user || '').trim();
-      (data.top || []).forEach((row, idx)=>{
+      top.forEach((row, idx)=>{
         const li = document.createElement('li');
         li.className = 'leader-row';
         if(current && row.user_name === current) li.classList.add('me');
@@ -297,10 +458,9 @@ document.addEventListener('DOMContentLoaded', ()=>{
         li.innerHTML = `<div class="left"><div class="rank">${idx+1}</div><div class="avatar-sm">${initials}</div><div class="who">${row.user_name}</div></div><div class="score">${row.score}</div>`;
         list.appendChild(li);
       });
-      if((data.top || []).length === 0){
+      if(top.length === 0){
         list.innerHTML = '<li class="muted">No entries yet — be the first!</li>';
       }
-    }catch(e){ console.warn('Failed to load leaderboard', e); }
   }
   fetchLeaderboard();
 
@@ -324,7 +484,10 @@ document.addEventListener('DOMContentLoaded', ()=>{
   const calLabel = document.getElementById('calLabel');
   const calPrev = document.getElementById('calPrev');
   const calNext = document.getElementById('calNext');
+  const calView = document.getElementById('calView');
   let calDate = new Date(); // current month
+  let calMode = 'month';    // or 'year'
+  let yearData = null;      // {year, days: [count per day of the year]}
 
   function monthKey(d){ return `${d.getFullYear()}-${d.getMonth()+1}`; }
 
@@ -335,65 +498,284 @@ document.addEventListener('DOMContentLoaded', ()=>{
       // request only the current user's events by default
       const res = await fetch(`/calendar_data?month=${m}&year=${y}&user=me`);
       const js = await res.json();
+      if(calMode !== 'month') return;
       renderCalendar(date, js.counts || {}, js.max || 0);
     }catch(e){ console.warn('Calendar load failed', e); }
   }
 
+  // the whole year comes back as one dense per-day array
+  async function loadYear(year){
+    calLabel.textContent = String(year);
+    try{
+      const res = await fetch(`/calendar_data?year=${year}&user=me`);
+      const js = await res.json();
+      if(!js.success || calMode !== 'year' || calDate.getFullYear() !== year) return;
+      yearData = {year, days: js.days || []};
+      renderYear(yearData);
+    }catch(e){ console.warn('Year calendar load failed', e); }
+  }
+
+  function dayOfYear(year, month, day){
+    return Math.round((Date.UTC(year, month, day) - Date.UTC(year, 0, 1)) / 864e5);
+  }
+
+  // The whole month is built as one string and swapped in with a single DOM write on the next frame
+  let calendarHtml = null;
   function renderCalendar(date, counts, maxv){
     if(!calGrid) return;
-    calGrid.innerHTML = '';
+    const html = [];
     // weekday headers
-    const weekdays = ['Sun','Mon','Tue','Wed','Thu','Fri','Sat'];
-    weekdays.forEach(w=>{
-      const h = document.createElement('div'); 
-      h.className='cal-day'; 
-      h.style.fontWeight='700';
-      h.style.textAlign='center';
-      h.style.color='var(--text)';
-      h.style.background='rgba(139,111,71,0.1)';
-      h.style.borderRadius='8px';
-      h.textContent = w; 
-      calGrid.appendChild(h);
+    ['Sun','Mon','Tue','Wed','Thu','Fri','Sat'].forEach(w=>{
+      html.push(`<div class="cal-day" style="font-weight:700;text-align:center;color:var(--text);background:rgba(139,111,71,0.1);border-radius:8px">${w}</div>`);
     });
 
     const year = date.getFullYear(); const month = date.getMonth();
-    const first = new Date(year, month, 1);
-    const last = new Date(year, month+1, 0);
-    const lead = first.getDay();
+    const lead = new Date(year, month, 1).getDay();
+    const days = new Date(year, month+1, 0).getDate();
     // leading blanks
-    for(let i=0;i<lead;i++){ 
-      const e=document.createElement('div'); 
-      e.className='cal-day';
-      e.style.opacity='0.3';
-      calGrid.appendChild(e); 
-    }
-    for(let d=1; d<= last.getDate(); d++){
-      const cell = document.createElement('div'); 
-      cell.className='cal-day';
-      const num = document.createElement('div'); 
-      num.className='num'; 
-      num.textContent = d; 
-      cell.appendChild(num);
-      
+    for(let i=0;i<lead;i++) html.push('<div class="cal-day" style="opacity:0.3"></div>');
+    for(let d=1; d<=days; d++){
       // Ensure we access counts with string key
       const cnt = counts[String(d)] || counts[d] || 0;
-      const heat = document.createElement('div'); 
-      heat.className='cal-heat';
       // compute opacity based on maxv using brown tones
       const op = maxv>0 ? Math.min(0.95, 0.15 + (cnt/maxv)*0.75) : 0.08;
-      heat.style.background = `linear-gradient(180deg, rgba(209,114,87,${op}), rgba(155,125,95,${op}))`;
-      heat.style.minHeight = '50px';
-      heat.style.borderRadius = '8px';
-      heat.innerHTML = `<div style="flex:1"></div><div style="font-size:11px;color:rgba(61,40,23,0.7);font-weight:600">${cnt>0?cnt+' ✓':''}</div>`;
-      cell.appendChild(heat);
-      calGrid.appendChild(cell);
+      html.push(`<div class="cal-day"><div class="num">${d}</div>`
+        + `<div class="cal-heat" style="background:linear-gradient(180deg, rgba(209,114,87,${op}), rgba(155,125,95,${op}));min-height:50px;border-radius:8px">`
+        + `<div style="flex:1"></div><div style="font-size:11px;color:rgba(61,40,23,0.7);font-weight:600">${cnt>0?cnt+' ✓':''}</div></div></div>`);
     }
+    // a newer render in the same frame replaces this one
+    calendarHtml = {className: 'calendar-grid', html: html.join('')};
+    nextFrame(paintCalendar);
+  }
+
+  // GitHub-style year: one column per week (Sunday on top), cells shaded in four levels
+  function renderYear(data){
+    if(!calGrid) return;
+    const maxv = Math.max(0, ...data.days);
+    const html = [];
+    for(let i=0;i<new Date(data.year, 0, 1).getDay();i++) html.push('<div class="cal-cell empty"></div>');
+    data.days.forEach((cnt, i)=>{
+      const label = new Date(data.year, 0, 1 + i).toLocaleDateString(undefined, {month:'short', day:'numeric'});
+      const level = cnt > 0 && maxv > 0 ? Math.min(4, Math.ceil(cnt / maxv * 4)) : 0;
+      html.push(`<div class="cal-cell l${level}" title="${label}: ${cnt} ✓"></div>`);
+    });
+    calendarHtml = {className: 'calendar-year', html: html.join('')};
+    nextFrame(paintCalendar);
   }
 
-  calPrev && calPrev.addEventListener('click', ()=>{ calDate = new Date(calDate.getFullYear(), calDate.getMonth()-1, 1); loadCalendar(calDate); });
-  calNext && calNext.addEventListener('click', ()=>{ calDate = new Date(calDate.getFullYear(), calDate.getMonth()+1, 1); loadCalendar(calDate); });
+  function paintCalendar(){
+    if(calendarHtml === null) return;
+    calGrid.className = calendarHtml.className;
+    calGrid.innerHTML = calendarHtml.html;
+    calendarHtml = null;
+  }
+
+  function loadShown(){ if(calMode === 'year') loadYear(calDate.getFullYear()); else loadCalendar(calDate); }
+  function stepCalendar(delta){
+    calDate = calMode === 'year'
+      ? new Date(calDate.getFullYear()+delta, 0, 1)
+      : new Date(calDate.getFullYear(), calDate.getMonth()+delta, 1);
+    loadShown();
+  }
+  calPrev && calPrev.addEventListener('click', ()=>stepCalendar(-1));
+  calNext && calNext.addEventListener('click', ()=>stepCalendar(1));
+  calView && calView.addEventListener('click', ()=>{
+    calMode = calMode === 'year' ? 'month' : 'year';
+    calView.textContent = calMode === 'year' ? 'Month' : 'Year';
+    if(calMode === 'month') calDate = new Date();
+    loadShown();
+  });
   loadCalendar(calDate);
 
+  /* --- Delta sync: poll /api/changes and patch the page in place --- */
+  let syncCursor = parseInt(document.body.dataset.cursor || '0', 10) || 0;
+  let syncEpoch = document.body.dataset.epoch || '';
+  let syncing = null;
+  const SYNC_INTERVAL_MS = 5000;
+
+  function applyHabit(id, habit){
+    const card = habitGrid.byId(id);
+    if(!habit){ if(card) habitGrid.remove(card); return true; }
+    // a new habit needs the server-rendered card (forms, modal)
+    if(!card) return false;
+    card.setAttribute('data-rate', habit.rate);
+    const prog = card.querySelector('.progress');
+    if(prog){ prog.style.setProperty('--p', habit.rate); animateProgress(prog, habit.rate); }
+    const meta = card.querySelector('.meta');
+    if(meta) meta.textContent = `${habit.days_completed} / ${habit.total_days} days`;
+    let badge = card.querySelector('.streak-badge');
+    if(habit.streak > 0){
+      if(!badge){
+        badge = document.createElement('div'); badge.className = 'streak-badge';
+        const info = card.querySelector('.card-info'); if(info) info.appendChild(badge);
+      }
+      badge.textContent = `🔥 ${habit.streak} day streak`;
+    }else if(badge){ badge.remove(); }
+    return true;
+  }
+
+  function applyChanges(payload){
+    const current = (document.body.dataset.user || '').trim();
+    let complete = true;
+    const seenHabits = new Set();
+    (payload.changes || []).forEach(change=>{
+      const data = change.data;
+      if(change.type === 'habit'){
+        seenHabits.add(String(change.id));
+        complete = applyHabit(change.id, data) && complete;
+      }else if(change.type === 'summary' && data){
+        const ring = document.querySelector('.glow-ring .ring');
+        if(ring){ ring.setAttribute('data-value', data.overall_rate); animateProgress(ring, data.overall_rate); }
+      }else if(change.type === 'points' && data && current && data.user_name === current){
+        const pts = document.getElementById('userPoints');
+        if(pts) pts.textContent = data.points;
+        const known = parseInt(document.body.dataset.rewards || '-1', 10);
+        const names = (data.rewards || []).map(r=> typeof r === 'string' ? r : r.name);
+        if(known >= 0 && names.length > known){ showReward(`Congrats! You unlocked: ${names.slice(known).join(', ')} 🎉`); }
+        document.body.dataset.rewards = names.length;
+      }else if(change.type === 'calendar' && data && data.user_name === null){
+        const counts = data.counts || {};
+        const shown = `${calDate.getFullYear()}-${String(calDate.getMonth()+1).padStart(2,'0')}`;
+        if(calMode === 'month' && data.month === shown){
+          renderCalendar(calDate, counts, Math.max(0, ...Object.values(counts)));
+        }else if(calMode === 'year' && yearData && data.month.startsWith(`${yearData.year}-`)){
+          // patch that month into the year array
+          const m = parseInt(data.month.slice(5, 7), 10) - 1;
+          const first = dayOfYear(yearData.year, m, 1);
+          const days = new Date(yearData.year, m+1, 0).getDate();
+          for(let d=1; d<=days; d++) yearData.days[first + d - 1] = counts[String(d)] || 0;
+          renderYear(yearData);
+        }
+      }else if(change.type === 'leaderboard' && data){
+        renderLeaderboard(data.top || []);
+      }
+    });
+    // a reset carries the full state: cards it doesn't mention are gone
+    if(payload.reset){
+      habitGrid.cards().slice().forEach(card=>{
+        if(!seenHabits.has(card.getAttribute('data-habit-id'))) habitGrid.remove(card);
+      });
+    }
+    return complete;
+  }
+
+  function syncChanges(){
+    // one request in flight; callers share it
+    if(syncing) return syncing;
+    syncing = (async ()=>{
+      try{
+        const epoch = syncEpoch ? `&epoch=${syncEpoch}` : '';
+        const res = await fetch(`/api/changes?since=${syncCursor}${epoch}`);
+        const js = await res.json();
+        if(!js.success) return;
+        syncCursor = js.cursor; syncEpoch = js.epoch || '';
+        if(!applyChanges(js)) location.reload();
+      }catch(e){ console.warn('Change sync failed', e); }
+      finally{ syncing = null; }
+    })();
+    return syncing;
+  }
+
+  (function pollChanges(){
+    setTimeout(async ()=>{
+      if(!document.hidden){
+        // push queued actions first so the server state we pull already includes them
+        if(loadQueue().length) await flushActions();
+        await syncChanges();
+      }
+      pollChanges();
+    }, SYNC_INTERVAL_MS);
+  })();
+  document.addEventListener('visibilitychange', ()=>{ if(!document.hidden) syncChanges(); });
+
+  /* --- Offline-first action queue: Done/Skip apply instantly, sync in batches --- */
+  // one queue per user: what someone else queued on this browser is never sent as yours
+  const QUEUE_USER = (document.body.dataset.user || '').trim();
+  const QUEUE_KEY = `trackit-action-queue:${QUEUE_USER}`;
+  const FLUSH_INTERVAL_MS = 3000;
+  const FLUSH_BATCH = 50;
+  let flushing = null;
+  let flushTimer = null;
+
+  function loadQueue(){
+    try{
+      const queue = JSON.parse(localStorage.getItem(QUEUE_KEY) || '[]');
+      return queue.filter(a=>a && a.user === QUEUE_USER);
+    }catch(e){ return []; }
+  }
+  function saveQueue(queue){
+    try{ localStorage.setItem(QUEUE_KEY, JSON.stringify(queue)); }catch(e){ console.warn('Action queue not saved', e); }
+  }
+  function newActionId(){
+    if(window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+  }
+  function localDate(){
+    const d = new Date();
+    return `${d.getFullYear()}-${String(d.getMonth()+1).padStart(2,'0')}-${String(d.getDate()).padStart(2,'0')}`;
+  }
+
+  function enqueueAction(type, name){
+    const queue = loadQueue();
+    // the id is the server's idempotency key: a retried batch never counts twice
+    queue.push({id: newActionId(), type, name, date: localDate(), user: QUEUE_USER});
+    saveQueue(queue);
+    // coalesce a burst of clicks into one request
+    clearTimeout(flushTimer);
+    flushTimer = setTimeout(flushActions, 300);
+  }
+
+  function applyOptimistic(card, type){
+    if(!card) return;
+    const meta = card.querySelector('.meta');
+    const m = meta && meta.textContent.match(/(\d+)\s*\/\s*(\d+)/);
+    if(!m) return;
+    let done = parseInt(m[1], 10), total = parseInt(m[2], 10) + 1;
+    if(type === 'done') done += 1;
+    meta.textContent = `${done} / ${total} days`;
+    const rate = total ? Math.floor(done / total * 100) : 0;
+    card.setAttribute('data-rate', rate);
+    const prog = card.querySelector('.progress');
+    if(prog){ prog.style.setProperty('--p', rate); animateProgress(prog, rate); }
+    const pts = document.getElementById('userPoints');
+    if(type === 'done' && pts) pts.textContent = (parseInt(pts.textContent, 10) || 0) + 10;
+  }
+
+  function flushActions(){
+    if(flushing) return flushing;
+    flushing = (async ()=>{
+      let sent = false;
+      try{
+        while(navigator.onLine !== false){
+          const batch = loadQueue().slice(0, FLUSH_BATCH);
+          if(!batch.length) break;
+          const res = await fetch('/api/actions/batch', {
+            method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({actions: batch})
+          });
+          // server trouble: keep everything queued and retry on the next tick
+          if(res.status >= 500) break;
+          const js = await res.json().catch(()=>({}));
+          if(!res.ok) console.warn('Dropping rejected action batch', js.error);
+          (js.results || []).filter(r=>r.status === 'rejected').forEach(r=>console.warn('Action rejected', r.id, r.error));
+          const handled = new Set(batch.map(a=>a.id));
+          // re-read: clicks made while the request was in flight stay queued
+          saveQueue(loadQueue().filter(a=>!handled.has(a.id)));
+          sent = true;
+        }
+      }catch(e){ /* offline or unreachable: the queue survives in localStorage */ }
+      finally{ flushing = null; }
+      if(sent) await syncChanges();
+    })();
+    return flushing;
+  }
+
+  // actions queued in an earlier visit are not in the server-rendered page yet
+  // (a new tween replaces the entrance one, so nothing overwrites them)
+  loadQueue().forEach(a=>applyOptimistic(habitGrid.byName(a.name), a.type));
+  setInterval(()=>{ if(loadQueue().length) flushActions(); }, FLUSH_INTERVAL_MS);
+  window.addEventListener('online', ()=>flushActions());
+  if(loadQueue().length) flushActions();
+
   /* --- Chat assistant UI --- */
   // inject chat controls into DOM
   const chatFab = document.createElement('button');
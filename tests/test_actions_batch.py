@@ -0,0 +1,63 @@
+"""
+Tests for replaying queued client actions through /api/actions/batch
+"""
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_setup
+
+# Importing the app must not start writing trackit.log
+with mock.patch.object(log_setup, "configure_logging"):
+    import app as app_module
+
+
+class TestActionsBatch(unittest.TestCase):
+    """Test that actions are only applied for the user who queued them"""
+
+    def setUp(self):
+        self.committed = []
+
+        def commit_units(units):
+            self.committed.extend(units)
+            for unit in units:
+                unit.results = ["Skipped ❌"] + [None] * (len(unit.ops) - 1)
+
+        patch = mock.patch.object(app_module, "commit_units", commit_units)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app_module.app.test_client()
+        with self.client.session_transaction() as s:
+            s["user_name"] = "ann"
+
+    def test_actions_queued_by_another_user_are_rejected(self):
+        actions = [
+            {"id": "a1", "type": "skip", "name": "Read", "user": "bob"},
+            {"id": "a2", "type": "skip", "name": "Read", "user": "ann"},
+            {"id": "a3", "type": "skip", "name": "Read", "user": ""},
+        ]
+        results = self.client.post("/api/actions/batch", json={"actions": actions}).get_json()["results"]
+        self.assertEqual([r["status"] for r in results], ["rejected", "applied", "rejected"])
+        self.assertEqual(results[0]["error"], "action was queued by another user")
+        self.assertEqual([u.action_id for u in self.committed], ["ann:a2"])
+
+    def test_action_dates_must_be_recent(self):
+        today = date.today()
+        oldest = today - timedelta(days=app_module.ACTION_MAX_AGE_DAYS)
+        actions = [
+            {"id": "a1", "type": "done", "name": "Read", "date": oldest.isoformat()},
+            {"id": "a2", "type": "done", "name": "Read", "date": (oldest - timedelta(days=1)).isoformat()},
+            {"id": "a3", "type": "done", "name": "Read", "date": "1999-01-01"},
+            {"id": "a4", "type": "done", "name": "Read", "date": (today + timedelta(days=2)).isoformat()},
+        ]
+        results = self.client.post("/api/actions/batch", json={"actions": actions}).get_json()["results"]
+        self.assertEqual([r["status"] for r in results], ["applied", "rejected", "rejected", "rejected"])
+        self.assertEqual([u.action_id for u in self.committed], ["ann:a1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
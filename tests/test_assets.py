@@ -0,0 +1,77 @@
+"""
+Tests for the fingerprinted asset pipeline in assets.py
+"""
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets
+from assets import AssetPipeline
+
+
+class TestAssetPipeline(unittest.TestCase):
+    """Test hashing, precompression and variant selection"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.static = os.path.join(self.tmpdir, "static")
+        os.makedirs(os.path.join(self.static, "images"))
+        self._write("app.js", "console.log('hello');\n" * 200)
+        self._write("images/run.svg", "<svg></svg>")
+        self.pipeline = AssetPipeline(self.static, os.path.join(self.static, "build"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.static, name), "w") as f:
+            f.write(text)
+
+    def test_build_fingerprints_and_compresses(self):
+        manifest = self.pipeline.build()
+        self.assertEqual(sorted(manifest), ["app.js", "images/run.svg"])
+        hashed = manifest["app.js"]["hashed"]
+        self.assertRegex(hashed, r"^app\.[0-9a-f]{12}\.js$")
+        self.assertEqual(self.pipeline.url("app.js"), f"/assets/{hashed}")
+        self.assertIn("gzip", manifest["app.js"]["encodings"])
+        # Too small to gain anything from compression
+        self.assertEqual(manifest["images/run.svg"]["encodings"], [])
+        path, encoding = self.pipeline.resolve(hashed, "gzip, deflate")
+        self.assertEqual(encoding, "gzip")
+        with gzip.open(path, "rt") as f:
+            self.assertTrue(f.read().startswith("console.log"))
+        self.assertEqual(self.pipeline.resolve(hashed, "")[1], None)
+
+    def test_edited_source_gets_a_new_name(self):
+        first = self.pipeline.url("app.js")
+        self._write("app.js", "console.log('changed');\n")
+        with mock.patch.object(assets, "CHECK_SECONDS", 0):
+            second = self.pipeline.url("app.js")
+        self.assertNotEqual(first, second)
+        # Pages still holding the old URL keep working
+        self.assertIsNotNone(self.pipeline.resolve(first[len("/assets/"):]))
+
+    def test_version_changes_with_the_manifest(self):
+        self.pipeline.url("app.js")
+        version = self.pipeline.version()
+        self.assertEqual(self.pipeline.version(), version)
+        self._write("app.js", "console.log('changed');\n")
+        with mock.patch.object(assets, "CHECK_SECONDS", 0):
+            self.assertGreater(self.pipeline.version(), version)
+
+    def test_resolve_rejects_paths_outside_the_build(self):
+        self.pipeline.build()
+        self.assertIsNone(self.pipeline.resolve("../app.js"))
+        self.assertIsNone(self.pipeline.resolve("manifest.json"))
+        self.assertIsNone(self.pipeline.resolve("app.000000000000.js"))
+        self.assertEqual(self.pipeline.url("missing.css"), "/static/missing.css")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
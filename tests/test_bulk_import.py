@@ -0,0 +1,156 @@
+"""
+Tests for the chunked bulk history import in bulk_import.py
+"""
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+from bulk_import import import_history, detect_format, parse_row
+from export import stream_export
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test parsing, validation, deduplication and the end-of-import updates"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "LEADERBOARD_PATH", path("leaderboard.csv")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "ACTIONS_PATH", path("actions.json")),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.changes = []
+        data_manager.add_change_listener(self.changes.append)
+        data_manager.add_new_habit("Read")
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        data_manager._event_stores.pop(os.path.join(self.tmpdir, "event_store"), None)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _habits(self):
+        df = data_manager.load_data()
+        return {r.habit_name: (r.days_completed, r.total_days, r.last_date) for r in df.itertuples()}
+
+    def test_csv_import_dedupes_and_updates_stores_once(self):
+        text = io.StringIO(
+            "date,habit,user\n"
+            "2025-01-01,read,ann\n"
+            "2025-01-02,Read,ann\n"
+            "2025-01-02,READ,ann\n"      # same habit, user and day
+            "2025-01-02,Swim,bob\n"
+            "not-a-date,Read,ann\n"
+            "2025-01-03,,ann\n"
+        )
+        self.changes.clear()
+        report = import_history(text, "csv", chunk_rows=2)
+        self.assertEqual((report.rows, report.imported, report.duplicates, report.invalid), (6, 3, 1, 2))
+        self.assertEqual([e["line"] for e in report.errors], [6, 7])
+        self.assertEqual(report.habits_created, ["Swim"])
+        self.assertEqual(self._habits(), {"Read": (2, 2, "2025-01-02"), "Swim": (1, 1, "2025-01-02")})
+
+        points = data_manager.load_user_points()
+        self.assertEqual((points["ann"]["points"], points["bob"]["points"]), (20, 10))
+        self.assertEqual(report.points, {"ann": 20, "bob": 10})
+        self.assertEqual(sorted(r["user_name"] for r in data_manager.load_leaderboard()), ["ann", "bob"])
+        # One notification per chunk, one for creating Swim, one for the leaderboard
+        self.assertEqual(self.changes[-1], ("leaderboard",))
+        self.assertEqual(len(self.changes), 4)
+
+        # Importing the same file again changes nothing
+        text.seek(0)
+        again = import_history(text, "csv")
+        self.assertEqual((again.imported, again.duplicates), (0, 4))
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 20)
+
+    def test_crash_after_events_are_written_is_finished_by_reimport(self):
+        text = io.StringIO("date,habit,user\n2025-01-01,Read,ann\n2025-01-02,Read,ann\n")
+        record_events = data_manager._record_events
+        calls = []
+
+        def crash_after_writing(rows):
+            written = record_events(rows)
+            calls.append(written)
+            if len(calls) == 1:
+                raise OSError("worker died")
+            return written
+
+        # The events reach the log, the points store is never written
+        with mock.patch.object(data_manager, "_record_events", crash_after_writing):
+            with self.assertRaises(OSError):
+                import_history(text, "csv")
+        self.assertEqual(data_manager.get_calendar_range("2025-01-01", "2025-01-02", user_name="ann"), [1, 1])
+        self.assertNotIn("ann", data_manager.load_user_points())
+
+        # The next commit replays the journaled chunk first, so the re-import finds only duplicates
+        text.seek(0)
+        again = import_history(text, "csv")
+        self.assertEqual((again.imported, again.duplicates), (0, 2))
+        self.assertEqual(self._habits(), {"Read": (2, 2, "2025-01-02")})
+        self.assertEqual(again.points, {"ann": 20})
+        # Replaying the whole journal again is a no-op
+        data_manager.recover_journal()
+        self.assertEqual(self._habits(), {"Read": (2, 2, "2025-01-02")})
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 20)
+
+    def test_ndjson_into_event_store_with_forced_user(self):
+        os.makedirs(data_manager.EVENT_STORE_DIR)
+        lines = [json.dumps({"date": f"2024-0{m}-15T07:00:00", "habit_name": "Read", "user": "mallory"})
+                 for m in (3, 1, 2)] + ["{broken", ""]
+        report = import_history(io.StringIO("\n".join(lines)), "ndjson", user_name="ann", force_user=True,
+                                points_per_event=0)
+        self.assertEqual((report.imported, report.invalid), (3, 1))
+        self.assertEqual(data_manager.get_calendar_range("2024-01-15", "2024-01-15", user_name="ann"), [1])
+        self.assertEqual(data_manager.get_calendar_range("2024-01-15", "2024-03-15", user_name="mallory")[0], 0)
+        # Backfilled months older than the one before the newest are frozen at the end
+        store = data_manager._event_store()
+        self.assertEqual([store.partition_info(m)["frozen"] for m in store.partitions()], [True, False, False])
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 0)
+
+    def test_unknown_habits_rejected_without_create(self):
+        report = import_history(io.StringIO("date,habit\n2025-01-01,Swim\n"), "csv", user_name="ann",
+                                create_habits=False)
+        self.assertEqual((report.imported, report.invalid), (0, 1))
+        self.assertEqual(list(self._habits()), ["Read"])
+
+    def test_export_round_trip(self):
+        import_history(io.StringIO("date,habit\n2025-01-01,Read\n2025-01-05,Read\n"), "csv", user_name="ann")
+        exported = b"".join(stream_export("ann", "csv")).decode("utf-8")
+        report = import_history(io.StringIO(exported), "csv", user_name="bob", force_user=True)
+        # Habit, points and reward records are skipped
+        self.assertEqual((report.rows, report.imported), (2, 2))
+
+    def test_parse_row_and_format_detection(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        with self.assertRaises(ValueError):
+            parse_row({"date": tomorrow, "habit": "Read"})
+        self.assertEqual(parse_row({"date": "2025-01-01", "habit": " Read "}, "ann")[1:], ("Read", "ann"))
+        self.assertEqual(detect_format("history.ndjson.gz"), "ndjson")
+        self.assertEqual(detect_format("", "application/x-ndjson"), "ndjson")
+        self.assertEqual(detect_format("history.csv"), "csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Tests for the delta-sync change log in changes.py
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import snapshot
+from snapshot import SnapshotManager
+from changes import ChangeLog
+
+
+def load_habits():
+    habits = data_manager.load_data().to_dict(orient="records")
+    for h in habits:
+        h["rate"] = 0
+        h["streak"] = data_manager.calculate_streak(h["habit_name"], habit_id=h["habit_id"])
+    return habits
+
+
+def by_type(payload):
+    out = {}
+    for change in payload["changes"]:
+        out.setdefault(change["type"], {})[change["id"]] = change["data"]
+    return out
+
+
+class TestChangeLog(unittest.TestCase):
+    """Test cursors, entity deltas, deletions and compaction"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "LEADERBOARD_PATH", path("leaderboard.csv")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+            mock.patch.object(snapshot, "REMINDER_FILE", path("reminder.txt")),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+        with open(path("habits.csv"), "w") as f:
+            f.write("habit_name,days_completed,total_days,last_date\nRead,0,0,\n")
+        with open(path("events.csv"), "w") as f:
+            f.write("date,habit_id,user_name\n")
+        self.manager = SnapshotManager(load_habits=load_habits, refresh_seconds=0)
+        self.log = ChangeLog(self.manager)
+        self.manager.current()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_full_sync_then_idle_poll(self):
+        full = self.log.since(0)
+        self.assertTrue(full["reset"])
+        self.assertEqual(by_type(full)["habit"][1]["habit_name"], "Read")
+        idle = self.log.since(full["cursor"], full["epoch"])
+        self.assertFalse(idle["reset"])
+        self.assertEqual(idle["changes"], [])
+        self.assertEqual(idle["cursor"], full["cursor"])
+
+    def test_delta_contains_only_changed_entities(self):
+        cursor = self.log.cursor()
+        with data_manager.unit_of_work() as uow:
+            uow.mark_done("Read")
+            uow.record_event("Read", user_name="ann")
+            uow.add_points("ann", 10)
+        delta = self.log.since(cursor, self.log.epoch, user_name="ann")
+        self.assertGreater(delta["cursor"], cursor)
+        changed = by_type(delta)
+        self.assertEqual(changed["habit"][1]["days_completed"], 1)
+        self.assertEqual(changed["points"]["ann"]["points"], 10)
+        month = date.today().strftime("%Y-%m")
+        self.assertEqual(changed["calendar"][f"{month}/ann"]["counts"], {date.today().day: 1})
+        self.assertEqual(changed["calendar"][month]["counts"], {date.today().day: 1})
+        self.assertNotIn("leaderboard", changed)
+        self.assertEqual(len({c["seq"] for c in delta["changes"]}), 1)
+
+    def test_deletions_and_tombstone_compaction(self):
+        self.log.max_tombstones = 1
+        cursor = self.log.cursor()
+        data_manager.add_new_habit("Run")
+        data_manager.delete_habit("Read")
+        self.assertIsNone(by_type(self.log.since(cursor, self.log.epoch))["habit"][1])
+        data_manager.delete_habit("Run")
+        # Read's tombstone was compacted away, so the old cursor must resync
+        stale = self.log.since(cursor, self.log.epoch)
+        self.assertTrue(stale["reset"])
+        self.assertNotIn("habit", by_type(stale))
+
+    def test_user_scoped_entities_only_go_to_their_user(self):
+        cursor = self.log.cursor()
+        with data_manager.unit_of_work() as uow:
+            uow.record_event("Read", user_name="ann")
+            uow.add_points("ann", 10)
+        month = date.today().strftime("%Y-%m")
+        for since in (0, cursor):
+            changed = by_type(self.log.since(since, self.log.epoch, user_name="bob"))
+            self.assertNotIn("points", changed)
+            self.assertIn(month, changed["calendar"])
+            self.assertEqual([c for c in changed["calendar"] if "/" in c], [])
+        changed = by_type(self.log.since(0, user_name="ann"))
+        self.assertEqual(changed["points"]["ann"]["points"], 10)
+        self.assertIn(f"{month}/ann", changed["calendar"])
+
+    def test_cursor_from_another_process_resets(self):
+        self.assertTrue(self.log.since(self.log.cursor(), self.log.epoch + 1)["reset"])
+
+    def test_cursor_from_one_worker_misses_nothing_on_another(self):
+        """Test a client polling two workers: one publishes a write while the other
+        is still building a version from data read before that write
+        """
+        # A second worker process: its own snapshots and log, not notified of our writes
+        with mock.patch.object(data_manager, "_change_listeners", []), \
+                mock.patch.object(data_manager, "_event_listeners", []):
+            other = SnapshotManager(load_habits=load_habits, refresh_seconds=0)
+            other_log = ChangeLog(other)
+            other.current()
+        other_log.epoch = self.log.epoch  # inherited from the master
+
+        def load_habits_then_other_worker_writes():
+            habits = load_habits()
+            with open(data_manager.POINTS_FILE, "w") as f:
+                json.dump({"ann": {"points": 10, "rewards": []}}, f)
+            other.refresh()
+            return habits
+
+        self.manager.load_habits = load_habits_then_other_worker_writes
+        data_manager.add_new_habit("Run")
+        polled = self.log.since(0, user_name="ann")
+        self.assertNotIn("points", by_type(polled))
+        changed = by_type(other_log.since(polled["cursor"], polled["epoch"], user_name="ann"))
+        self.assertEqual(changed["points"]["ann"]["points"], 10)
+
+    def test_entity_keeps_only_latest_entry(self):
+        for _ in range(3):
+            data_manager.skip_habit("Read")
+        entries = [c for c in self.log.since(0)["changes"] if c["type"] == "habit"]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["data"]["total_days"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
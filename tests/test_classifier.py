@@ -0,0 +1,62 @@
+"""
+Tests for the shared keyword classifier in classifier.py
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classifier
+from classifier import KeywordClassifier, DEFAULT_TABLES, classify
+
+
+def naive(table, text):
+    """The substring scan the classifier replaces"""
+    text = text.lower()
+    return next((label for label, words in table if any(w in text for w in words)), None)
+
+
+class TestKeywordClassifier(unittest.TestCase):
+    """Test priority order, memoization and config additions"""
+
+    def test_matches_naive_scan(self):
+        table = DEFAULT_TABLES["icon"]
+        matcher = KeywordClassifier(table)
+        pieces = [w for _label, words in table for w in words] + ["x", "Yo", "ga", "wat", " "]
+        rng = random.Random(7)
+        for _ in range(2000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))
+            self.assertEqual(matcher(text), naive(table, text), text)
+
+    def test_earlier_label_wins_wherever_it_occurs(self):
+        matcher = KeywordClassifier([("tips", ["help"]), ("progress", ["how"])])
+        self.assertEqual(matcher("How can you HELP me"), "tips")
+        self.assertEqual(matcher("show me"), "progress")
+        self.assertEqual(matcher("nothing", default="none"), "none")
+
+    def test_results_are_memoized_in_a_bounded_cache(self):
+        matcher = KeywordClassifier(DEFAULT_TABLES["icon"], cache_size=2)
+        for name in ("Read", "Read", "Run", "Yoga"):
+            matcher(name)
+        info = matcher.classify.cache_info()
+        self.assertEqual((info.hits, info.currsize), (1, 2))
+
+    def test_config_adds_labels_and_keywords(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "classifier.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"icon": {"running.svg": ["swim"], "cooking.svg": ["cook"]}}, f)
+            with mock.patch.object(classifier, "CLASSIFIER_FILE", path), \
+                    mock.patch.dict(classifier._classifiers, checked=0.0, signature=None, tables={}):
+                self.assertEqual(classify("icon", "Swim 1km"), "running.svg")
+                self.assertEqual(classify("icon", "Cook dinner"), "cooking.svg")
+                self.assertEqual(classify("icon", "Read and cook"), "reading.svg")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
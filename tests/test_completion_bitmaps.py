@@ -0,0 +1,107 @@
+"""
+Tests for per-(user, habit) completion bitmaps
+"""
+import os
+import sys
+import random
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from completion_bitmaps import Bitmap, CompletionBitmaps
+
+
+def reference_streak(dates, today):
+    """The original calculate_streak loop over unique dates, newest first"""
+    streak = 0
+    current = today
+    for d in sorted(set(dates), reverse=True):
+        if d == current or d == current - timedelta(days=1):
+            streak += 1
+            current = d
+        else:
+            break
+    return streak
+
+
+class TestBitmap(unittest.TestCase):
+    """Test the growable bitset"""
+
+    def test_add_is_idempotent(self):
+        bitmap = Bitmap(1000)
+        self.assertTrue(bitmap.add(1000))
+        self.assertFalse(bitmap.add(1000))
+        self.assertIn(1000, bitmap)
+        self.assertNotIn(1001, bitmap)
+
+    def test_grows_both_directions(self):
+        bitmap = Bitmap(1000)
+        bitmap.add(1500)
+        bitmap.add(900)
+        self.assertEqual(list(bitmap.days()), [900, 1500])
+        self.assertEqual(bitmap.count(0, 2000), 2)
+        self.assertEqual(bitmap.count(901, 1500), 0)
+
+    def test_run_ending_at_crosses_bytes(self):
+        bitmap = Bitmap(100)
+        for d in range(103, 140):
+            bitmap.add(d)
+        self.assertEqual(bitmap.run_ending_at(139), 37)
+        self.assertEqual(bitmap.run_ending_at(120), 18)
+        self.assertEqual(bitmap.run_ending_at(140), 0)
+
+
+class TestCompletionBitmaps(unittest.TestCase):
+    """Test streaks, calendar counts and done-today checks"""
+
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        self.bitmaps = CompletionBitmaps()
+
+    def _add(self, user, habit, days_ago):
+        return self.bitmaps.add(user, habit, (self.today - timedelta(days=days_ago)).toordinal())
+
+    def test_duplicate_events_are_ignored(self):
+        self.assertTrue(self._add("ann", "Read", 0))
+        self.assertFalse(self._add("ann", "Read", 0))
+        self.assertTrue(self._add("bob", "Read", 0))
+        self.assertTrue(self.bitmaps.is_done("ann", "Read", self.today.toordinal()))
+        self.assertFalse(self.bitmaps.is_done("ann", "Run", self.today.toordinal()))
+
+    def test_streak_matches_original_algorithm(self):
+        """Test random histories against the original date-walking loop"""
+        rng = random.Random(7)
+        for trial in range(200):
+            bitmaps = CompletionBitmaps()
+            dates = []
+            for _ in range(rng.randint(0, 40)):
+                user = rng.choice(["ann", "bob", ""])
+                d = self.today - timedelta(days=rng.randint(0, 150 if trial % 2 else 12))
+                bitmaps.add(user, "Read", d.toordinal())
+                dates.append(d)
+            self.assertEqual(bitmaps.streak("Read", self.today.toordinal()),
+                             reference_streak(dates, self.today), f"trial {trial}")
+
+    def test_long_multi_user_streak(self):
+        """Test a streak longer than the scan window across several users"""
+        for i in range(300):
+            self._add("ann" if i % 2 else "bob", "Read", i + 1)
+        self.assertEqual(self.bitmaps.streak("Read", self.today.toordinal()), 300)
+        self.assertEqual(self.bitmaps.streak("Read", self.today.toordinal(), user_name="ann"), 0)
+
+    def test_day_counts_and_popcount(self):
+        start = date(2026, 3, 1).toordinal()
+        end = date(2026, 4, 1).toordinal()
+        self._add("ann", "Read", 0)
+        self._add("ann", "Run", 0)
+        self._add("bob", "Read", 1)
+        self._add("bob", "Read", 40)  # previous month
+        self.assertEqual(self.bitmaps.day_counts(start, end), {9: 2, 8: 1})
+        self.assertEqual(self.bitmaps.day_counts(start, end, user_name="bob"), {8: 1})
+        self.assertEqual(self.bitmaps.count(start, end, habit="Read"), 2)
+        self.assertEqual(self.bitmaps.user_day_counts(start, end), {"ann": {9: 2}, "bob": {8: 1}})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,235 @@
+"""
+Tests for the month-partitioned columnar event store in event_store.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import data_manager
+import event_store
+from event_store import EventStore, convert_csv, to_ordinal, month_key
+
+
+class TestEventStore(unittest.TestCase):
+    """Test appending, dictionary encoding and vectorized queries"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.tmpdir, "store")
+        self.store = EventStore(self.store_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_append_and_calendar_counts(self):
+        """Test monthly counts with user and habit filters"""
+        self.store.append([
+            ("2026-02-13", 1, "ann"),
+            ("2026-02-13", 2, "ann"),
+            ("2026-02-14", 1, "bob"),
+            ("2026-03-01", 1, "ann"),
+        ])
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.calendar_counts(2026, 2), {13: 2, 14: 1})
+        self.assertEqual(self.store.calendar_counts(2026, 2, user_name="ann"), {13: 2})
+        self.assertEqual(self.store.calendar_counts(2026, 2, habit_id=1), {13: 1, 14: 1})
+        self.assertEqual(self.store.calendar_counts(2026, 2, user_name="nobody"), {})
+        self.assertEqual(self.store.calendar_counts(2026, 12), {})
+
+    def test_habit_days_unique_sorted(self):
+        """Test that duplicate completions collapse into one day"""
+        self.store.append([("2026-02-14", 1, ""), ("2026-02-13", 1, ""), ("2026-02-14", 1, "")])
+        days = self.store.habit_days(1).tolist()
+        self.assertEqual(days, [date(2026, 2, 13).toordinal(), date(2026, 2, 14).toordinal()])
+
+    def test_reopen_reads_persisted_columns(self):
+        """Test that a fresh store instance sees earlier appends"""
+        self.store.append([("2026-02-13", 7, "ann")])
+        reopened = EventStore(self.store_dir)
+        self.assertEqual(list(reopened.iter_rows()), [("2026-02-13", 7, "ann")])
+        self.assertEqual(os.path.getsize(os.path.join(self.store_dir, "2026-02", "day.i32")), 4)
+
+    def test_invalid_dates_are_skipped(self):
+        self.assertEqual(self.store.append([("not-a-date", 1, "")]), 0)
+        self.assertIsNone(to_ordinal("2026-13-40"))
+
+    def test_instances_sharing_a_directory_see_each_others_writes(self):
+        """Test that names and partitions added through one instance are not lost by another"""
+        other = EventStore(self.store_dir)
+        self.store.append([("2026-02-13", 1, "ann")])
+        other.append([("2026-02-14", 1, "bob"), ("2026-03-01", 2, "bob")])
+        self.store.append([("2026-02-15", 1, "carol")])
+        reopened = EventStore(self.store_dir)
+        self.assertEqual(reopened.user_names(), ["ann", "bob", "carol"])
+        self.assertEqual(list(reopened.iter_rows()), [
+            ("2026-02-13", 1, "ann"), ("2026-02-14", 1, "bob"), ("2026-02-15", 1, "carol"), ("2026-03-01", 2, "bob"),
+        ])
+        self.assertEqual(reopened.partition_info("2026-02")["rows"], 3)
+        self.assertEqual(self.store.partitions(), ["2026-02", "2026-03"])
+        self.assertEqual(self.store.calendar_counts(2026, 2, user_name="bob"), {14: 1})
+
+    @unittest.skipIf(event_store.fcntl is None, "needs fcntl")
+    def test_concurrent_processes_append_safely(self):
+        """Test appends from several processes at once"""
+        pids = []
+        for worker in range(4):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    store = EventStore(self.store_dir, auto_freeze=False)
+                    for i in range(25):
+                        store.append([(f"2026-02-{i + 1:02d}", worker, f"user{worker}-{i % 5}")])
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        rows = list(EventStore(self.store_dir).iter_rows())
+        self.assertEqual(len(rows), 100)
+        # Every event still belongs to the user of the process that wrote it
+        self.assertTrue(all(user.startswith(f"user{habit}-") for _d, habit, user in rows))
+        self.assertEqual(len(EventStore(self.store_dir).user_names()), 20)
+
+    def test_convert_csv(self):
+        """Test conversion from the events.csv format"""
+        csv_path = os.path.join(self.tmpdir, "events.csv")
+        with open(csv_path, "w") as f:
+            f.write("date,habit_id,user_name\n2026-02-13,2,Shibi\n2026-02-14,1,\n")
+        self.assertEqual(convert_csv(csv_path, self.store_dir), 2)
+        self.assertEqual(EventStore(self.store_dir).calendar_counts(2026, 2, user_name="Shibi"), {13: 1})
+
+    def test_upgrade_legacy_habit_codes(self):
+        """Test that name-coded stores are rewritten to habit ids"""
+        os.makedirs(self.store_dir)
+        np.asarray([to_ordinal("2026-02-13"), to_ordinal("2026-02-14")], dtype="<i4").tofile(os.path.join(self.store_dir, "day.i32"))
+        np.asarray([0, 1], dtype="<u2").tofile(os.path.join(self.store_dir, "habit.u16"))
+        np.asarray([0, 0], dtype="<u4").tofile(os.path.join(self.store_dir, "user.u32"))
+        with open(os.path.join(self.store_dir, "users.dict.json"), "w") as f:
+            f.write('[""]')
+        with open(os.path.join(self.store_dir, "habits.dict.json"), "w") as f:
+            f.write('["Read", "Run"]')
+        ids = {"Read": 10, "Run": 20}
+        self.assertTrue(EventStore(self.store_dir).upgrade_habit_codes(ids.get))
+        self.assertEqual([h for _d, h, _u in EventStore(self.store_dir).iter_rows()], [10, 20])
+
+
+class TestPartitions(unittest.TestCase):
+    """Test monthly partitioning, freezing and partition pruning"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.tmpdir, "store")
+        self.store = EventStore(self.store_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_events_are_routed_to_month_partitions(self):
+        self.store.append([("2026-01-31", 1, "ann"), ("2026-02-01", 1, "ann"), ("2026-02-02", 2, "bob")])
+        self.assertEqual(self.store.partitions(), ["2026-01", "2026-02"])
+        self.assertEqual(self.store.partition_info("2026-02")["rows"], 2)
+        self.assertEqual(len(self.store.columns(months=["2026-01"])[0]), 1)
+        self.assertEqual(len(EventStore(self.store_dir)), 3)
+
+    def test_new_month_freezes_and_compresses_old_months(self):
+        """Test that months before the previous one are packed once a newer month starts"""
+        self.store.append([("2026-01-05", 1, "ann"), ("2026-02-05", 1, "ann")])
+        self.store.append([("2026-03-05", 1, "bob")])
+        self.assertTrue(self.store.partition_info("2026-01")["compressed"])
+        self.assertFalse(self.store.partition_info("2026-02")["frozen"])
+        self.assertTrue(os.path.exists(os.path.join(self.store_dir, "2026-01.npz")))
+        self.assertFalse(os.path.exists(os.path.join(self.store_dir, "2026-01")))
+        reopened = EventStore(self.store_dir)
+        self.assertEqual(reopened.calendar_counts(2026, 1, user_name="ann"), {5: 1})
+        self.assertEqual([d for d, _h, _u in reopened.iter_rows()], ["2026-01-05", "2026-02-05", "2026-03-05"])
+
+    def test_late_event_thaws_frozen_month(self):
+        self.store.append([("2026-01-05", 1, "ann")])
+        self.store.freeze("2026-02")
+        self.store.append([("2026-01-06", 1, "ann")])
+        self.assertFalse(self.store.partition_info("2026-01")["frozen"])
+        self.assertEqual(self.store.calendar_counts(2026, 1), {5: 1, 6: 1})
+
+    def test_flat_store_is_split_on_open(self):
+        """Test that a pre-partitioning store is upgraded in place"""
+        os.makedirs(self.store_dir)
+        days = [to_ordinal("2025-12-31"), to_ordinal("2026-01-01")]
+        np.asarray(days, dtype="<i4").tofile(os.path.join(self.store_dir, "day.i32"))
+        np.asarray([3, 4], dtype="<u2").tofile(os.path.join(self.store_dir, "habit.u16"))
+        np.asarray([0, 0], dtype="<u4").tofile(os.path.join(self.store_dir, "user.u32"))
+        with open(os.path.join(self.store_dir, "users.dict.json"), "w") as f:
+            f.write('["ann"]')
+        store = EventStore(self.store_dir)
+        self.assertEqual(store.partitions(), ["2025-12", "2026-01"])
+        self.assertEqual(list(store.iter_rows()), [("2025-12-31", 3, "ann"), ("2026-01-01", 4, "ann")])
+        self.assertFalse(os.path.exists(os.path.join(self.store_dir, "day.i32")))
+
+    def test_calendar_and_streak_open_only_needed_partitions(self):
+        """Test partition pruning in data_manager's completion index"""
+        today = date.today()
+        rows = [(today - timedelta(days=i), 7, "ann") for i in range(3)]
+        rows.append((today - timedelta(days=400), 7, "ann"))
+        self.store.append(rows)
+        opened = []
+        original = EventStore._partition_columns
+
+        def spy(store, month):
+            opened.append(month)
+            return original(store, month)
+
+        with mock.patch.object(data_manager, "EVENT_STORE_DIR", self.store_dir), \
+                mock.patch.object(EventStore, "_partition_columns", spy), \
+                mock.patch.dict(data_manager._completion_index, bitmaps=None):
+            data_manager._event_stores.pop(self.store_dir, None)
+            counts = data_manager.get_calendar_counts(today.month, today.year, user_name="ann")
+            self.assertEqual(set(opened), {month_key(today.toordinal())})
+            self.assertEqual(data_manager._streak(7, today.toordinal()), 3)
+            self.assertNotIn(month_key((today - timedelta(days=400)).toordinal()), opened)
+            data_manager._event_stores.pop(self.store_dir, None)
+        self.assertEqual(sum(counts.values()), min(3, today.day))
+
+    def test_index_catches_up_on_appends_by_other_processes(self):
+        """Test that only the rows another writer appended are read into the loaded index"""
+        today = date.today()
+        self.store.append([(today - timedelta(days=1), 7, "ann")])
+        seen = []
+        with mock.patch.object(data_manager, "EVENT_STORE_DIR", self.store_dir), \
+                mock.patch.object(data_manager, "_event_listeners", [seen.extend]), \
+                mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None):
+            data_manager._event_stores.pop(self.store_dir, None)
+            bitmaps = data_manager.completion_index([month_key(today.toordinal())])
+            EventStore(self.store_dir).append([(today, 7, "ann"), (today, 8, "bob")])
+            with mock.patch.object(EventStore, "iter_partitions", side_effect=AssertionError("reload")):
+                self.assertIs(data_manager.completion_index([month_key(today.toordinal())]), bitmaps)
+            self.assertEqual(data_manager._streak(7, today.toordinal(), user_name="ann"), 2)
+            self.assertEqual(sorted(seen), [(today.toordinal(), 7, "ann"), (today.toordinal(), 8, "bob")])
+            data_manager._event_stores.pop(self.store_dir, None)
+
+    def test_calendar_range_is_dense_across_years(self):
+        """Test multi-year range counts from one pass over the completion index"""
+        self.store.append([("2024-12-31", 1, "ann"), ("2025-01-01", 1, "ann"), ("2025-01-01", 2, "bob"),
+                           ("2026-03-01", 1, "ann")])
+        with mock.patch.object(data_manager, "EVENT_STORE_DIR", self.store_dir), \
+                mock.patch.dict(data_manager._completion_index, bitmaps=None):
+            data_manager._event_stores.pop(self.store_dir, None)
+            days = data_manager.get_calendar_range("2024-12-30", "2026-03-01")
+            ann = data_manager.get_calendar_range(date(2025, 1, 1), date(2025, 1, 2), user_name="ann")
+            data_manager._event_stores.pop(self.store_dir, None)
+        self.assertEqual(len(days), (date(2026, 3, 1) - date(2024, 12, 30)).days + 1)
+        self.assertEqual((days[0], days[1], days[2], days[-1]), (0, 1, 2, 1))
+        self.assertEqual(sum(days), 4)
+        self.assertEqual(ann, [1, 0])
+        self.assertEqual(data_manager.months_between(to_ordinal("2024-12-30"), to_ordinal("2025-02-01")),
+                         ["2024-12", "2025-01", "2025-02"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
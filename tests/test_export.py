@@ -0,0 +1,112 @@
+"""
+Tests for the streaming history export in export.py
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+from export import stream_export, export_filename, iter_chunks, EXPORT_COLUMNS
+
+
+class TestExport(unittest.TestCase):
+    """Test record contents, formats, chunking, gzip and resuming"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "ACTIONS_PATH", path("actions.json")),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+        data_manager.add_new_habit("Read")
+        data_manager.add_new_habit("Run")
+        with open(data_manager.POINTS_FILE, "w") as f:
+            json.dump({"ann": {"points": 60, "last_point_earned": "2026-03-02T08:00:00",
+                               "rewards": ["Old Badge", {"name": "Bronze Badge", "earned_at": "2026-03-02T08:00:00",
+                                                         "points_at_earn": 50}]}}, f)
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        data_manager._event_stores.pop(os.path.join(self.tmpdir, "event_store"), None)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _record(self, rows):
+        for when, habit, user in rows:
+            data_manager.record_event(habit, when=when, user_name=user)
+
+    def _ndjson(self, **kwargs):
+        data = b"".join(stream_export("ann", "ndjson", **kwargs))
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    def test_ndjson_records(self):
+        self._record([("2026-03-02", "Run", "ann"), ("2026-02-27", "Read", "ann"), ("2026-03-01", "Read", "bob")])
+        records = self._ndjson()
+        self.assertEqual([r["habit_name"] for r in records if r["record"] == "habit"], ["Read", "Run"])
+        events = [(r["date"], r["habit_name"]) for r in records if r["record"] == "event"]
+        self.assertEqual(sorted(events), [("2026-02-27", "Read"), ("2026-03-02", "Run")])
+        self.assertEqual([r["points"] for r in records if r["record"] == "points"], [60])
+        self.assertEqual([r["reward"] for r in records if r["record"] == "reward"], ["Old Badge", "Bronze Badge"])
+
+    def test_event_store_is_read_oldest_first_and_resumes(self):
+        os.makedirs(data_manager.EVENT_STORE_DIR)
+        # Appended out of order, as a late offline write would be
+        self._record([("2026-03-05", "Run", "ann"), ("2026-01-10", "Read", "ann"),
+                      ("2026-03-01", "Read", "ann"), ("2026-03-02", "Read", "bob")])
+        self.assertEqual(data_manager._event_store().partitions(), ["2026-01", "2026-03"])
+        events = [r["date"] for r in self._ndjson() if r["record"] == "event"]
+        self.assertEqual(events, ["2026-01-10", "2026-03-01", "2026-03-05"])
+
+        resumed = self._ndjson(since="2026-03-02")
+        self.assertEqual([r["date"] for r in resumed if r["record"] == "event"], ["2026-03-05"])
+        # Habits and the points total are always sent; rewards only from that day on
+        self.assertEqual(len([r for r in resumed if r["record"] == "habit"]), 2)
+        self.assertEqual([r["reward"] for r in resumed if r["record"] == "reward"], ["Bronze Badge"])
+
+    def test_csv_has_one_header_and_fixed_columns(self):
+        self._record([("2026-03-02", "Run", "ann")])
+        text = b"".join(stream_export("ann", "csv", chunk_bytes=16)).decode("utf-8")
+        rows = list(csv.DictReader(text.splitlines()))
+        self.assertEqual(text.splitlines()[0].split(","), EXPORT_COLUMNS)
+        self.assertEqual(text.count("record,"), 1)
+        event = [r for r in rows if r["record"] == "event"][0]
+        self.assertEqual((event["date"], event["habit_name"], event["points"]), ("2026-03-02", "Run", ""))
+
+    def test_gzip_stream_decompresses_to_plain_export(self):
+        self._record([("2026-03-02", "Run", "ann")] * 3)
+        plain = b"".join(stream_export("ann", "csv"))
+        packed = b"".join(stream_export("ann", "csv", compress=True, chunk_bytes=32))
+        self.assertEqual(gzip.decompress(packed), plain)
+
+    def test_chunks_group_lines(self):
+        chunks = list(iter_chunks(["abc\n"] * 10, chunk_bytes=10))
+        self.assertEqual([len(c) for c in chunks], [12, 12, 12, 4])
+        self.assertEqual(list(iter_chunks([], chunk_bytes=10)), [])
+
+    def test_filename(self):
+        self.assertEqual(export_filename("Ann B/../x", "csv"), "trackit-Ann_B_x.csv")
+        self.assertEqual(export_filename("ann", "ndjson", "2026-03-01", True), "trackit-ann-2026-03-01.ndjson.gz")
+
+
+if __name__ == '__main__':
+    unittest.main()
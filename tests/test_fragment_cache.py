@@ -0,0 +1,55 @@
+"""
+Tests for the dashboard fragment cache in fragment_cache.py
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fragment_cache import FragmentCache
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test reuse, LRU eviction and stats"""
+
+    def setUp(self):
+        self.cache = FragmentCache(max_entries=2)
+        self.renders = []
+
+    def _render(self, name, key):
+        def render():
+            self.renders.append((name, key))
+            return f"<div>{name} {key}</div>"
+        return self.cache.render(name, key, render)
+
+    def test_unchanged_key_reuses_html(self):
+        first = self._render("habit_grid", 3)
+        self.assertIs(self._render("habit_grid", 3), first)
+        self.assertNotEqual(self._render("habit_grid", 4), first)
+        self.assertEqual(self.renders, [("habit_grid", 3), ("habit_grid", 4)])
+
+    def test_least_recently_used_is_evicted(self):
+        self._render("user_header", "ann")
+        self._render("user_header", "bob")
+        self._render("user_header", "ann")
+        self._render("user_header", "cy")
+        self._render("user_header", "ann")
+        self._render("user_header", "bob")
+        self.assertEqual([key for _name, key in self.renders], ["ann", "bob", "cy", "bob"])
+        self.assertEqual(self.cache.stats()["fragments"]["user_header"]["evictions"], 2)
+
+    def test_stats_report_time_saved(self):
+        for _ in range(4):
+            self._render("habit_grid", 1)
+        stats = self.cache.stats()
+        grid = stats["fragments"]["habit_grid"]
+        self.assertEqual((grid["hits"], grid["misses"]), (3, 1))
+        self.assertEqual(grid["hit_rate"], 0.75)
+        self.assertAlmostEqual(grid["saved_ms"], grid["avg_render_ms"] * 3, places=2)
+        self.cache.reset_stats()
+        self.assertEqual(self.cache.stats()["fragments"], {})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
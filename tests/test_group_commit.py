@@ -0,0 +1,99 @@
+"""
+Tests for write coalescing in group_commit.py
+"""
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from group_commit import GroupCommitter
+
+
+class RecordingCommit:
+    """Stands in for data_manager.commit_units and remembers each batch"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.batches = []
+        self.delay = delay
+        self.error = error
+
+    def __call__(self, units):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.batches.append(list(units))
+        for unit in units:
+            unit["durable"] = True
+
+
+class TestGroupCommit(unittest.TestCase):
+    """Test batching, acknowledgement ordering, errors and stats"""
+
+    def _submit_concurrently(self, committer, count):
+        units = [{"id": i} for i in range(count)]
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def worker(unit):
+            barrier.wait()
+            try:
+                committer.submit(unit)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(u,)) for u in units]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        return units, errors
+
+    def test_concurrent_submits_share_batches(self):
+        commit = RecordingCommit()
+        committer = GroupCommitter(commit, window_ms=50)
+        units, errors = self._submit_concurrently(committer, 20)
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(u["id"] for b in commit.batches for u in b), list(range(20)))
+        self.assertLess(len(commit.batches), 20)
+        stats = committer.stats()
+        self.assertEqual(stats["units"], 20)
+        self.assertEqual(stats["batches"], len(commit.batches))
+        self.assertGreater(stats["max_batch_size"], 1)
+
+    def test_submit_returns_only_after_commit(self):
+        committer = GroupCommitter(RecordingCommit(delay=0.02), window_ms=5)
+        unit = {}
+        committer.submit(unit)
+        self.assertTrue(unit.get("durable"))
+        self.assertGreaterEqual(committer.stats()["ack_ms"]["max"], 20)
+
+    def test_max_batch_caps_batch_size(self):
+        commit = RecordingCommit()
+        committer = GroupCommitter(commit, window_ms=50, max_batch=4)
+        self._submit_concurrently(committer, 12)
+        self.assertTrue(all(len(b) <= 4 for b in commit.batches))
+
+    def test_errors_reach_every_submitter_in_the_batch(self):
+        committer = GroupCommitter(RecordingCommit(error=OSError("disk full")), window_ms=50)
+        _units, errors = self._submit_concurrently(committer, 5)
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(all(isinstance(e, OSError) for e in errors))
+        self.assertEqual(committer.stats()["errors"], committer.stats()["batches"])
+
+    def test_zero_window_commits_synchronously(self):
+        commit = RecordingCommit()
+        committer = GroupCommitter(commit, window_ms=0)
+        committer.submit({"id": 1})
+        committer.submit({"id": 2})
+        self.assertEqual(len(commit.batches), 2)
+        self.assertIsNone(committer._thread_pid)
+        self.assertEqual(committer.stats()["batch_size_histogram"], {"1": 2})
+        committer.reset_stats()
+        self.assertEqual(committer.stats()["units"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,41 @@
+"""
+Tests for the JSON routes in gui.py
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gui
+
+
+class TestGuiRoutes(unittest.TestCase):
+    """Test that reminders are set for the session user only"""
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.secret_key = "test"
+        gui.create_gui_routes(app)
+        self.client = app.test_client()
+        patch = mock.patch.object(gui, "set_user_reminder", side_effect=lambda user, t: t)
+        self.set_user_reminder = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_reminder_is_set_for_session_user(self):
+        with self.client.session_transaction() as s:
+            s["user_name"] = "ann"
+        response = self.client.post("/api/set-reminder", json={"time": "20:30", "user_name": "mallory"})
+        self.assertEqual(response.status_code, 200)
+        self.set_user_reminder.assert_called_once_with("ann", "20:30")
+
+    def test_without_session_sets_shared_reminder(self):
+        self.client.post("/api/set-reminder", json={"time": "07:15", "user_name": "mallory"})
+        self.set_user_reminder.assert_called_once_with("", "07:15")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the case-insensitive habit name index in habit_index.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+from habit_index import HabitNameIndex, fold
+
+
+class TestHabitNameIndex(unittest.TestCase):
+    """Test folding, duplicate checks and prefix search"""
+
+    def setUp(self):
+        names = ["Read 10 pages", "Run", "reading log", "Straße walk", "Drink Water"] + [f"habit {i:04d}" for i in range(5000)]
+        self.index = HabitNameIndex((name, i + 1) for i, name in enumerate(names))
+
+    def test_duplicates_ignore_case_and_whitespace(self):
+        self.assertIn("READ 10 PAGES ", self.index)
+        self.assertIn("strasse WALK", self.index)
+        self.assertNotIn("Read", self.index)
+        self.assertEqual(self.index.get("run"), ("Run", 2))
+        self.assertEqual(fold("  ＲＵＮ "), "run")
+
+    def test_prefix_suggestions_are_sorted_and_limited(self):
+        self.assertEqual([n for n, _i in self.index.suggest("rea")], ["Read 10 pages", "reading log"])
+        self.assertEqual(len(self.index.suggest("habit 1", limit=5)), 5)
+        self.assertEqual(self.index.suggest("habit 4999")[0], ("habit 4999", 5005))
+        self.assertEqual(self.index.suggest(""), [])
+        self.assertEqual(self.index.suggest("zzz"), [])
+
+
+class TestHabitIndexInDataManager(unittest.TestCase):
+    """Test that add, rename and delete keep the index current"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+        ]
+        for patch in self.patches:
+            patch.start()
+        with open(path("habits.csv"), "w") as f:
+            f.write("habit_name,days_completed,total_days,last_date\nRead,0,0,\n")
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_add_checks_agree_on_case(self):
+        self.assertTrue(data_manager.habit_exists("READ"))
+        self.assertEqual(data_manager.add_new_habit("read"), "Habit already exists!")
+        results = data_manager.unit_of_work().add_habit("rEAD").add_habit("Run").add_habit("RUN").commit()
+        self.assertEqual(results, ["Habit already exists!", "Habit 'Run' added successfully!", "Habit already exists!"])
+
+    def test_rename_and_delete_update_suggestions(self):
+        data_manager.add_new_habit("Running")
+        self.assertFalse(data_manager.edit_habit("Running", "read"))
+        self.assertTrue(data_manager.edit_habit("Read", "READ"))
+        self.assertTrue(data_manager.edit_habit("Running", "Rowing"))
+        self.assertEqual([s["habit_name"] for s in data_manager.suggest_habits("r")], ["READ", "Rowing"])
+        data_manager.delete_habit("READ")
+        self.assertEqual(data_manager.suggest_habits("r"), [{"habit_id": 2, "habit_name": "Rowing"}])
+        self.assertFalse(data_manager.habit_exists("read"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+"""
+Tests for the queue-based rotating log pipeline in log_setup.py
+"""
+import os
+import sys
+import gzip
+import json
+import queue
+import shutil
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_setup import (
+    JsonLinesFormatter, SizeAndTimeRotatingFileHandler,
+    DroppingQueueHandler, BatchingQueueListener
+)
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Test batching, rotation, compression and JSON output"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmpdir, "test.log")
+        self.logger = logging.getLogger("trackit-test-logpipe")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _pipeline(self, **handler_kwargs):
+        handler = SizeAndTimeRotatingFileHandler(self.log_file, **handler_kwargs)
+        handler.setFormatter(JsonLinesFormatter())
+        log_queue = queue.Queue(maxsize=1000)
+        self.logger.addHandler(DroppingQueueHandler(log_queue))
+        listener = BatchingQueueListener(log_queue, [handler])
+        listener.start()
+        return listener, handler
+
+    def test_records_written_as_json_lines(self):
+        """Test that every record becomes one parseable JSON line"""
+        listener, handler = self._pipeline()
+        for i in range(50):
+            self.logger.info(f"event {i}")
+        listener.stop()
+        handler.close()
+        with open(self.log_file, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 50)
+        self.assertEqual(lines[-1]["msg"], "event 49")
+        self.assertEqual(lines[0]["level"], "INFO")
+
+    def test_size_rotation_compresses_backups(self):
+        """Test that rotated files are gzipped and the backup count is respected"""
+        listener, handler = self._pipeline(max_bytes=500, backup_count=2, compress=True)
+        for i in range(200):
+            self.logger.info(f"rotating line {i}")
+        listener.stop()
+        handler.close()
+        backups = sorted(f for f in os.listdir(self.tmpdir) if f.endswith(".gz"))
+        self.assertEqual(backups, ["test.log.1.gz", "test.log.2.gz"])
+        with gzip.open(os.path.join(self.tmpdir, "test.log.1.gz"), "rt") as f:
+            self.assertIn("rotating line", f.readline())
+
+    def test_time_rotation(self):
+        """Test that an expired interval forces a rollover"""
+        listener, handler = self._pipeline(backup_count=3, interval=3600)
+        handler.rollover_at = 0  # pretend the interval has elapsed
+        self.logger.info("after interval")
+        listener.stop()
+        handler.close()
+        self.assertTrue(os.path.exists(self.log_file + ".1"))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that logging never blocks when the writer falls behind"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        self.logger.addHandler(handler)
+        for i in range(5):
+            self.logger.info(f"burst {i}")
+        self.assertEqual(handler.dropped, 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+"""
+Tests for the tracemalloc accounting in memtrack.py
+"""
+import os
+import sys
+import unittest
+import tracemalloc
+from unittest import mock
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memtrack
+from memtrack import track_memory, install_memory_tracking, get_memory_report
+
+MB = 1024 * 1024
+
+
+@track_memory
+def allocate(size):
+    data = bytearray(size)
+    return len(data)
+
+
+@track_memory
+def outer():
+    # The 2 MB inner peak counts towards the outer call even though it is freed
+    allocate(2 * MB)
+    return allocate(MB // 2)
+
+
+class TestMemtrack(unittest.TestCase):
+    """Test peaks and allocation sites with tracing on, and the no-op path with it off"""
+
+    def setUp(self):
+        memtrack.reset_stats()
+        self.kept = []
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        memtrack.reset_stats()
+
+    def _calls(self):
+        return {row["name"]: row for row in get_memory_report()["calls"]}
+
+    def test_peaks_and_allocation_sites_when_tracing(self):
+        with mock.patch.object(memtrack, "MEMTRACE_ENABLED", True):
+            app = Flask(__name__)
+
+            @app.route("/grow")
+            def grow():
+                self.kept.append(bytearray(3 * MB))
+                return "ok"
+
+            install_memory_tracking(app)
+            self.assertTrue(memtrack.is_enabled())
+            outer()
+            self.assertEqual(app.test_client().get("/grow").status_code, 200)
+            report = get_memory_report()
+
+        calls = self._calls()
+        self.assertEqual(calls["allocate"]["count"], 2)
+        self.assertGreaterEqual(calls["allocate"]["max_peak"], 2 * MB)
+        self.assertLess(calls["allocate"]["last_peak"], MB)
+        self.assertGreaterEqual(calls["outer"]["max_peak"], 2 * MB)
+
+        route = report["routes"][0]
+        self.assertEqual((route["name"], route["count"]), ("/grow", 1))
+        self.assertGreaterEqual(route["max_peak"], 3 * MB)
+        worst = report["worst_requests"][0]
+        self.assertEqual(worst["path"], "/grow")
+        # The largest live allocation is the one the route kept
+        self.assertIn(os.path.basename(__file__), worst["top_sites"][0]["site"])
+        self.assertGreaterEqual(worst["top_sites"][0]["size"], 3 * MB)
+
+    def test_no_overhead_when_off(self):
+        with mock.patch.object(memtrack, "MEMTRACE_ENABLED", False), \
+                mock.patch.object(memtrack, "_enter") as enter, \
+                mock.patch.object(memtrack, "_exit") as exit_:
+            app = Flask(__name__)
+            install_memory_tracking(app)
+            self.assertEqual(outer(), MB // 2)
+        enter.assert_not_called()
+        exit_.assert_not_called()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(app.before_request_funcs, {})
+        self.assertEqual(app.teardown_request_funcs, {})
+        report = get_memory_report()
+        self.assertFalse(report["enabled"])
+        self.assertEqual((report["calls"], report["routes"], report["traced_peak"]), ([], [], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
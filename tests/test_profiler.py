@@ -0,0 +1,81 @@
+"""
+Tests for request profiling in profiler.py and the /admin/profiles endpoint
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiler
+import log_setup
+
+# Importing the app must not start writing trackit.log
+with mock.patch.object(log_setup, "configure_logging"):
+    import app as app_module
+
+
+class TestProfiler(unittest.TestCase):
+    """Test who may profile and read profiles, and the summaries returned"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch.object(profiler, "PROFILE_DIR", self.tmpdir),
+            mock.patch.object(profiler, "PROFILE_MAX_FILES", 3),
+            mock.patch.object(profiler, "_summary_cache", {}),
+            mock.patch.object(app_module, "ADMIN_TOKEN", "secret"),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _profile(self, **headers):
+        return self.client.get("/admin/profiles", headers={"X-TrackIt-Profile": "1", **headers})
+
+    def test_profiles_need_the_token_header(self):
+        self.assertEqual(self._profile().status_code, 403)
+        self.assertEqual(self.client.get("/admin/profiles?token=secret").status_code, 403)
+        self.assertEqual(self.client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+        # Nothing was profiled for the rejected requests
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        with mock.patch.object(app_module, "ADMIN_TOKEN", ""):
+            self.assertEqual(self.client.get("/admin/profiles").status_code, 404)
+
+    def test_profiled_request_is_summarized(self):
+        response = self._profile(**{"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response.headers["X-TrackIt-Profile-Id"]
+
+        listed = self.client.get("/admin/profiles?top=3", headers={"X-Admin-Token": "secret"}).get_json()
+        self.assertEqual([p["id"] for p in listed["profiles"]], [profile_id])
+        summary = listed["profiles"][0]
+        self.assertEqual((summary["path"], summary["status"]), ("/admin/profiles", 200))
+        self.assertEqual(len(summary["top_functions"]), 3)
+        self.assertEqual(set(summary["top_functions"][0]), {"function", "calls", "tottime_ms", "cumtime_ms"})
+        cumulative = [f["cumtime_ms"] for f in summary["top_functions"]]
+        self.assertEqual(cumulative, sorted(cumulative, reverse=True))
+
+    def test_top_is_clamped_and_cache_bounded(self):
+        ids = [self._profile(**{"X-Admin-Token": "secret"}).headers["X-TrackIt-Profile-Id"] for _ in range(3)]
+        summary = profiler.summarize_profile(ids[0], top_n=10 ** 6)
+        self.assertLessEqual(len(summary["top_functions"]), profiler.PROFILE_MAX_TOP)
+        self.assertEqual(len(profiler.summarize_profile(ids[0], top_n=-5)["top_functions"]), 1)
+        # One entry per profile whatever `top` asked for, at most PROFILE_MAX_FILES of them
+        with mock.patch.object(profiler, "PROFILE_MAX_FILES", 2):
+            for profile_id in ids:
+                for top_n in (1, 2, 3, 4):
+                    profiler.summarize_profile(profile_id, top_n=top_n)
+        self.assertEqual(sorted(profiler._summary_cache), ids[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
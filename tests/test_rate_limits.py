@@ -0,0 +1,48 @@
+"""
+Tests for the request limits in rate_limits.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limits
+from rate_limits import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test sliding windows in memory and in a file shared by processes"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "rate_limits.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_requests_over_the_limit_are_refused_until_the_window_passes(self):
+        limiter = RateLimiter()
+        self.assertEqual([limiter.hit("ann", 2, 60, now=t) for t in (0, 1, 2)], [True, True, False])
+        self.assertTrue(limiter.hit("bob", 2, 60, now=2))
+        self.assertTrue(limiter.hit("ann", 2, 60, now=60.5))
+
+    @unittest.skipIf(rate_limits.fcntl is None, "needs fcntl")
+    def test_shared_limiters_count_each_others_requests(self):
+        """Test two workers' limiters sharing one file"""
+        first, second = RateLimiter(), RateLimiter()
+        first.share(self.path)
+        second.share(self.path)
+        self.assertTrue(first.hit("ann", 2, 60, now=0))
+        self.assertTrue(second.hit("ann", 2, 60, now=1))
+        self.assertFalse(first.hit("ann", 2, 60, now=2))
+        # Expired times are dropped from the file
+        self.assertTrue(second.hit("bob", 2, 60, now=100))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '{"60:bob": [100]}')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+"""
+Tests for the parallel completion index rebuild in rebuild.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import rebuild
+from event_store import EventStore
+from completion_bitmaps import CompletionBitmaps
+
+
+def completed_days(bitmaps):
+    """Compare indexes by content, not by how much each bitmap happened to grow"""
+    return sorted((key, list(bitmap.days())) for key, bitmap in bitmaps.items())
+
+
+class TestRebuild(unittest.TestCase):
+    """Test chunked aggregation, snapshots and stale serving"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.events = os.path.join(self.tmpdir, "events.csv")
+        self.snapshot = os.path.join(self.tmpdir, "derived", "index.pickle")
+        start = date(2025, 1, 1)
+        with open(self.events, "w", encoding="utf-8") as f:
+            f.write("date,habit_id,user_name\n")
+            for i in range(600):
+                f.write(f"{start + timedelta(days=i % 200)},{i % 5 + 1},\"user, {i % 3}\"\n")
+        self.patches = [
+            mock.patch.object(data_manager, "EVENTS_PATH", self.events),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", os.path.join(self.tmpdir, "no_store")),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _sequential(self):
+        return completed_days(data_manager.completion_index())
+
+    def test_csv_chunks_match_sequential_build(self):
+        """Test that byte-range chunks cover every line exactly once"""
+        chunks = rebuild.plan_chunks(chunk_bytes=997)
+        self.assertGreater(len(chunks), 5)
+        bitmaps, _signature, events = rebuild.rebuild_index(workers=1, chunk_bytes=997)
+        self.assertEqual(events, 600)
+        self.assertEqual(completed_days(bitmaps), self._sequential())
+
+    def test_process_pool_over_store_partitions(self):
+        """Test a parallel rebuild over month partitions"""
+        store_dir = os.path.join(self.tmpdir, "store")
+        with mock.patch.object(data_manager, "EVENT_STORE_DIR", store_dir):
+            EventStore(store_dir).append(
+                [(date(2025, 1, 1) + timedelta(days=i), i % 3, f"u{i % 4}") for i in range(120)]
+            )
+            bitmaps, _signature, events = rebuild.rebuild_index(workers=2)
+            self.assertEqual(events, 120)
+            self.assertEqual(completed_days(bitmaps), self._sequential())
+            data_manager._event_stores.pop(store_dir, None)
+
+    def test_warm_start_uses_matching_snapshot(self):
+        self.assertTrue(rebuild.run_rebuild(workers=1, snapshot_path=self.snapshot))
+        self.assertEqual(rebuild.rebuild_status()["state"], "done")
+        data_manager._completion_index["bitmaps"] = None
+        with mock.patch.object(rebuild, "start_background_rebuild") as background:
+            self.assertFalse(rebuild.warm_start(self.snapshot))
+        background.assert_not_called()
+        self.assertEqual(completed_days(data_manager._completion_index["bitmaps"]), self._sequential())
+
+    def test_stale_snapshot_served_until_rebuild_lands(self):
+        """Test that completions recorded mid-rebuild survive the swap"""
+        rebuild.save_snapshot(CompletionBitmaps(), ("old", 0, 0), self.snapshot)
+        with mock.patch.object(rebuild, "start_background_rebuild") as background:
+            rebuild.warm_start(self.snapshot)
+        background.assert_called_once()
+        self.assertTrue(data_manager._completion_index["stale"])
+        self.assertEqual(data_manager.get_calendar_counts(1, 2025), {})
+        bitmaps, signature, _events = rebuild.rebuild_index(workers=1)
+        self.assertTrue(data_manager.record_event("Read", "2026-05-01", "late", habit_id=9))
+        data_manager.install_completion_index(bitmaps, signature)
+        self.assertFalse(data_manager._completion_index["stale"])
+        self.assertTrue(data_manager.completion_index().is_done("late", 9, date(2026, 5, 1).toordinal()))
+        self.assertEqual(data_manager.get_calendar_counts(1, 2025)[1], 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,175 @@
+"""
+Tests for the timer-heap reminder scheduler in reminders.py
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reminders
+from reminders import ReminderScheduler, parse_reminder_time, next_fire_time, save_reminder, load_reminders
+
+
+class FakeNotifier:
+    """Collects notifications instead of showing them"""
+
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, user_name, message):
+        self.sent.append((user_name, message))
+
+
+def at(hour, minute, day=1):
+    return datetime(2026, 3, day, hour, minute).timestamp()
+
+
+class TestReminderScheduler(unittest.TestCase):
+    """Test per-user scheduling with a fake clock and notifier"""
+
+    def setUp(self):
+        self.now = at(8, 0)
+        self.notifier = FakeNotifier()
+        self.scheduler = ReminderScheduler(notifier=self.notifier, clock=lambda: self.now)
+
+    def test_fires_each_user_at_their_time(self):
+        """Test that reminders fire per user and not before they are due"""
+        self.scheduler.set_reminder("alice", 9, 0)
+        self.scheduler.set_reminder("bob", 10, 30)
+        self.assertEqual(self.scheduler.run_pending(at(8, 59)), [])
+        self.assertEqual(self.scheduler.run_pending(at(9, 0)), ["alice"])
+        self.assertEqual(self.scheduler.run_pending(at(10, 30)), ["bob"])
+        self.assertEqual([u for u, _ in self.notifier.sent], ["alice", "bob"])
+        self.assertIn("alice", self.notifier.sent[0][1])
+
+    def test_reschedules_daily(self):
+        """Test that a fired reminder is queued again for the next day"""
+        self.scheduler.set_reminder("alice", 9, 0)
+        self.scheduler.run_pending(at(9, 0))
+        self.assertEqual(self.scheduler.run_pending(at(9, 0, day=1) + 3600), [])
+        self.assertEqual(self.scheduler.run_pending(at(9, 0, day=2)), ["alice"])
+
+    def test_change_applies_immediately(self):
+        """Test that changing a reminder supersedes the old fire time"""
+        self.scheduler.set_reminder("alice", 9, 0)
+        self.scheduler.set_reminder("alice", 8, 30)
+        self.assertEqual(self.scheduler.run_pending(at(8, 30)), ["alice"])
+        self.assertEqual(self.scheduler.run_pending(at(9, 0)), [])
+        self.assertEqual(self.scheduler.get_reminder("alice"), "08:30")
+
+    def test_remove_reminder(self):
+        """Test that removed reminders never fire"""
+        self.scheduler.set_reminder("alice", 9, 0)
+        self.scheduler.remove_reminder("alice")
+        self.assertEqual(self.scheduler.run_pending(at(9, 0)), [])
+        self.assertIsNone(self.scheduler.get_reminder("alice"))
+
+    def test_many_users_on_one_heap(self):
+        """Test that thousands of reminders are served in one pass"""
+        for i in range(5000):
+            self.scheduler.set_reminder(f"user{i}", 9, i % 60)
+        fired = self.scheduler.run_pending(at(9, 59))
+        self.assertEqual(len(fired), 5000)
+        self.assertEqual(len(self.notifier.sent), 5000)
+
+    def test_notifier_errors_do_not_stop_others(self):
+        """Test that one failing notification does not block the rest"""
+        def flaky(user_name, message):
+            if user_name == "bad":
+                raise RuntimeError("boom")
+            self.notifier(user_name, message)
+        self.scheduler.notifier = flaky
+        self.scheduler.set_reminder("bad", 9, 0)
+        self.scheduler.set_reminder("good", 9, 0)
+        self.scheduler.run_pending(at(9, 0))
+        self.assertEqual([u for u, _ in self.notifier.sent], ["good"])
+
+    def test_background_thread_picks_up_changes(self):
+        """Test that set_reminder wakes the scheduler thread without waiting out its sleep"""
+        self.scheduler.clock = time.time
+        self.scheduler.set_reminder("later", 0, 0)
+        self.scheduler.start()
+        try:
+            # Force a reminder that is already due; the sleeping thread must wake for it
+            with self.scheduler._cond:
+                self.scheduler._heap.append((0, -1, "now"))
+                self.scheduler._live_seq["now"] = -1
+                self.scheduler._times["now"] = (0, 0)
+                self.scheduler._heap.sort()
+                self.scheduler._cond.notify()
+            deadline = time.time() + 2
+            while not self.notifier.sent and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            self.scheduler.stop()
+        self.assertEqual(self.notifier.sent[0][0], "now")
+
+    def test_stop_before_thread_runs_is_not_lost(self):
+        """Test that a thread that only gets scheduled after stop() exits at once"""
+        with mock.patch.object(threading.Thread, "start"), mock.patch.object(threading.Thread, "join"):
+            self.scheduler.start()
+            thread = self.scheduler._thread
+            self.scheduler.stop()
+        runner = threading.Thread(target=thread.run, daemon=True)
+        runner.start()
+        runner.join(timeout=2)
+        self.assertFalse(runner.is_alive())
+
+
+class TestReminderParsing(unittest.TestCase):
+    """Test reminder time helpers"""
+
+    def test_parse_valid_and_invalid(self):
+        self.assertEqual(parse_reminder_time("20:30"), (20, 30))
+        with self.assertRaises(ValueError):
+            parse_reminder_time("24:00")
+        with self.assertRaises(ValueError):
+            parse_reminder_time("soon")
+
+    def test_next_fire_time_rolls_to_tomorrow(self):
+        self.assertEqual(next_fire_time(9, 0, at(8, 0)), at(9, 0))
+        self.assertEqual(next_fire_time(9, 0, at(9, 0)), at(9, 0, day=2))
+
+
+
+class TestReminderPersistence(unittest.TestCase):
+    """Test saving reminders to disk"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch.object(reminders, "REMINDER_FILE", os.path.join(self.tmpdir, "reminder.txt")),
+            mock.patch.object(reminders, "REMINDERS_FILE", os.path.join(self.tmpdir, "data", "reminders.json")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_concurrent_saves_keep_every_user(self):
+        """Test that saves racing on the read-modify-write lose no reminder"""
+        threads = [threading.Thread(target=save_reminder, args=(f"user{i}", "09:00")) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        save_reminder("", "21:15")
+        with open(reminders.REMINDERS_FILE) as f:
+            self.assertEqual(len(json.load(f)), 20)
+        self.assertEqual(load_reminders()[""], "21:15")
+        self.assertEqual(sorted(os.listdir(os.path.dirname(reminders.REMINDERS_FILE))),
+                         ["reminders.json", "reminders.json.lock"])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+Tests for the data-driven rewards engine in rewards.py
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import rewards
+from rewards import RewardEngine, DEFAULT_RULES
+
+
+class TestRewardEngine(unittest.TestCase):
+    """Test milestone bisection, earned sets and rule changes"""
+
+    def setUp(self):
+        self.engine = RewardEngine(DEFAULT_RULES)
+
+    def test_only_newly_crossed_milestones(self):
+        user = {"points": 120, "rewards": []}
+        self.assertEqual(self.engine.evaluate("ann", user, points=120), ["Bronze Badge 🥉", "Silver Badge 🥈"])
+        self.assertEqual(self.engine.evaluate("ann", user, points=130), [])
+        user["points"] = 200
+        self.assertEqual(self.engine.evaluate("ann", user, points=200), ["Gold Badge 🥇"])
+        self.assertEqual(user["rewards"][-1]["points_at_earn"], 200)
+        self.assertIn("earned_at", user["rewards"][-1])
+
+    def test_legacy_rewards_are_not_awarded_again(self):
+        user = {"points": 60, "rewards": ["Bronze Badge 🥉"]}
+        self.assertEqual(self.engine.evaluate("bob", user, points=60), [])
+        self.assertEqual(user["reward_progress"]["points"], 60)
+
+    def test_streak_and_category_rules(self):
+        user = {"points": 0, "rewards": []}
+        self.assertEqual(self.engine.category_of("Read 10 pages"), "read")
+        self.assertIsNone(self.engine.category_of("Code 1 hr"))
+        self.assertEqual(self.engine.evaluate("ann", user, streak=7), ["Week Warrior 🔥"])
+        self.assertEqual(self.engine.evaluate("ann", user, category="read", category_count=10), ["Bookworm 📚"])
+        self.assertEqual(self.engine.evaluate("ann", user, category="water", category_count=10), [])
+
+    def test_rule_change_reevaluates_from_zero(self):
+        user = {"points": 80, "rewards": []}
+        self.engine.evaluate("ann", user, points=80)
+        engine = RewardEngine({"rules": DEFAULT_RULES["rules"] + [{"kind": "points", "threshold": 75, "name": "Early Bird 🐦"}]})
+        self.assertEqual(engine.evaluate("ann", user, points=80), ["Early Bird 🐦"])
+
+
+class TestRewardsInUnitOfWork(unittest.TestCase):
+    """Test streak and category rewards awarded on /done-style commits"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.rules = path("rewards.json")
+        with open(self.rules, "w", encoding="utf-8") as f:
+            json.dump({"rules": [{"kind": "streak", "threshold": 3, "name": "Three in a row"},
+                                 {"kind": "category", "category": "read", "threshold": 2, "name": "Reader"}],
+                       "categories": {"read": ["read"]}}, f)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "ACTIONS_PATH", path("actions.json")),
+            mock.patch.object(rewards, "REWARDS_FILE", self.rules),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+        ]
+        for patch in self.patches:
+            patch.start()
+        with open(path("habits.csv"), "w") as f:
+            f.write("habit_name,days_completed,total_days,last_date\nRead,0,0,\n")
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _done(self, when):
+        with data_manager.unit_of_work() as uow:
+            uow.mark_done("Read", when)
+            uow.record_event("Read", user_name="ann", when=when)
+            uow.add_points("ann", 10)
+            uow.check_rewards("ann", "Read")
+        return uow.results[-1]
+
+    def test_streak_and_category_rewards(self):
+        today = date.today()
+        self.assertEqual(self._done(today - timedelta(days=2)), [])
+        self.assertEqual(self._done(today - timedelta(days=1)), ["Reader"])
+        # Repeating a day is not a new completion
+        self.assertEqual(self._done(today - timedelta(days=1)), [])
+        self.assertEqual(self._done(today), ["Three in a row"])
+        user = data_manager.load_user_points()["ann"]
+        self.assertEqual(user["category_counts"], {"read": 3})
+        self.assertEqual([r["name"] for r in user["rewards"]], ["Reader", "Three in a row"])
+
+    def test_streak_rules_use_the_users_own_streak(self):
+        """Test that other users' completions don't extend a user's streak"""
+        today = date.today()
+        for days_ago in (2, 1):
+            data_manager.record_event("Read", today - timedelta(days=days_ago), user_name="bob")
+        self.assertEqual(self._done(today), [])
+        self.assertEqual(self._done(today - timedelta(days=1)), ["Reader"])
+        self.assertEqual(self._done(today - timedelta(days=2)), ["Three in a row"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,31 @@
+"""
+Tests for the production server settings in serve.py
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serve
+
+
+class TestServeOptions(unittest.TestCase):
+    """Test worker sizing and the gunicorn configuration"""
+
+    def test_default_workers(self):
+        self.assertEqual(serve.default_workers(1), 3)
+        self.assertEqual(serve.default_workers(8), 17)
+
+    def test_gunicorn_options(self):
+        options = serve.gunicorn_options("127.0.0.1:8000", workers=2, threads=8)
+        self.assertEqual(options["bind"], "127.0.0.1:8000")
+        self.assertEqual((options["workers"], options["threads"]), (2, 8))
+        self.assertEqual(options["worker_class"], "gthread")
+        self.assertTrue(options["preload_app"])
+        self.assertIs(options["post_fork"], serve.post_fork)
+        self.assertEqual(serve.gunicorn_options(threads=1)["worker_class"], "sync")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -11,6 +11,10 @@ class SmokeTests(unittest.TestCase):
         self.tmpdir = tempfile.mkdtemp()
         self.datafile = os.path.join(self.tmpdir, "habits.csv")
         dm.DATA_PATH = self.datafile
+        dm.JOURNAL_PATH = os.path.join(self.tmpdir, "journal.jsonl")
+        dm.ACTIONS_PATH = os.path.join(self.tmpdir, "actions.json")
+        dm.EVENTS_PATH = os.path.join(self.tmpdir, "events.csv")
+        dm.EVENT_STORE_DIR = os.path.join(self.tmpdir, "event_store")
 
     def tearDown(self):
         try:
@@ -0,0 +1,145 @@
+"""
+Tests for the copy-on-write read model in snapshot.py
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import snapshot
+from snapshot import SnapshotManager
+
+
+def load_habits():
+    habits = data_manager.load_data().to_dict(orient="records")
+    for h in habits:
+        h["rate"] = 0
+        h["streak"] = data_manager.calculate_streak(h["habit_name"], habit_id=h["habit_id"])
+    return habits
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test versioned publishing, partial rebuilds and disk-free reads"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "LEADERBOARD_PATH", path("leaderboard.csv")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "ACTIONS_PATH", path("actions.json")),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+            mock.patch.object(snapshot, "REMINDER_FILE", path("reminder.txt")),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+        with open(path("habits.csv"), "w") as f:
+            f.write("habit_name,days_completed,total_days,last_date\n")
+        with open(path("events.csv"), "w") as f:
+            f.write("date,habit_id,user_name\n")
+        self.manager = SnapshotManager(load_habits=load_habits, refresh_seconds=0)
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_writes_publish_new_version_and_share_unchanged_parts(self):
+        first = self.manager.current()
+        data_manager.add_new_habit("Read")
+        second = self.manager.current()
+        self.assertGreater(second.version, first.version)
+        self.assertEqual(first.habits, ())
+        self.assertEqual([h["habit_name"] for h in second.habits], ["Read"])
+        self.assertIs(second.points, first.points)
+        self.assertIs(second.calendar, first.calendar)
+        self.assertEqual(second.part_versions["habits"], second.version)
+        self.assertEqual(second.part_versions["points"], first.part_versions["points"])
+
+    def test_events_update_streaks_and_calendar(self):
+        data_manager.add_new_habit("Read")
+        self.manager.current()
+        today = date.today()
+        data_manager.record_event("Read", today, user_name="ann")
+        snap = self.manager.current()
+        self.assertEqual(snap.habits[0]["streak"], 1)
+        self.assertEqual(snap.calendar_counts(today.year, today.month, "ann"), {today.day: 1})
+        self.assertEqual(snap.calendar_counts(today.year, today.month), {today.day: 1})
+        self.assertIsNone(snap.calendar_counts(today.year - 5, today.month))
+        span = snap.calendar_range(today - timedelta(days=40), today)
+        self.assertEqual((len(span), span[-1], sum(span)), (41, 1, 1))
+        self.assertIsNone(snap.calendar_range(date(today.year - 5, 1, 1), today))
+
+    def test_events_recount_only_touched_calendar_rollups(self):
+        data_manager.add_new_habit("Read")
+        today = date.today()
+        for user in ("ann", "bob", "cy"):
+            data_manager.record_event("Read", today - timedelta(days=40), user_name=user)
+        first = self.manager.current()
+        bitmaps = data_manager.completion_index()
+        with mock.patch.object(type(bitmaps), "day_counts", autospec=True,
+                               side_effect=type(bitmaps).day_counts) as day_counts:
+            data_manager.record_event("Read", today, user_name="ann")
+            snap = self.manager.current()
+        self.assertEqual(sorted(call.kwargs["user_name"] or "" for call in day_counts.call_args_list), ["", "ann"])
+        self.assertEqual(snap.calendar_counts(today.year, today.month, "ann"), {today.day: 1})
+        self.assertEqual(snap.calendar_counts(today.year, today.month), {today.day: 1})
+        self.assertIs(snap.calendar[(today.year, today.month, "bob")], first.calendar[(today.year, today.month, "bob")])
+        self.assertEqual(snap.calendar_counts(today.year, today.month, "bob"), {})
+        # An append by another process is caught up into the same index and recounted the same way
+        with open(data_manager.EVENTS_PATH, "a") as f:
+            f.write(f"{today.isoformat()},1,bob\n")
+        self.manager.refresh()
+        latest = self.manager.current()
+        self.assertIs(data_manager.completion_index(), bitmaps)
+        self.assertEqual(latest.calendar_counts(today.year, today.month), {today.day: 2})
+        self.assertEqual(latest.calendar_counts(today.year, today.month, "bob"), {today.day: 1})
+        self.assertIs(latest.calendar[(today.year, today.month, "cy")], first.calendar[(today.year, today.month, "cy")])
+
+    def test_refresh_picks_up_changes_made_elsewhere(self):
+        """Test that files edited by another process are noticed on refresh"""
+        self.manager.current()
+        with open(data_manager.POINTS_FILE, "w") as f:
+            json.dump({"bob": {"points": 30, "rewards": []}}, f)
+        self.assertEqual(self.manager.current().user_points("bob"), (0, []))
+        self.manager.refresh()
+        self.assertEqual(self.manager.current().user_points("bob"), (30, []))
+
+    def test_read_refreshes_after_another_worker_wrote(self):
+        """Test that a moved shared change counter makes the next read pick up the write"""
+        with mock.patch.dict(data_manager._change_generation):
+            data_manager.share_change_generation()
+            self.manager.current()
+            with open(data_manager.POINTS_FILE, "w") as f:
+                json.dump({"bob": {"points": 30, "rewards": []}}, f)
+            self.assertEqual(self.manager.current().user_points("bob"), (0, []))
+            # What another worker's data_manager._notify_change does
+            data_manager._change_generation["value"].value += 1
+            self.assertEqual(self.manager.current().user_points("bob"), (30, []))
+
+    def test_reads_do_no_disk_io(self):
+        self.manager.current()
+        with mock.patch("os.stat", side_effect=AssertionError("disk access")), \
+                mock.patch("builtins.open", side_effect=AssertionError("disk access")):
+            snap = self.manager.current()
+            snap.user_points("ann")
+            snap.calendar_counts(date.today().year, date.today().month)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,64 @@
+"""
+Startup regression tests: heavy modules must not load at import time
+"""
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImports(unittest.TestCase):
+    """Importing the app must not pull in pandas or the Gemini SDK"""
+
+    def _run(self, code, files=None):
+        """stdout lines of `code` run in a fresh interpreter"""
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        # Run from a scratch directory so the app's log file lands there
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, text in (files or {}).items():
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(text)
+            out = subprocess.run([sys.executable, "-c", code], cwd=tmp, env=env,
+                                 capture_output=True, text=True, check=True)
+        return out.stdout.split("\n")
+
+    def _modules_after_import(self, module):
+        return set(self._run(f"import sys, {module}; print('\\n'.join(sys.modules))"))
+
+    def test_app_import_skips_heavy_modules(self):
+        """Test that pandas and google.generativeai load lazily"""
+        loaded = self._modules_after_import("app")
+        self.assertNotIn("pandas", loaded)
+        self.assertNotIn("google.generativeai", loaded)
+
+    def test_data_manager_loads_pandas_on_first_use(self):
+        """Test that data_manager imports pandas only when a habit table is first loaded"""
+        code = "\n".join([
+            "import os, sys, data_manager",
+            "print('pandas' in sys.modules)",
+            "print(repr(data_manager.pd))",
+            "data_manager.DATA_PATH = os.path.abspath('habits.csv')",
+            "data_manager.load_data()",
+            "print('pandas' in sys.modules)",
+            "print(repr(data_manager.pd))",
+        ])
+        self.assertEqual(self._run(code)[:4], [
+            "False", "<LazyModule 'pandas' (not loaded)>",
+            "True", "<LazyModule 'pandas' (loaded)>",
+        ])
+    def test_env_file_settings_apply_at_import(self):
+        """Test that .env values reach the settings modules read when the app is imported"""
+        env_file = "TRACKIT_PROFILE_SAMPLE_RATE=0.25\nTRACKIT_CHANGE_TOMBSTONES=7\n"
+        code = "import app, profiler, changes; print(profiler.PROFILE_SAMPLE_RATE); print(changes.CHANGE_TOMBSTONES)"
+        self.assertEqual(self._run(code, files={".env": env_file})[:2], ["0.25", "7"])
+
+    def test_dotenv_loads_only_with_an_env_file(self):
+        """Test that python-dotenv is not imported when there is no .env to read"""
+        code = "import sys, env_setup; print(env_setup.load_env(['missing.env'])); print('dotenv' in sys.modules)"
+        self.assertEqual(self._run(code)[:2], ["None", "False"])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,235 @@
+"""
+Tests for the journaled unit of work in data_manager.py
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import threading
+from datetime import date
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+from data_manager import unit_of_work, commit_units, recover_journal
+
+
+class TestUnitOfWork(unittest.TestCase):
+    """Test atomic /done commits, journal replay and idempotency"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmpdir, name)
+        self.patches = [
+            mock.patch.object(data_manager, "DATA_PATH", path("habits.csv")),
+            mock.patch.object(data_manager, "POINTS_FILE", path("points.json")),
+            mock.patch.object(data_manager, "EVENTS_PATH", path("events.csv")),
+            mock.patch.object(data_manager, "EVENT_STORE_DIR", path("event_store")),
+            mock.patch.object(data_manager, "JOURNAL_PATH", path("journal.jsonl")),
+            mock.patch.object(data_manager, "ACTIONS_PATH", path("actions.json")),
+            mock.patch.object(data_manager, "_change_listeners", []),
+            mock.patch.object(data_manager, "_event_listeners", []),
+            mock.patch.dict(data_manager._completion_index, bitmaps=None, stale=False, pending=None),
+            mock.patch.dict(data_manager._txn_state, since_checkpoint=0, recovered=True),
+        ]
+        for patch in self.patches:
+            patch.start()
+        with open(path("habits.csv"), "w") as f:
+            f.write("habit_name,days_completed,total_days,last_date\nRead,0,0,\n")
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        data_manager._habit_ids["signature"] = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _done(self, user="ann"):
+        with unit_of_work() as uow:
+            uow.mark_done("Read")
+            uow.record_event("Read", user_name=user)
+            uow.add_points(user, 10)
+            uow.check_rewards(user)
+        return uow
+
+    def _state(self):
+        habit = data_manager.load_data().iloc[0]
+        return int(habit["days_completed"]), data_manager.load_user_points()["ann"]["points"]
+
+    def test_done_applies_every_store(self):
+        uow = self._done()
+        self.assertEqual(uow.results, ["Updated successfully ✅", True, 10, []])
+        self.assertEqual(self._state(), (1, 10))
+        self.assertTrue(data_manager.is_habit_done("Read", "ann"))
+        with open(data_manager.JOURNAL_PATH) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_one_fsync_per_commit(self):
+        """Test that the journal append is the only fsync; the checkpoint syncs the stores"""
+        unit_of_work().add_points("ann", 1).commit()
+        with mock.patch("os.fsync") as fsync:
+            self._done()
+        self.assertEqual(fsync.call_count, 1)
+        with mock.patch.object(data_manager, "_fsync_path") as fsync_path:
+            data_manager._checkpoint()
+        synced = {args[0] for args, _kw in fsync_path.call_args_list}
+        self.assertTrue({data_manager.DATA_PATH, data_manager.POINTS_FILE} <= synced)
+
+    def test_stores_are_replaced_not_rewritten_in_place(self):
+        """Test that a crash while writing a store leaves the previous file intact"""
+        self._done()
+        with open(data_manager.POINTS_FILE) as f:
+            before = f.read()
+        with mock.patch("json.dump", side_effect=RuntimeError("crash mid-write")):
+            with self.assertRaises(RuntimeError):
+                data_manager._write_points({"ann": {"points": 99}})
+        with open(data_manager.POINTS_FILE) as f:
+            self.assertEqual(f.read(), before)
+
+    def test_replay_is_idempotent(self):
+        """Test that replaying already-applied transactions changes nothing"""
+        self._done()
+        self.assertEqual(recover_journal(), 1)
+        self.assertEqual(self._state(), (1, 10))
+        self.assertEqual(os.path.getsize(data_manager.JOURNAL_PATH), 0)
+
+    def test_crash_after_journal_write_is_recovered(self):
+        """Test that a journaled but unapplied commit is finished by recovery"""
+        with mock.patch.object(data_manager, "_apply_records", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                self._done()
+        self.assertFalse(os.path.exists(data_manager.POINTS_FILE))
+        self.assertEqual(recover_journal(), 1)
+        self.assertEqual(self._state(), (1, 10))
+        self.assertEqual(recover_journal(), 0)
+
+    def test_sequence_continues_after_other_processes(self):
+        """Test that transaction numbers stay above those another worker process wrote"""
+        elsewhere = data_manager._txn_state["seq"] + 10 ** 9
+        with open(data_manager.JOURNAL_PATH + ".lock", "w") as f:
+            f.write(str(elsewhere))
+        uow = self._done()
+        self.assertGreater(uow.txn, elsewhere)
+        with open(data_manager.JOURNAL_PATH + ".lock") as f:
+            self.assertEqual(int(f.read()), uow.txn)
+
+    @unittest.skipIf(data_manager.fcntl is None, "single-process platform")
+    def test_checkpoint_finishes_other_workers_transactions(self):
+        """Test that a record journaled by a worker that died is applied at the next checkpoint"""
+        orphan = data_manager._resolve_unit(unit_of_work().add_points("bob", 5), {}, set(), [0])
+        data_manager._journal_append([orphan])
+        with mock.patch.object(data_manager, "JOURNAL_CHECKPOINT_TXNS", 1):
+            self._done()
+        self.assertEqual(data_manager.load_user_points()["bob"]["points"], 5)
+        self.assertEqual(os.path.getsize(data_manager.JOURNAL_PATH), 0)
+
+    def test_dead_workers_transaction_lands_before_newer_ones(self):
+        """Test that a journaled but unapplied record from another process is applied
+        before this process commits a newer transaction to the same user
+        """
+        self._done()
+        orphan = data_manager._resolve_unit(unit_of_work().add_points("ann", 5), {}, set(), [0])
+        data_manager._journal_append([orphan])
+        self._done()
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 25)
+        self.assertEqual(recover_journal(), 3)
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 25)
+
+    def test_torn_journal_line_does_not_swallow_next_record(self):
+        with open(data_manager.JOURNAL_PATH, "w") as f:
+            f.write('{"txn": 1, "ops": [')
+        self._done()
+        self.assertEqual(len(data_manager._read_journal()), 1)
+
+    def test_batch_commit_and_new_habits(self):
+        """Test several units in one commit, including a habit added earlier in the batch"""
+        first = unit_of_work().add_habit("Run").add_points("ann", 5).add_points("ann", 5)
+        second = unit_of_work().mark_done("Run").add_habit("Read")
+        commit_units([first, second])
+        self.assertEqual(first.results, ["Habit 'Run' added successfully!", 5, 10])
+        self.assertEqual(second.results, ["Updated successfully ✅", "Habit already exists!"])
+        self.assertEqual(int(data_manager.load_data().set_index("habit_name").loc["Run", "days_completed"]), 1)
+
+    def test_habit_changes_during_a_commit_are_not_overwritten(self):
+        """Test that add/rename/delete wait for a running commit instead of racing its table write"""
+        append = data_manager._journal_append
+        writer = threading.Thread(target=data_manager.add_new_habit, args=("Run",))
+
+        def slow_append(records):
+            append(records)
+            # Commits run on the group-commit thread; only hold up the first one
+            if writer.ident is not None:
+                return
+            writer.start()
+            writer.join(timeout=0.2)
+            # Blocked on the transaction lock until this commit has written habits.csv
+            self.assertTrue(writer.is_alive())
+
+        with mock.patch.object(data_manager, "_journal_append", slow_append):
+            self._done()
+        writer.join()
+        self.assertEqual(sorted(data_manager.load_data()["habit_name"]), ["Read", "Run"])
+
+    def test_rename_and_delete(self):
+        data_manager.add_new_habit("Run")
+        self.assertFalse(data_manager.edit_habit("Run", "read"))
+        self.assertTrue(data_manager.edit_habit("Run", "Rowing"))
+        self.assertTrue(data_manager.delete_habit("Rowing"))
+        self.assertFalse(data_manager.delete_habit("Rowing"))
+        table = data_manager._load_habit_table().set_index("habit_name")
+        self.assertEqual(int(table.loc["Rowing", "deleted"]), 1)
+        # Replaying the journal changes nothing
+        recover_journal()
+        self.assertEqual(sorted(data_manager.load_data()["habit_name"]), ["Read"])
+
+    def test_already_marked_today(self):
+        self._done()
+        self.assertEqual(self._done().results[:2], ["Already marked today ✅", False])
+        self.assertEqual(self._state(), (1, 20))
+
+    def test_client_action_ids_apply_once(self):
+        """Test that a retried batch of queued actions never double-counts"""
+        def batch():
+            done = unit_of_work(action_id="ann:a1").mark_done("Read", "2026-01-02").add_points("ann", 10)
+            skip = unit_of_work(action_id="ann:a2").skip("Read")
+            again = unit_of_work(action_id="ann:a1").mark_done("Read", "2026-01-02").add_points("ann", 10)
+            commit_units([done, skip, again])
+            return done, skip, again
+
+        first = batch()
+        self.assertEqual(first[0].results, ["Updated successfully ✅", 10])
+        self.assertEqual(first[2].results, first[0].results)
+        retry = batch()
+        self.assertEqual([u.results for u in retry], [u.results for u in first])
+        habit = data_manager.load_data().iloc[0]
+        self.assertEqual((int(habit["days_completed"]), int(habit["total_days"])), (1, 2))
+        self.assertEqual(data_manager.load_user_points()["ann"]["points"], 10)
+
+    def test_late_offline_action_keeps_latest_date(self):
+        unit_of_work().mark_done("Read", "2026-01-05").commit()
+        unit_of_work().mark_done("Read", "2026-01-04").commit()
+        habit = data_manager.load_data().iloc[0]
+        self.assertEqual((int(habit["days_completed"]), habit["last_date"]), (2, "2026-01-05"))
+
+    def test_backdated_done_counts_each_day_once(self):
+        """Test that a late action for a day already completed (by anyone) is not counted again"""
+        def done(day, user):
+            unit = unit_of_work().mark_done("Read", day).record_event("Read", user_name=user, when=day)
+            return unit.commit()[0]
+
+        self.assertEqual(done("2026-01-04", "ann"), "Updated successfully ✅")
+        self.assertEqual(done("2026-01-05", "ann"), "Updated successfully ✅")
+        self.assertEqual(done("2026-01-04", "ann"), "Already marked today ✅")
+        self.assertEqual(done("2026-01-04", "bob"), "Already marked today ✅")
+        # Two queued actions for the same new day in one batch
+        first, second = (unit_of_work().mark_done("Read", "2026-01-03") for _ in range(2))
+        commit_units([first, second])
+        self.assertEqual([first.results[0], second.results[0]], ["Updated successfully ✅", "Already marked today ✅"])
+        habit = data_manager.load_data().iloc[0]
+        self.assertEqual((int(habit["days_completed"]), habit["last_date"]), (3, "2026-01-05"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)